@@ -7,6 +7,8 @@ from threading import Thread
 from typing import Dict, Set, TypeVar, Callable, Tuple, Any, Awaitable
 import inspect
 
+from .lib.backpressure import BLOCK, COALESCE, DROP_NEWEST, DROP_OLDEST, QueueStats, checkPolicy
+
 T = TypeVar("T")
 AsyncMessageType = Tuple[str, T]     # (event_name, payload)
 
@@ -16,17 +18,44 @@ class AsyncListener:
     ■ 논블로킹 메시지 처리 리스너 ■
     - 자신의 asyncio.Queue 에 메시지를 저장
     - run() 코루틴으로 꺼내 handle() 호출
+    - 큐가 가득 찼을 때의 동작은 policy (lib/backpressure.py) 로 정합니다
+      (BLOCK 이어도 기다리는 것은 enqueue Task 뿐, 발행하는 쪽은 막히지 않음)
     - 구독/발행은 오직 AsyncBroker 에서만!
     """
-    def __init__(self, max_queue_size: int = 10):
+    def __init__(self, max_queue_size: int = 10, policy: str = DROP_NEWEST, timeout: float = 1.0):
         self.queue: asyncio.Queue[AsyncMessageType] = asyncio.Queue(max_queue_size)
         self._running = False
+        self.policy = checkPolicy(policy)
+        self.timeout = timeout
+        # BLOCK 에서 기다리는 enqueue 들이 발행 순서대로 들어가도록
+        self._put_lock = asyncio.Lock()
+        # 구독할 때 브로커가 자신의 카운터를 넣어 준다
+        self.stats: QueueStats | None = None
 
     async def enqueue(self, message: AsyncMessageType):
+        if self.policy == COALESCE:
+            # 대기 중인 메시지는 최신 메시지로 대체
+            while not self.queue.empty():
+                self._count_dropped(self.queue.get_nowait())
         try:
+            if self.policy == BLOCK:
+                async with self._put_lock:
+                    await asyncio.wait_for(self.queue.put(message), self.timeout)
+            else:
+                self.queue.put_nowait(message)
+        except (asyncio.QueueFull, asyncio.TimeoutError):
+            if self.policy != DROP_OLDEST:
+                self._count_dropped(message)  # overflow 시 drop
+                return
+            # 루프 스레드 안이라 꺼내고 넣는 사이에 끼어드는 것이 없다
+            self._count_dropped(self.queue.get_nowait())
             self.queue.put_nowait(message)
-        except asyncio.QueueFull:
-            pass  # overflow 시 drop
+        if self.stats is not None:
+            self.stats.enqueued(message[0], self.queue.qsize())
+
+    def _count_dropped(self, message: AsyncMessageType):
+        if self.stats is not None:
+            self.stats.dropped(message[0])
 
     async def run(self):
         self._running = True
@@ -54,8 +83,10 @@ class AsyncCallbackListener(AsyncListener):
     """
     def __init__(self,
                  callback: Callable[[Any], Awaitable],
-                 max_queue_size: int = 10):
-        super().__init__(max_queue_size)
+                 max_queue_size: int = 10,
+                 policy: str = DROP_NEWEST,
+                 timeout: float = 1.0):
+        super().__init__(max_queue_size, policy, timeout)
         self._callback = callback
         # 백그라운드 루프에서 run() 코루틴 자동 실행
         asyncio.run_coroutine_threadsafe(self.run(),
@@ -84,6 +115,8 @@ class AsyncBroker:
             inst._events: Dict[str, Set[AsyncListener]] = OrderedDict()
             inst._lock = asyncio.Lock()
             inst.VERBOSE =  os.getenv("Debugging_Mode", "False")  # 디버깅용
+            # 이벤트별 enqueued / dropped / max_depth
+            inst._stats = QueueStats()
 
             # 1) 전용 이벤트 루프 생성
             inst._loop = asyncio.new_event_loop()
@@ -97,20 +130,28 @@ class AsyncBroker:
     def subscribe(self,
                   event: str,
                   listener: Callable[[Any], Awaitable] | AsyncListener,
-                  max_queue_size: int = 10):
+                  max_queue_size: int = 10,
+                  policy: str | None = None,
+                  timeout: float = 1.0):
         """
         ■ 동기 메서드
         - 함수나 메서드를 넘기면 AsyncCallbackListener로 래핑
+        - policy: 큐가 가득 찼을 때의 동작 (drop_newest / drop_oldest / block / coalesce)
+          콜백은 기본 drop_newest, AsyncListener 인스턴스는 넘겼을 때만 바꿈
         """
+        if policy is not None:
+            checkPolicy(policy)  # 잘못된 이름은 호출한 쪽에서 바로 알 수 있게
         # 실제 코루틴 작업을 백그라운드 루프에 스케줄
         asyncio.run_coroutine_threadsafe(
-            self._subscribe_coro(event, listener, max_queue_size),
+            self._subscribe_coro(event, listener, max_queue_size, policy, timeout),
             self._loop)
 
     async def _subscribe_coro(self,
                               event: str,
                               listener: Callable[[Any], Awaitable] | AsyncListener,
-                              max_queue_size: int):
+                              max_queue_size: int,
+                              policy: str | None,
+                              timeout: float):
         async with self._lock:
             if not isinstance(listener, AsyncListener):
                 # 함수·메서드·코루틴함수 → 래핑
@@ -118,11 +159,17 @@ class AsyncBroker:
                         or inspect.ismethod(listener)
                         or inspect.iscoroutinefunction(listener)):
                     listener = AsyncCallbackListener(listener,
-                                                     max_queue_size)
+                                                     max_queue_size,
+                                                     policy or DROP_NEWEST,
+                                                     timeout)
                 else:
                     raise ValueError(
                         "구독자는 AsyncListener 인스턴스 또는 콜백이어야 합니다."
                     )
+            elif policy is not None:
+                listener.policy = policy
+                listener.timeout = timeout
+            listener.stats = self._stats
             self._events.setdefault(event, set()).add(listener)
             if self.VERBOSE:
                 print(f"[AsyncBroker] '{event}' subscribed by {listener}")
@@ -141,6 +188,14 @@ class AsyncBroker:
                 if not self._events[event]:
                     del self._events[event]
 
+    def queue_stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        ■ 동기 메서드
+        ■ 이벤트별 큐 카운터 {event: {"enqueued", "dropped", "max_depth"}}
+        ■ max_queue_size 를 정할 때 참고 (max_depth 가 max_queue_size 에 닿거나 dropped 가 있으면 부족)
+        """
+        return self._stats.snapshot()
+
     def emit(self, message: AsyncMessageType):
         """
         ■ 동기 메서드
@@ -0,0 +1,90 @@
+import asyncio
+import os
+import shutil
+import wave
+from io import BytesIO
+from typing import AsyncIterator
+
+from .tts_backend import TTSBackend
+
+# EmotionAnalyzer 감정 그룹 -> espeak 음높이(0-99)/속도(words per minute)
+ESPEAK_EMOTION_SETTINGS = {
+    "중립": {"pitch": 50, "speed": 160},
+    "슬픔": {"pitch": 35, "speed": 130},
+    "화남": {"pitch": 60, "speed": 180},
+    "부정": {"pitch": 45, "speed": 150},
+    "짜증난": {"pitch": 55, "speed": 175},
+    "기쁨": {"pitch": 65, "speed": 175},
+}
+
+
+class EspeakTTSBackend(TTSBackend):
+    """
+    Offline synthesis on the CPU with the espeak-ng command line engine (apt install espeak-ng).
+    Emotions are expressed with pitch and speed; the engine always produces 22050 Hz mono WAV.
+    """
+
+    name = "espeak"
+    sample_rates = (22050,)
+
+    def __init__(self, voice: str | None = None, executable: str | None = None):
+        TTSBackend.__init__(self)
+
+        self.voice = voice or os.getenv("ESPEAK_VOICE", "ko")
+        self.executable = executable or shutil.which("espeak-ng") or shutil.which("espeak")
+        if self.executable is None:
+            self.log("espeak-ng is not installed; the local TTS engine is disabled.")
+
+    def default_settings(self) -> dict:
+
+        return {**ESPEAK_EMOTION_SETTINGS["중립"], "format": "wav", "sampling_rate": 22050}
+
+    def map_emotion(self, emotion_label: str) -> dict:
+
+        return ESPEAK_EMOTION_SETTINGS.get(emotion_label, {})
+
+    async def _start(self, text: str, settings: dict) -> asyncio.subprocess.Process | None:
+        if self.executable is None:
+            return None
+
+        return await asyncio.create_subprocess_exec(
+            self.executable, "-v", self.voice, "-p", str(settings["pitch"]), "-s", str(settings["speed"]),
+            "--stdout", text,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+
+    async def synthesize(self, text: str, settings: dict) -> bytes | None:
+        process = await self._start(text, settings)
+        if process is None:
+            return None
+        audio, _ = await process.communicate()
+        if process.returncode != 0:
+            self.log(f"espeak exited with {process.returncode}")
+            return None
+
+        return self.complete_stream(audio)
+
+    def complete_stream(self, audio: bytes) -> bytes:
+        # --stdout 의 WAV 헤더는 길이를 모르는 채로 쓰여 있으므로 실제 길이로 다시 쓴다
+        with wave.open(BytesIO(audio), "rb") as wf:
+            params = wf.getparams()
+            frames = wf.readframes(wf.getnframes())
+        buffer = BytesIO()
+        with wave.open(buffer, "wb") as wf:
+            wf.setparams(params)
+            wf.writeframes(frames)
+
+        return buffer.getvalue()
+
+    async def stream(self, text: str, settings: dict) -> AsyncIterator[bytes]:
+        process = await self._start(text, settings)
+        if process is None:
+            return
+        try:
+            while chunk := await process.stdout.read(4096):
+                yield chunk
+        finally:
+            if process.returncode is None:
+                process.kill()
+            await process.wait()
@@ -0,0 +1,90 @@
+"""
+Local mock of the Naver Clova premium TTS API for offline runs and benchmarks.
+Answers POST /tts-premium/v1/tts like Clova (form data in, WAV out) with a tone whose length follows the text.
+
+Usage:
+    python -m src.audio.mock_clova_server --port 8500 --latency 0.3 --char-latency 0.005
+    CLOVA_TTS_ENDPOINT=http://127.0.0.1:8500/tts-premium/v1/tts python -m src.main
+"""
+import argparse
+import asyncio
+import os
+import random
+import wave
+from io import BytesIO
+from urllib.parse import parse_qs
+
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# 글자당 재생 길이 (초)
+SECONDS_PER_CHAR = 0.08
+
+app = FastAPI()
+app.state.latency = float(os.getenv("MOCK_TTS_LATENCY", "0.3"))
+app.state.char_latency = float(os.getenv("MOCK_TTS_CHAR_LATENCY", "0.005"))
+app.state.error_rate = float(os.getenv("MOCK_TTS_ERROR_RATE", "0"))
+
+
+def toneWav(text: str, sample_rate: int, pitch: int) -> bytes:
+    duration = max(0.2, len(text) * SECONDS_PER_CHAR)
+    t = np.arange(int(duration * sample_rate)) / sample_rate
+    frequency = 220 * 2 ** (pitch / 12)
+    samples = (0.2 * 32767 * np.sin(2 * np.pi * frequency * t)).astype(np.int16)
+
+    buffer = BytesIO()
+    with wave.open(buffer, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(samples.tobytes())
+
+    return buffer.getvalue()
+
+
+@app.post("/tts-premium/v1/tts")
+async def tts(request: Request):
+    if "X-NCP-APIGW-API-KEY-ID" not in request.headers or "X-NCP-APIGW-API-KEY" not in request.headers:
+        return JSONResponse({"error": {"errorCode": "200", "message": "Authentication Failed"}}, status_code=401)
+
+    form = {key: values[0] for key, values in parse_qs((await request.body()).decode("utf-8")).items()}
+    if "text" not in form or "speaker" not in form:
+        return JSONResponse({"error": {"errorCode": "VS01", "message": "Invalid parameter"}}, status_code=400)
+
+    text = form["text"]
+    await asyncio.sleep(app.state.latency)
+    if random.random() < app.state.error_rate:
+        return JSONResponse({"error": {"errorCode": "VS99", "message": "Internal error"}}, status_code=500)
+
+    audio = toneWav(text, int(form.get("sampling-rate", 24000)), int(form.get("pitch", 0)))
+    starts = range(0, len(audio), 16384)
+
+    async def chunks():
+        # 합성 시간(글자당 char_latency)을 청크에 나눠 가며 보낸다 (스트리밍 합성처럼)
+        for start in starts:
+            await asyncio.sleep(app.state.char_latency * len(text) / len(starts))
+            yield audio[start:start + 16384]
+
+    return StreamingResponse(chunks(), media_type="audio/wav")
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8500)
+    parser.add_argument("--latency", type=float, default=app.state.latency, help="seconds before every response")
+    parser.add_argument("--char-latency", type=float, default=app.state.char_latency, help="extra seconds per character")
+    parser.add_argument("--error-rate", type=float, default=app.state.error_rate, help="fraction of requests answered with 500")
+    args = parser.parse_args()
+
+    app.state.latency = args.latency
+    app.state.char_latency = args.char_latency
+    app.state.error_rate = args.error_rate
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
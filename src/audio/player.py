@@ -1,14 +1,20 @@
-import urllib.request
 import os
-import ssl
 import pyaudio
 import wave
 import asyncio
+from collections import deque
+from contextlib import aclosing
+from io import BytesIO
 from typing import Tuple, IO, TypedDict
 
 from ..message_event import MessageListener, MessageBroker, MessageType
 from ..async_event import AsyncListener, AsyncBroker, AsyncMessageType
+from ..lib.backpressure import BLOCK
 from ..lib.loggable import Loggable
+from .tts_backend import WaveStream, createTTSBackend
+from .tts_cache import TTSCache
+from .tts_client import CLOVA_EMOTION_VALUES
+from ..dialog_manager.emotion_groups import GROUPS
 
 class VoiceSettings(TypedDict):
     speaker: str
@@ -34,6 +40,8 @@ class ResponsePlayer(Loggable):
     # Current implementation
     # Observe events:
     # - chat_response (text | music-card)
+    # - chat_response_chunk (one sentence of a streamed text response)
+    # - chat_barge_in / chat_response_cancelled (stop playing the current response)
     # Emit events:
     # - play_response_end (id)
 
@@ -44,34 +52,41 @@ class ResponsePlayer(Loggable):
 
         self.chat_done_flag = False
 
-        # Load the environment variables
-        self._clova_client_id = os.getenv("CLOVA_TTS_CLIENT_ID")
-        self._clova_client_secret = os.getenv("CLOVA_TTS_CLIENT_SECRET")
-
-        # Set clova TTS settings
-        self._default_voice_settings = VoiceSettings(
-            speaker=os.getenv("CLOVA_SPEAKER") or "vdonghyun", # https://api.ncloud-docs.com/docs/ai-naver-clovavoice-ttspremium
-            volume=0,
-            speed=0,
-            pitch=0,
-            emotion=0,
-            emotion_strength=2,
-            format="wav",
-            sampling_rate=48000,
-        )
-
-        # Ignore SSL certificate errors
-        # TODO: This line must be removed before deployment for security reasons.
-        ssl._create_default_https_context = ssl._create_unverified_context 
+        # TTS backend ("clova" or "espeak"); the fallback is used when the backend fails or is slower than the timeout
+        self._tts = createTTSBackend(os.getenv("TTS_BACKEND", "clova"))
+        fallback = os.getenv("TTS_FALLBACK_BACKEND")
+        self._tts_fallback = createTTSBackend(fallback) if fallback else None
+        self._tts_failover_timeout = float(os.getenv("TTS_FAILOVER_TIMEOUT", "3"))
+        # 백엔드가 지원하면 이 샘플레이트로 합성
+        self._sample_rate = int(os.getenv("TTS_SAMPLE_RATE", "48000"))
+        # 합성한 문장은 (text, speaker, emotion, speed, pitch, format) 으로 캐시
+        self._tts_cache = TTSCache()
 
         # Initialize the pyaudio stream
         self.pa = pyaudio.PyAudio()
         self._stream = None
 
+        # Streamed response: sentences waiting to be played in order (each may still be arriving from the TTS)
+        self._chunk_stream = None
+        self._chunk_waves: deque[WaveStream] = deque()
+        self._chunk_final = False
+        self._chunk_frame_size = 0
+        self._chunk_format = None  # (rate, channels, sample width) of the open chunk stream
+        self._receiving: set[asyncio.Task] = set()  # TTS 스트림을 받고 있는 작업 (barge-in 때 취소)
+
+        # barge-in: 이 id 이하의 응답은 합성/재생하지 않는다
+        self._current_response_id = 0
+        self._cancelled_response_id = 0
+
         # Register event handlers
         AsyncBroker().subscribe("wait_chat_finish", self._on_wait_chat_finish)
         AsyncBroker().subscribe("chat_response", self._on_chat_response)
+        # 문장을 잃지 않도록 자리가 날 때까지 기다린다 (발행하는 쪽은 막히지 않음)
+        AsyncBroker().subscribe("chat_response_chunk", self._on_chat_response_chunk, max_queue_size=64,
+                                policy=BLOCK, timeout=30.0)
         AsyncBroker().subscribe("wake_up", self._on_wake_up)
+        AsyncBroker().subscribe("chat_barge_in", self._on_barge_in)
+        AsyncBroker().subscribe("chat_response_cancelled", self._on_response_cancelled)
     
     def _on_wait_chat_finish(self, msg: AsyncMessageType):
         print("Chat finished, closing the stream.")
@@ -83,29 +98,31 @@ class ResponsePlayer(Loggable):
             self._stream = None
             AsyncBroker().emit(("play_response_end", None))
 
-    def map_emotion_to_value(self, emotion_label: str = None) -> int:
-        emotion_value_map = {
-        "중립": 0,
-        "슬픔": 1,
-        "화남": 3,
-        "부정": 3,
-        "짜증난": 1,
-        "기쁨": 2
-        }
-
-        # Map the emotion label to its corresponding value
-        return emotion_value_map.get(emotion_label, 0)
+    def map_emotion_to_value(self, emotion_label: str | int = None) -> int:
+        # Map the emotion label (group, fine-grained label or label id) to its corresponding clova value
+        return CLOVA_EMOTION_VALUES.get(GROUPS.group_of(emotion_label), 0)
 
     async def _on_chat_response(self, response: dict):
         emotion_label = response.get('emotion', "중립")  # 기본값 중립
 
         if response.get('type') in [None, "text"]:
+            if self._is_cancelled(response):
+                return
+            if response.get('streamed'):
+                # 이미 chat_response_chunk 로 문장 단위 재생 중
+                return
+            self._current_response_id = response.get("response_id", 0)
             # 감정 분석 결과 확인
             clova_emotion = self.map_emotion_to_value(emotion_label)
             self.log(f"Emotion label: {emotion_label}, emotion value: {clova_emotion}")
             # TTS 요청에서 emotion 값 설정
-            self._make_audio(response['msg'], emotion=clova_emotion)
-            await self._play_audio("text.wav")
+            audio = await self._make_audio(response['msg'], emotion_label)
+            if self._is_cancelled(response):
+                return
+            if audio is None:
+                AsyncBroker().emit(("play_response_end", None))
+                return
+            await self._play_audio(BytesIO(audio))
         elif response.get('type') == "music-card":
             music_name = response['msg']['src']  # e.g. "eno1.wav"
             music_path = f"src/audio/assets/music/{music_name}" # e.g. "assets/music/eno1.wav"
@@ -121,6 +138,126 @@ class ResponsePlayer(Loggable):
         else:
             self.log(f"Unknown response type {response['type']}")
             AsyncBroker().emit(("play_response_end", None))
+
+    async def _on_chat_response_chunk(self, chunk: dict):
+        """
+        Synthesize one sentence of a streamed response and queue it behind the previous ones.
+        The sentence is queued as soon as the first bytes of its audio arrive, and the first chunk opens
+        the output stream, so playback starts before the first sentence is fully synthesized.
+        """
+        if self._is_cancelled(chunk):
+            return
+        if chunk["index"] == 0:
+            self._close_chunk_stream()
+            self._chunk_final = False
+        self._current_response_id = chunk.get("response_id", 0)
+
+        if chunk["final"]:
+            self._chunk_final = True
+            if self._chunk_stream is None:
+                # 재생할 문장이 하나도 없었던 경우
+                self._emit_play_end()
+            return
+
+        wf, receiving = await self._open_audio_stream(chunk['msg'], chunk.get('emotion', "중립"))
+        if wf is None:
+            return
+        if self._is_cancelled(chunk):
+            wf.close()
+            return
+
+        wf_format = (wf.framerate, wf.nchannels, wf.sampwidth)
+        if self._chunk_stream is not None and wf_format != self._chunk_format:
+            # 다른 백엔드(failover)가 만든 문장: 다 받은 뒤 열려 있는 스트림의 형식으로 변환
+            if receiving is not None:
+                await asyncio.wait([receiving])
+            try:
+                wf = wf.resampled(self._chunk_format[0], self._chunk_format[1])
+            except wave.Error as e:
+                self.log(f"Failed to convert the audio chunk {chunk['index']}: {e}")
+                return
+            if self._is_cancelled(chunk):
+                return
+        self._chunk_waves.append(wf)
+
+        if self._chunk_stream is None:
+            self._chunk_format = wf_format
+            self._chunk_frame_size = wf.frame_size
+            self._chunk_stream = self.pa.open(format=self.pa.get_format_from_width(wf.sampwidth),
+                                              channels=wf.nchannels,
+                                              rate=wf.framerate,
+                                              output=True,
+                                              frames_per_buffer=2048,
+                                              stream_callback=self._stream_chunks)
+
+    def _stream_chunks(self, in_data, frame_count, time_info, status):
+        """
+        PyAudio callback that plays the queued sentences back to back.
+        Silence is written while the next sentence (or the rest of the current one) is still being synthesized.
+        """
+        needed = frame_count * self._chunk_frame_size
+        data = b""
+        while len(data) < needed and self._chunk_waves:
+            wf = self._chunk_waves[0]
+            frames = wf.readframes(frame_count - len(data) // self._chunk_frame_size)
+            data += frames
+            if wf.drained():
+                wf.close()
+                self._chunk_waves.popleft()
+            elif not frames:
+                # 이 문장의 나머지를 아직 받는 중
+                break
+
+        if not self._chunk_waves and self._chunk_final:
+            self._emit_play_end()
+            return (data, pyaudio.paComplete)
+
+        return (data + b"\x00" * (needed - len(data)), pyaudio.paContinue)
+
+    def _close_chunk_stream(self):
+        if self._chunk_stream is not None:
+            self._chunk_stream.close()
+            self._chunk_stream = None
+        while self._chunk_waves:
+            self._chunk_waves.popleft().close()
+
+    def _is_cancelled(self, response: dict) -> bool:
+        response_id = response.get("response_id")
+
+        return response_id is not None and response_id <= self._cancelled_response_id
+
+    def _stop_output(self):
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+        self._close_chunk_stream()
+        for task in list(self._receiving):
+            task.cancel()
+
+    def _on_barge_in(self, _: AsyncMessageType[None]):
+        """
+        The user talks over the bot: stop the output right away and drop the rest of the current response.
+        Recognition is already running, so listening starts without waiting for the play end.
+        """
+        self.log("Barge-in: stop playing")
+        self._cancelled_response_id = max(self._cancelled_response_id, self._current_response_id)
+        self._stop_output()
+        AsyncBroker().emit(("chat_listening_start", None))
+
+    def _on_response_cancelled(self, msg: dict):
+        if msg["response_id"] <= self._cancelled_response_id:
+            return
+        self._cancelled_response_id = msg["response_id"]
+        if self._current_response_id == self._cancelled_response_id:
+            self._stop_output()
+
+    def _emit_play_end(self):
+        # 스트림이 끝나면 이벤트 발행
+        self.log(f"Play end (chat done: {self.chat_done_flag})")
+        if self.chat_done_flag:
+            AsyncBroker().emit(("chat_done", None))
+        else:
+            AsyncBroker().emit(("chat_listening_start", None))
     
     async def _play_audio(self, f: IO):
         """
@@ -135,12 +272,7 @@ class ResponsePlayer(Loggable):
                 data = wf.readframes(frame_count)
                 if len(data) == 0 or wf.tell() == wf.getnframes():
                     wf.close()
-                    # 스트림이 끝나면 이벤트 발행
-                    print("self.chat_done_flag", self.chat_done_flag)
-                    if self.chat_done_flag:
-                        AsyncBroker().emit(("chat_done", None))
-                    else:
-                        AsyncBroker().emit(("chat_listening_start", None))
+                    self._emit_play_end()
                     return (data, pyaudio.paComplete)
                 return (data, pyaudio.paContinue)
 
@@ -154,64 +286,87 @@ class ResponsePlayer(Loggable):
         except (FileNotFoundError, wave.Error) as e:
             self.log(f"Failed to open the audio file {f}: {e}")
 
-    def _make_audio(self, text: str, emotion: int = 0, **settings: VoiceSettings) -> None:
+    async def _open_audio_stream(
+        self, text: str, emotion_label: str = "중립"
+    ) -> tuple[WaveStream | None, asyncio.Task | None]:
         """
-        Make audio with {text} using naver clova TTS.
-        Return the bytes of the audio file.
+        Synthesize {text} with the backend's stream() and return the audio as soon as its header arrives,
+        with the task still receiving the rest (a cached sentence comes whole, with no task).
+        When the stream fails, or sends nothing within the failover timeout, the sentence is synthesized whole.
         """
+        s = self._tts.voice_settings(emotion_label, self._sample_rate)
+        wf = WaveStream()
+        header = asyncio.get_running_loop().create_future()
+        chunks = self._tts_cache.get_or_stream(text, s, self._tts.stream, self._tts.complete_stream)
+        receiving = asyncio.create_task(self._receive_audio(wf, chunks, header))
+        self._receiving.add(receiving)
+        receiving.add_done_callback(self._receiving.discard)
 
-        # Clova API auth
-        ENDPOINT = "https://naveropenapi.apigw.ntruss.com/tts-premium/v1/tts"
-        request = urllib.request.Request(ENDPOINT)
-        request.add_header("X-NCP-APIGW-API-KEY-ID", self._clova_client_id)
-        request.add_header("X-NCP-APIGW-API-KEY", self._clova_client_secret)
-
-        # Construct query
-        s = { **self._default_voice_settings }
-        s["emotion"] = emotion  # 감정 값 동적으로 설정
-        s.update(settings)
-        self.log(f"_make_audio emotion: {emotion}")
-        
-        query = f"speaker={s['speaker']}" + \
-               f"&volume={s['volume']}" + \
-               f"&speed={s['speed']}" + \
-               f"&pitch={s['pitch']}" + \
-               f"&emotion={s['emotion']}" + \
-               f"&emotion-strength	={s['emotion_strength']}" + \
-               "&format=wav" + \
-               "&sampling-rate=48000" + \
-               f"&text={urllib.parse.quote(text)}"
+        try:
+            timeout = self._tts_failover_timeout if self._tts_fallback is not None else None
+            started = await asyncio.wait_for(header, timeout)
+        except asyncio.TimeoutError:
+            self.log(f"TTS backend '{self._tts.name}' is slower than {self._tts_failover_timeout}s")
+            receiving.cancel()
+            s = self._tts_fallback.voice_settings(emotion_label, self._sample_rate)
+            audio = await self._tts_cache.get_or_synthesize(text, s, self._tts_fallback.synthesize)
+        else:
+            if started is None:
+                # barge-in 으로 취소됨
+                return None, None
+            if started:
+                return wf, (None if receiving.done() else receiving)
+            audio = await self._make_audio(text, emotion_label)
 
+        if audio is None:
+            return None, None
         try:
-            # Make the request to the API
-            response = urllib.request.urlopen(request, data=query.encode('utf-8'))
-            rescode = response.getcode()
-
-            if rescode == 200:
-                # Return the audio file as bytes
-                response_body = response.read()
-                with open('text.wav', 'wb') as f:
-                    f.write(response_body)
-                return
-            else:
-                self.log(f"Failed to synthesize speech. HTTP response code: {rescode}")
-                self.log(f"Response: {response.read()}")
-                # TODO: write empty audio to text.wav
-                return
+            return WaveStream.from_bytes(audio), None
+        except wave.Error as e:
+            self.log(f"Failed to open the audio of '{text}': {e}")
+            return None, None
 
-        except urllib.error.HTTPError as e:
-            # Log HTTPError with all the details
-            self.log(f"HTTPError occurred: {e.code} - {e.reason}")
-            self.log(f"Headers: {e.headers}")
-            self.log(f"Response: {e.read()}")
-            # TODO: write empty audio to text.wav
-            return
+    async def _receive_audio(self, wf: WaveStream, chunks, header: asyncio.Future):
+        # header: 헤더를 받으면 True, 헤더 전에 스트림이 실패하면 False, 취소되면 None
+        result = False
+        try:
+            async with aclosing(chunks):
+                async for chunk in chunks:
+                    if wf.feed(chunk) and not header.done():
+                        header.set_result(True)
+        except asyncio.CancelledError:
+            result = None
+            raise
+        except Exception as e:
+            self.log(f"TTS stream failed: {e!r}")
+        finally:
+            wf.end()
+            if not header.done():
+                header.set_result(result)
 
-        except urllib.error.URLError as e:
-            # Log URLError (e.g., failed to reach the server)
-            self.log(f"URLError occurred: {e.reason}")
-            # TODO: write empty audio to text.wav
-            return
+    async def _make_audio(self, text: str, emotion_label: str = "중립", **settings: VoiceSettings) -> bytes | None:
+        """
+        Make audio with {text} using the TTS backend (the fallback backend when it fails or is too slow).
+        Return the bytes of the audio file.
+        """
+        s = self._tts.voice_settings(emotion_label, self._sample_rate, **settings)
+        self.log(f"_make_audio emotion: {emotion_label} -> {s}")
+
+        if self._tts_fallback is None:
+            return await self._tts_cache.get_or_synthesize(text, s, self._tts.synthesize)
+
+        try:
+            audio = await asyncio.wait_for(
+                self._tts_cache.get_or_synthesize(text, s, self._tts.synthesize), self._tts_failover_timeout
+            )
+        except asyncio.TimeoutError:
+            self.log(f"TTS backend '{self._tts.name}' is slower than {self._tts_failover_timeout}s")
+            audio = None
+        if audio is None:
+            s = self._tts_fallback.voice_settings(emotion_label, self._sample_rate, **settings)
+            audio = await self._tts_cache.get_or_synthesize(text, s, self._tts_fallback.synthesize)
+
+        return audio
         
     async def _on_wake_up(self, _: tuple[str, None]):
         self.log("Wake Up")
@@ -221,4 +376,10 @@ class ResponsePlayer(Loggable):
         await self._play_audio(sound_path)
 
     def stop(self):
+        self.log(self._tts_cache.summary())
+        self._close_chunk_stream()
+        # TTS 클라이언트는 브로커 루프에서 만들어졌으므로 그 루프에서 닫는다
+        asyncio.run_coroutine_threadsafe(self._tts.aclose(), AsyncBroker()._loop)
+        if self._tts_fallback is not None:
+            asyncio.run_coroutine_threadsafe(self._tts_fallback.aclose(), AsyncBroker()._loop)
         self.pa.terminate()
\ No newline at end of file
@@ -0,0 +1,222 @@
+import os
+import struct
+import threading
+import wave
+from io import BytesIO
+from typing import AsyncIterator
+
+import numpy as np
+
+from ..dialog_manager.emotion_groups import GROUPS
+from ..lib.loggable import Loggable
+
+
+class TTSBackend(Loggable):
+    """
+    Interface of a speech synthesis engine used by ResponsePlayer.
+    - voice_settings(): the engine's settings for an emotion label, at a negotiated sample rate
+    - synthesize(): the whole WAV file as bytes (None on failure)
+    - stream(): the bytes of the WAV file as they are produced
+    - complete_stream(): the WAV file to keep (cache) once every streamed byte was received
+    """
+
+    name = ""
+    sample_rates: tuple[int, ...] = ()
+
+    def __init__(self):
+        Loggable.__init__(self)
+        self.set_tag(f"tts_{self.name}")
+
+    def default_settings(self) -> dict:
+
+        return {"sampling_rate": self.sample_rates[-1]}
+
+    def map_emotion(self, emotion_label: str) -> dict:
+        """
+        Settings that express {emotion_label} (one of the EmotionAnalyzer groups) with this engine.
+        """
+
+        return {}
+
+    def negotiate_sample_rate(self, preferred: int) -> int:
+        """
+        {preferred} if the engine supports it, else the lowest supported rate above it, else the highest one.
+        """
+        if preferred in self.sample_rates:
+            return preferred
+        higher = [rate for rate in self.sample_rates if rate > preferred]
+
+        return min(higher) if higher else max(self.sample_rates)
+
+    def voice_settings(self, emotion_label: str = "중립", sample_rate: int | None = None, **overrides) -> dict:
+        # 세부 감정 이름이 와도 그룹으로 바꿔서 적용
+        settings = {**self.default_settings(), **self.map_emotion(GROUPS.group_of(emotion_label))}
+        settings["sampling_rate"] = self.negotiate_sample_rate(sample_rate or settings["sampling_rate"])
+        settings["backend"] = self.name
+        settings.update(overrides)
+
+        return settings
+
+    async def synthesize(self, text: str, settings: dict) -> bytes | None:
+        raise NotImplementedError
+
+    async def stream(self, text: str, settings: dict) -> AsyncIterator[bytes]:
+        audio = await self.synthesize(text, settings)
+        if audio:
+            yield audio
+
+    def complete_stream(self, audio: bytes) -> bytes:
+
+        return audio
+
+    async def aclose(self):
+        pass
+
+
+def createTTSBackend(name: str) -> TTSBackend:
+    """
+    name: "clova" (Naver Clova premium API, or the mock server at CLOVA_TTS_ENDPOINT) or "espeak" (local CPU engine).
+    """
+    if name == "clova":
+        from .tts_client import ClovaTTSClient
+        return ClovaTTSClient(os.getenv("CLOVA_TTS_CLIENT_ID"), os.getenv("CLOVA_TTS_CLIENT_SECRET"))
+    if name == "espeak":
+        from .espeak_tts import EspeakTTSBackend
+        return EspeakTTSBackend()
+
+    raise ValueError(f"Unknown TTS backend '{name}'")
+
+
+class WaveStream:
+    """
+    A WAV file played while its bytes are still arriving from TTSBackend.stream().
+    feed() and end() are called on the event loop, readframes() from the PyAudio callback thread.
+    The data chunk is read until end(), since a streamed header does not know its length.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._header = bytearray()  # data 청크가 시작되기 전까지 받은 바이트
+        self._buffer = bytearray()  # 아직 재생하지 않은 PCM
+        self.framerate = 0
+        self.nchannels = 0
+        self.sampwidth = 0
+        self.ready = False  # 헤더를 다 읽었는지 (재생을 시작할 수 있는지)
+        self.ended = False
+
+    @classmethod
+    def from_bytes(cls, audio: bytes) -> "WaveStream":
+        wave_stream = cls()
+        wave_stream.feed(audio)
+        wave_stream.end()
+        if not wave_stream.ready:
+            raise wave.Error("incomplete WAV header")
+
+        return wave_stream
+
+    @property
+    def frame_size(self) -> int:
+
+        return self.nchannels * self.sampwidth
+
+    def feed(self, chunk: bytes) -> bool:
+        """
+        Add received bytes. Return True once the header is read.
+        """
+        if self.ready:
+            with self._lock:
+                self._buffer += chunk
+        else:
+            self._header += chunk
+            self._parse_header()
+
+        return self.ready
+
+    def end(self):
+        self.ended = True
+
+    def readframes(self, n: int) -> bytes:
+        """
+        Up to {n} frames of what has been received so far (b"" while waiting for more).
+        """
+        with self._lock:
+            size = min(n * self.frame_size, len(self._buffer) - len(self._buffer) % self.frame_size)
+            data = bytes(self._buffer[:size])
+            del self._buffer[:size]
+
+        return data
+
+    def drained(self) -> bool:
+        with self._lock:
+            return self.ended and len(self._buffer) < self.frame_size
+
+    def close(self):
+        with self._lock:
+            self._buffer.clear()
+        self.ended = True
+
+    def resampled(self, sample_rate: int, channels: int) -> "WaveStream":
+        """
+        The whole (ended) file converted with resampleWav().
+        """
+        buffer = BytesIO()
+        with wave.open(buffer, "wb") as wf:
+            wf.setnchannels(self.nchannels)
+            wf.setsampwidth(self.sampwidth)
+            wf.setframerate(self.framerate)
+            with self._lock:
+                wf.writeframes(bytes(self._buffer))
+
+        return WaveStream.from_bytes(resampleWav(buffer.getvalue(), sample_rate, channels))
+
+    def _parse_header(self):
+        header = self._header
+        if len(header) < 12:
+            return
+        if header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+            raise wave.Error("not a WAV file")
+
+        offset = 12
+        while offset + 8 <= len(header):
+            chunk_id = bytes(header[offset:offset + 4])
+            size = int.from_bytes(header[offset + 4:offset + 8], "little")
+            if chunk_id == b"data":
+                if not self.frame_size:
+                    raise wave.Error("data chunk before the fmt chunk")
+                with self._lock:
+                    self._buffer += header[offset + 8:]
+                self._header = bytearray()
+                self.ready = True
+                return
+            if offset + 8 + size > len(header):
+                # 청크가 아직 다 오지 않음
+                return
+            if chunk_id == b"fmt ":
+                _, self.nchannels, self.framerate, _, _, bits = struct.unpack_from("<HHIIHH", header, offset + 8)
+                self.sampwidth = (bits + 7) // 8
+            offset += 8 + size + (size & 1)
+
+
+def resampleWav(audio: bytes, sample_rate: int, channels: int) -> bytes:
+    """
+    Convert a 16-bit WAV file to {sample_rate} and {channels}, so it can be queued on an open output stream.
+    """
+    with wave.open(BytesIO(audio), "rb") as wf:
+        if wf.getsampwidth() != 2:
+            raise wave.Error("only 16-bit audio can be converted")
+        src_rate, src_channels = wf.getframerate(), wf.getnchannels()
+        samples = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16).reshape(-1, src_channels)
+
+    mono = samples.astype(np.float32).mean(axis=1)
+    n_out = int(len(mono) * sample_rate / src_rate)
+    resampled = np.interp(np.linspace(0, len(mono) - 1, n_out), np.arange(len(mono)), mono) if len(mono) else mono
+    frames = np.repeat(resampled[:, None], channels, axis=1).astype(np.int16)
+
+    buffer = BytesIO()
+    with wave.open(buffer, "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(frames.tobytes())
+
+    return buffer.getvalue()
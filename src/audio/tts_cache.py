@@ -0,0 +1,320 @@
+"""
+Content-addressed cache of synthesized speech.
+
+Usage (prewarm):
+    python -m src.audio.tts_cache --sentences 50 --emotions 중립 기쁨 슬픔 화남
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import AsyncIterator, Awaitable, Callable
+
+TTS_CACHE_DIR = "./src/audio/tts_cache"
+# 같은 문장이라도 이 설정이 다르면 다른 오디오가 된다
+KEY_FIELDS = ("backend", "speaker", "emotion", "speed", "pitch", "format", "sampling_rate")
+
+
+class TTSCache:
+    """
+    Two tiers, both bounded in bytes and evicted least-recently-used first:
+    - memory: OrderedDict of key -> audio bytes
+    - disk: one file per key in {directory}, written atomically; mtime is the recency
+    Counts memory/disk hits and misses and the lookup latency of hits and misses.
+    """
+
+    def __init__(self, memory_bytes: int | None = None, disk_bytes: int | None = None, directory: str | None = None):
+        self.memory_bytes = int(float(os.getenv("TTS_CACHE_MEMORY_MB", "32")) * 2**20) if memory_bytes is None else memory_bytes
+        self.disk_bytes = int(float(os.getenv("TTS_CACHE_DISK_MB", "256")) * 2**20) if disk_bytes is None else disk_bytes
+        self.directory = directory or os.getenv("TTS_CACHE_DIR", TTS_CACHE_DIR)
+
+        self._lock = threading.Lock()
+        self._memory: OrderedDict[str, bytes] = OrderedDict()
+        self._memory_size = 0
+        self._disk: OrderedDict[str, int] = OrderedDict()  # key -> file size
+        self._disk_size = 0
+        if self.disk_bytes > 0:
+            self._loadDiskIndex()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._hit_time = 0.0
+        self._miss_time = 0.0
+        # 백그라운드에서 디스크에 쓰는 중인 작업 (끝날 때까지 참조를 잡아 둔다)
+        self._writes: set[asyncio.Task] = set()
+
+    @staticmethod
+    def key(text: str, settings: dict) -> str:
+        fields = {name: settings.get(name) for name in KEY_FIELDS}
+        fields["text"] = text
+
+        return hashlib.sha256(json.dumps(fields, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> bytes | None:
+        audio = self._getMemory(key)
+        if audio is None:
+            audio = self._getDisk(key)
+
+        return audio
+
+    def put(self, key: str, audio: bytes):
+        self._putMemory(key, audio)
+        self._writeDisk(key, audio)
+
+    async def get_or_synthesize(
+        self, text: str, settings: dict, synthesize: Callable[[str, dict], Awaitable[bytes | None]]
+    ) -> bytes | None:
+        """
+        Return the cached audio of {text} with {settings}, or synthesize it and cache the result.
+        """
+        start = time.perf_counter()
+        key = self.key(text, settings)
+        audio = await self._lookup(key, start)
+        if audio is not None:
+            return audio
+
+        audio = await synthesize(text, settings)
+        if audio is not None:
+            self._store(key, audio)
+        with self._lock:
+            self._miss_time += time.perf_counter() - start
+
+        return audio
+
+    async def get_or_stream(
+        self,
+        text: str,
+        settings: dict,
+        stream: Callable[[str, dict], AsyncIterator[bytes]],
+        complete: Callable[[bytes], bytes] | None = None,
+    ) -> AsyncIterator[bytes]:
+        """
+        Yield the cached audio of {text} with {settings} as one chunk, or the chunks of {stream} as they arrive.
+        Once the stream is complete, the whole file ({complete} of the joined chunks) is cached.
+        """
+        start = time.perf_counter()
+        key = self.key(text, settings)
+        audio = await self._lookup(key, start)
+        if audio is not None:
+            yield audio
+            return
+
+        chunks = []
+        try:
+            async for chunk in stream(text, settings):
+                chunks.append(chunk)
+                yield chunk
+            if chunks:
+                audio = b"".join(chunks)
+                self._store(key, complete(audio) if complete else audio)
+        finally:
+            # 끝까지 받지 못한 스트림은 캐시하지 않는다
+            with self._lock:
+                self._miss_time += time.perf_counter() - start
+
+    async def flush(self):
+        """
+        Wait for the background disk writes.
+        """
+        while self._writes:
+            await asyncio.gather(*self._writes, return_exceptions=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "hit_latency_ms": self._hit_time / hits * 1000 if hits else 0.0,
+                "miss_latency_ms": self._miss_time / self.misses * 1000 if self.misses else 0.0,
+                "memory_bytes": self._memory_size,
+                "disk_bytes": self._disk_size,
+            }
+
+    def summary(self) -> str:
+        s = self.stats()
+
+        return (
+            f"TTS cache hit rate {s['hit_rate']:.1%} (memory {s['memory_hits']}, disk {s['disk_hits']}, miss {s['misses']}),"
+            f" hit {s['hit_latency_ms']:.1f} ms / miss {s['miss_latency_ms']:.1f} ms,"
+            f" memory {s['memory_bytes'] / 2**20:.1f} MB, disk {s['disk_bytes'] / 2**20:.1f} MB"
+        )
+
+    async def _lookup(self, key: str, start: float) -> bytes | None:
+        audio = self._getMemory(key)
+        if audio is None and key in self._disk:
+            # 디스크 읽기는 이벤트 루프 밖에서
+            audio = await asyncio.to_thread(self._getDisk, key)
+        with self._lock:
+            if audio is not None:
+                self._hit_time += time.perf_counter() - start
+            else:
+                self.misses += 1
+
+        return audio
+
+    def _store(self, key: str, audio: bytes):
+        # 메모리에만 넣고 바로 재생한다. 디스크 쓰기는 백그라운드에서
+        self._putMemory(key, audio)
+        self._writeLater(key, audio)
+
+    def _getMemory(self, key: str) -> bytes | None:
+        with self._lock:
+            audio = self._memory.get(key)
+            if audio is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+
+        return audio
+
+    def _getDisk(self, key: str) -> bytes | None:
+        audio = self._readDisk(key)
+        if audio is not None:
+            with self._lock:
+                self.disk_hits += 1
+            self._putMemory(key, audio)
+
+        return audio
+
+    def _putMemory(self, key: str, audio: bytes):
+        if len(audio) > self.memory_bytes:
+            return
+        with self._lock:
+            if key in self._memory:
+                self._memory_size -= len(self._memory.pop(key))
+            self._memory[key] = audio
+            self._memory_size += len(audio)
+            while self._memory_size > self.memory_bytes:
+                _, old = self._memory.popitem(last=False)
+                self._memory_size -= len(old)
+
+    def _path(self, key: str) -> str:
+
+        return os.path.join(self.directory, key)
+
+    def _loadDiskIndex(self):
+        os.makedirs(self.directory, exist_ok=True)
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and len(entry.name) == 64:
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name, stat.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_size += size
+        self._evictDisk()
+
+    def _readDisk(self, key: str) -> bytes | None:
+        with self._lock:
+            if key not in self._disk:
+                return None
+            self._disk.move_to_end(key)
+        try:
+            with open(self._path(key), "rb") as f:
+                audio = f.read()
+            os.utime(self._path(key))
+        except OSError:
+            with self._lock:
+                self._disk_size -= self._disk.pop(key, 0)
+            return None
+
+        return audio
+
+    def _writeLater(self, key: str, audio: bytes):
+        if self.disk_bytes <= 0 or len(audio) > self.disk_bytes:
+            return
+        task = asyncio.create_task(asyncio.to_thread(self._writeDisk, key, audio))
+        self._writes.add(task)
+        task.add_done_callback(self._onWritten)
+
+    def _onWritten(self, task: asyncio.Task):
+        self._writes.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            # 디스크에 못 써도 메모리에는 있으므로 재생에는 지장 없다
+            print(f"[TTSCache] failed to write to disk: {task.exception()}")
+
+    def _writeDisk(self, key: str, audio: bytes):
+        if self.disk_bytes <= 0 or len(audio) > self.disk_bytes:
+            return
+        # 임시 파일에 쓰고 rename: 동시에 같은 키를 써도 읽는 쪽은 완성된 파일만 본다
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(audio)
+        os.replace(tmp_path, self._path(key))
+
+        with self._lock:
+            self._disk_size += len(audio) - self._disk.pop(key, 0)
+            self._disk[key] = len(audio)
+            self._evictDisk()
+
+    def _evictDisk(self):
+        while self._disk_size > self.disk_bytes and self._disk:
+            key, size = self._disk.popitem(last=False)
+            self._disk_size -= size
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+
+def prewarmPhrases(limit: int, responses: int = 1000, min_count: int = 2) -> list[str]:
+    """
+    The {limit} sentences the bot said most often in the conversation history, counted over its
+    {responses} most frequent responses and split like the streamed responses, so they hit the same keys.
+    Sentences said fewer than {min_count} times are left out.
+    """
+    from ..dialog_manager.chatbot import splitSentences
+    from ..lib.DB import getFrequentMessages, initialize
+
+    initialize()
+    counts = Counter()
+    for CONTENT, COUNT in getFrequentMessages("CUMPAR", responses):
+        sentences, rest = splitSentences(CONTENT)
+        for sentence in sentences + ([rest.strip()] if rest.strip() else []):
+            counts[sentence] += COUNT
+
+    return [sentence for sentence, count in counts.most_common(limit) if count >= min_count]
+
+
+async def prewarm(phrases: list[str], emotions: list[str]) -> TTSCache:
+    from .tts_backend import createTTSBackend
+
+    cache = TTSCache()
+    backend = createTTSBackend(os.getenv("TTS_BACKEND", "clova"))
+    sample_rate = int(os.getenv("TTS_SAMPLE_RATE", "48000"))
+    for phrase in phrases:
+        for emotion in emotions:
+            settings = backend.voice_settings(emotion, sample_rate)
+            if await cache.get_or_synthesize(phrase, settings, backend.synthesize) is None:
+                print(f"[TTSCache] failed to synthesize: {phrase}")
+    await cache.flush()
+    await backend.aclose()
+
+    return cache
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sentences", type=int, default=50, help="prewarm the N sentences the bot said most often")
+    parser.add_argument("--min-count", type=int, default=2, help="skip sentences said fewer times")
+    parser.add_argument("--emotions", nargs="+", default=["중립"], help="emotion labels to synthesize")
+    args = parser.parse_args()
+
+    phrases = prewarmPhrases(args.sentences, min_count=args.min_count)
+    print(f"prewarming {len(phrases)} phrases x {len(args.emotions)} emotions")
+    cache = asyncio.run(prewarm(phrases, args.emotions))
+    print(cache.summary())
+
+
+if __name__ == "__main__":
+    main()
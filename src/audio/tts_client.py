@@ -0,0 +1,144 @@
+import asyncio
+import os
+from typing import AsyncIterator
+
+import httpx
+
+from .tts_backend import TTSBackend
+
+CLOVA_TTS_ENDPOINT = "https://naveropenapi.apigw.ntruss.com/tts-premium/v1/tts"
+# EmotionAnalyzer 감정 그룹 -> clova emotion 값 (0 중립, 1 슬픔, 2 기쁨, 3 분노)
+CLOVA_EMOTION_VALUES = {
+    "중립": 0,
+    "슬픔": 1,
+    "화남": 3,
+    "부정": 3,
+    "짜증난": 1,
+    "기쁨": 2,
+}
+
+
+def defaultVoiceSettings() -> dict:
+    """
+    Clova TTS voice settings used for every response unless overridden.
+    """
+
+    return dict(
+        speaker=os.getenv("CLOVA_SPEAKER") or "vdonghyun", # https://api.ncloud-docs.com/docs/ai-naver-clovavoice-ttspremium
+        volume=0,
+        speed=0,
+        pitch=0,
+        emotion=0,
+        emotion_strength=2,
+        format="wav",
+        sampling_rate=48000,
+    )
+
+
+class ClovaTTSClient(TTSBackend):
+    """
+    Async client of the Naver Clova premium TTS API (or of the mock server, with CLOVA_TTS_ENDPOINT).
+    - one pooled keep-alive connection (httpx.AsyncClient), created in the loop that first uses it
+    - connect/read timeouts and retries with backoff on network errors, 429 and 5xx
+    - the audio is returned as bytes; nothing is written to disk
+    """
+
+    name = "clova"
+    sample_rates = (8000, 16000, 24000, 48000)
+    RETRY_STATUS = {429, 500, 502, 503, 504}
+
+    def __init__(
+        self,
+        client_id: str | None,
+        client_secret: str | None,
+        endpoint: str | None = None,
+        timeout: float | None = None,
+        retries: int | None = None,
+        backoff: float = 0.2,
+    ):
+        TTSBackend.__init__(self)
+
+        self.endpoint = endpoint or os.getenv("CLOVA_TTS_ENDPOINT", CLOVA_TTS_ENDPOINT)
+        self.timeout = timeout or float(os.getenv("TTS_TIMEOUT", "10"))
+        self.retries = int(os.getenv("TTS_RETRIES", "2")) if retries is None else retries
+        self.backoff = backoff
+        # 인증서 검증 (자체 서명 인증서를 쓰는 사내 프록시 등에서만 끈다)
+        self.verify = os.getenv("CLOVA_TLS_VERIFY", "True").lower() == "true"
+        self._headers = {
+            "X-NCP-APIGW-API-KEY-ID": client_id or "",
+            "X-NCP-APIGW-API-KEY": client_secret or "",
+        }
+        self._client = None
+
+    def _getClient(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                headers=self._headers,
+                timeout=httpx.Timeout(self.timeout, connect=3.0),
+                limits=httpx.Limits(max_connections=4, max_keepalive_connections=4, keepalive_expiry=60),
+                verify=self.verify,
+            )
+
+        return self._client
+
+    def default_settings(self) -> dict:
+
+        return defaultVoiceSettings()
+
+    def map_emotion(self, emotion_label: str) -> dict:
+
+        return {"emotion": CLOVA_EMOTION_VALUES.get(emotion_label, 0)}
+
+    def _formData(self, text: str, settings: dict) -> dict:
+
+        return {
+            "speaker": settings["speaker"],
+            "volume": settings["volume"],
+            "speed": settings["speed"],
+            "pitch": settings["pitch"],
+            "emotion": settings["emotion"],
+            "emotion-strength": settings["emotion_strength"],
+            "format": settings.get("format", "wav"),
+            "sampling-rate": settings.get("sampling_rate", 48000),
+            "text": text,
+        }
+
+    async def synthesize(self, text: str, settings: dict) -> bytes | None:
+        """
+        Synthesize {text} with the voice {settings} and return the audio file as bytes (None on failure).
+        """
+        data = self._formData(text, settings)
+
+        for attempt in range(self.retries + 1):
+            try:
+                response = await self._getClient().post(self.endpoint, data=data)
+            except httpx.HTTPError as e:
+                self.log(f"TTS request failed ({attempt + 1}/{self.retries + 1}): {e!r}")
+            else:
+                if response.status_code == 200:
+                    return response.content
+                self.log(f"Failed to synthesize speech. HTTP response code: {response.status_code}")
+                self.log(f"Response: {response.text}")
+                if response.status_code not in self.RETRY_STATUS:
+                    return None
+
+            if attempt < self.retries:
+                await asyncio.sleep(self.backoff * 2 ** attempt)
+
+        return None
+
+    async def stream(self, text: str, settings: dict) -> AsyncIterator[bytes]:
+        """
+        Yield the audio file as it is received (no retries once bytes were yielded).
+        """
+        async with self._getClient().stream("POST", self.endpoint, data=self._formData(text, settings)) as response:
+            if response.status_code != 200:
+                self.log(f"Failed to synthesize speech. HTTP response code: {response.status_code}")
+                return
+            async for chunk in response.aiter_bytes():
+                yield chunk
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
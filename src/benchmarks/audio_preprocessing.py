@@ -0,0 +1,95 @@
+"""
+Per-utterance preprocessing before Whisper, without the model: the old list of re-encoded frames + WAV container
+(decoded back to float32 like faster-whisper does) vs frames written into the preallocated PCMBuffer.
+
+Usage:
+    python -m src.benchmarks.audio_preprocessing --seconds 1 5 15 --utterances 50
+"""
+import argparse
+import time
+import tracemalloc
+import wave
+from io import BytesIO
+
+import numpy as np
+
+from ..lib.pcm_buffer import PCMBuffer
+
+SAMPLE_RATE = 16000
+FRAME = 320  # 20ms
+
+
+def frames(seconds: float) -> list[bytes]:
+    rng = np.random.default_rng(0)
+    samples = (rng.standard_normal(int(seconds * SAMPLE_RATE)) * 3000).astype(np.int16)
+
+    return [samples[i:i + FRAME].tobytes() for i in range(0, len(samples) - FRAME + 1, FRAME)]
+
+
+def wav_path(chunks: list[bytes]) -> np.ndarray:
+    # 이전 인식기: 프레임마다 int16 -> float32 -> int16 bytes 로 리스트에 쌓고, 끝나면 WAV 로 감싼다
+    audio_buffer = []
+    for chunk in chunks:
+        audio_data = np.frombuffer(chunk, dtype=np.int16).astype(np.float32) / 32767.0
+        audio_buffer.append((audio_data * 32767).astype(np.int16).tobytes())
+    pcm_data = b"".join(audio_buffer)
+
+    wav_buffer = BytesIO()
+    with wave.open(wav_buffer, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(SAMPLE_RATE)
+        wav_file.writeframes(pcm_data)
+    wav_buffer.seek(0)
+
+    # faster-whisper 가 파일 입력을 float32 로 디코딩하는 부분
+    with wave.open(wav_buffer, "rb") as wav_file:
+        data = wav_file.readframes(wav_file.getnframes())
+
+    return np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def buffer_path(chunks: list[bytes], buffer: PCMBuffer) -> np.ndarray:
+    buffer.clear()
+    for chunk in chunks:
+        buffer.write(chunk)
+
+    return buffer.view()
+
+
+def measure(utterances: int, fn) -> tuple[float, int]:
+    """
+    (seconds per utterance, peak bytes allocated while preprocessing one utterance)
+    """
+    fn()
+    start = time.perf_counter()
+    for _ in range(utterances):
+        fn()
+    elapsed = (time.perf_counter() - start) / utterances
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, nargs="+", default=[1, 5, 15])
+    parser.add_argument("--utterances", type=int, default=50)
+    args = parser.parse_args()
+
+    buffer = PCMBuffer(int(max(args.seconds) * SAMPLE_RATE))
+    print(f"{'utterance':>10} {'path':>8} {'ms/utt':>9} {'peak KB':>9}")
+    for seconds in args.seconds:
+        chunks = frames(seconds)
+        assert np.allclose(wav_path(chunks), buffer_path(chunks, buffer), atol=1e-4)
+        for name, fn in (("wav", lambda: wav_path(chunks)), ("buffer", lambda: buffer_path(chunks, buffer))):
+            elapsed, peak = measure(args.utterances, fn)
+            print(f"{seconds:>9.1f}s {name:>8} {elapsed * 1000:>9.3f} {peak / 1024:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Insert and read thousands of conversation turns: per-row connections (old access pattern)
+vs the pooled WAL database with the group-commit writer thread.
+
+Usage:
+    python -m src.benchmarks.db_history --turns 2000
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+from ..lib import DB
+
+SPEAKERS = ("MODE_TURN", "USER_KEYBOARD", "CUMPAR")
+
+
+def rows(turns: int):
+    for turn in range(turns):
+        for speaker in SPEAKERS:
+            yield speaker, f"{turn} 요즘 일이 많아서 좀 지쳤어요.", turn * 1000, turn * 1000 + 500
+
+
+LEGACY_CREATE = """
+    CREATE TABLE IF NOT EXISTS history (
+        ID INTEGER PRIMARY KEY AUTOINCREMENT,
+        SPEAKER TEXT NOT NULL,
+        CONTENT TEXT NOT NULL,
+        START_TIME INTEGER NOT NULL,
+        END_TIME INTEGER NOT NULL
+    )
+"""
+LEGACY_INSERT = "INSERT INTO history (SPEAKER, CONTENT, START_TIME, END_TIME) VALUES (?, ?, ?, ?)"
+LEGACY_SELECT = "SELECT SPEAKER, CONTENT, START_TIME, END_TIME FROM history"
+
+
+def per_row_connections(path: str, turns: int) -> tuple[float, float]:
+    conn = sqlite3.connect(path)
+    conn.execute(LEGACY_CREATE)
+    conn.commit()
+    conn.close()
+
+    start = time.perf_counter()
+    for row in rows(turns):
+        conn = sqlite3.connect(path)
+        conn.execute(LEGACY_INSERT, row)
+        conn.commit()
+        conn.close()
+    insert_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(turns // 100 or 1):
+        conn = sqlite3.connect(path)
+        conn.execute(LEGACY_SELECT).fetchall()
+        conn.close()
+    read_time = (time.perf_counter() - start) / (turns // 100 or 1)
+
+    return insert_time, read_time
+
+
+def pooled_database(path: str, turns: int) -> tuple[float, float, float]:
+    DB.initialize(path)
+    session_id = DB.createSession("benchmark")
+
+    start = time.perf_counter()
+    for row in rows(turns):
+        DB.addMessage(session_id, *row)
+    enqueue_time = time.perf_counter() - start
+    DB.getDatabase().flush()
+    insert_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(turns // 100 or 1):
+        DB.getHistory(session_id)
+    read_time = (time.perf_counter() - start) / (turns // 100 or 1)
+
+    return enqueue_time, insert_time, read_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=2000)
+    args = parser.parse_args()
+    n_rows = args.turns * len(SPEAKERS)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        insert_time, read_time = per_row_connections(os.path.join(tmp, "per_row.db"), args.turns)
+        print(f"per-row connections  insert {n_rows} rows {insert_time * 1000:9.1f} ms"
+              f" ({n_rows / insert_time:9.0f} rows/s), read all {read_time * 1000:7.1f} ms")
+
+        enqueue_time, insert_time, read_time = pooled_database(os.path.join(tmp, "pooled.db"), args.turns)
+        print(f"pooled WAL writer    insert {n_rows} rows {insert_time * 1000:9.1f} ms"
+              f" ({n_rows / insert_time:9.0f} rows/s), read all {read_time * 1000:7.1f} ms,"
+              f" caller blocked {enqueue_time / n_rows * 1e6:5.1f} us/row")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Emotion analysis on the CPU: one sentence per forward pass with the fp32 model (old path) vs the int8 model,
+and the EmotionService under concurrent requests (micro-batching) and with repeated sentences (cache).
+Downloads the klue-bert model on the first run.
+
+Usage:
+    python -m src.benchmarks.emotion --sentences 64 --concurrency 1 4 16 --threads 4
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+SENTENCES = [
+    "요즘 일이 많아서 좀 지쳤어요.",
+    "오늘 친구랑 맛있는 걸 먹어서 기분이 좋아요.",
+    "왜 자꾸 나한테만 이런 일이 생기는지 모르겠어.",
+    "내일 발표가 있어서 너무 떨려요.",
+    "그냥 그랬어요. 특별한 일은 없었어요.",
+    "산책하고 오니까 마음이 편안해졌어요.",
+    "버스를 놓쳐서 정말 짜증났어요.",
+    "가족들이 보고 싶어요.",
+]
+
+
+def sentences(n: int) -> list[str]:
+    # 캐시에 걸리지 않도록 모두 다른 문장
+    return [f"{SENTENCES[i % len(SENTENCES)]} ({i})" for i in range(n)]
+
+
+def sequential(analyzer, texts: list[str]) -> tuple[float, float]:
+    """
+    (sentences/s, p50 latency)
+    """
+    latencies = []
+    start = time.perf_counter()
+    for text in texts:
+        t = time.perf_counter()
+        analyzer.analyze_emotion(text)
+        latencies.append(time.perf_counter() - t)
+
+    return len(texts) / (time.perf_counter() - start), float(np.median(latencies))
+
+
+def concurrent(service, texts: list[str], concurrency: int) -> tuple[float, float, float]:
+    """
+    (sentences/s, p50 latency, p95 latency) with {concurrency} callers
+    """
+    def call(text):
+        t = time.perf_counter()
+        service.submit(text).result()
+        return time.perf_counter() - t
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        latencies = list(pool.map(call, texts))
+
+    return len(texts) / (time.perf_counter() - start), float(np.median(latencies)), float(np.percentile(latencies, 95))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sentences", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--threads", type=int, default=0, help="torch.set_num_threads (0 = torch default)")
+    args = parser.parse_args()
+    if args.threads:
+        os.environ["EMOTION_NUM_THREADS"] = str(args.threads)
+
+    from ..dialog_manager.emotion_service import EmotionService
+    from ..dialog_manager.hugging_face_transformers_emotion import EmotionAnalyzer
+
+    print(f"{'path':>22} {'sent/s':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    for backend in ("fp32", "int8"):
+        analyzer = EmotionAnalyzer(backend=backend)
+        analyzer.analyze_emotion(SENTENCES[0])
+        throughput, p50 = sequential(analyzer, sentences(args.sentences))
+        print(f"{'sequential ' + backend:>22} {throughput:>8.1f} {p50 * 1000:>8.1f} {'':>8}")
+
+    os.environ["EMOTION_BACKEND"] = "int8"
+    service = EmotionService()
+    service.submit(SENTENCES[0]).result()
+    for concurrency in args.concurrency:
+        texts = [f"{text} c{concurrency}" for text in sentences(args.sentences)]
+        throughput, p50, p95 = concurrent(service, texts, concurrency)
+        print(f"{f'service x{concurrency}':>22} {throughput:>8.1f} {p50 * 1000:>8.1f} {p95 * 1000:>8.1f}")
+
+    throughput, p50, p95 = concurrent(service, SENTENCES * (args.sentences // len(SENTENCES)), 1)
+    print(f"{'service cached':>22} {throughput:>8.1f} {p50 * 1000:>8.1f} {p95 * 1000:>8.1f}")
+    print(service.stats())
+
+
+if __name__ == "__main__":
+    main()
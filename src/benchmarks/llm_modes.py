@@ -0,0 +1,82 @@
+"""
+Latency comparison of the LLM execution modes against the stub LLM.
+
+Usage:
+    python -m src.benchmarks.llm_modes --turns 20 --latency 0.5 --token-interval 0.02
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from ..dialog_manager.chain_registry import ChainRegistry
+from ..dialog_manager.chatbot import executeChatbot
+from ..dialog_manager.llm_chatgpt import buildPhaseManager, getTestSettingData
+from ..dialog_manager.speculation import ActionPredictor, SpeculationStats
+
+HISTORY = "\n[Greeting]\nCUMPAR: 안녕하세요. 오늘 기분은 어떠세요?\nUSER_KEYBOARD: 요즘 일이 많아서 좀 지쳤어요."
+
+
+def percentile(values: list[float], p: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_mode(mode: str, turns: int) -> tuple[list[float], list[float]]:
+    """
+    Run {turns} turns in {mode} and return the turn latencies and the time-to-first-sentence latencies.
+    """
+    data = getTestSettingData()
+    phase_manager = buildPhaseManager(data)
+    chains = ChainRegistry()
+    predictor = ActionPredictor()
+    stats = SpeculationStats([phase.name for phase in data.phases])
+    turn_latencies = []
+    first_sentence_latencies = []
+
+    for _ in range(turns):
+        start = time.perf_counter()
+        first_sentence = None
+
+        async def on_sentence(sentence: str):
+            nonlocal first_sentence
+            if first_sentence is None:
+                first_sentence = time.perf_counter() - start
+
+        await executeChatbot(
+            chains, phase_manager, HISTORY, on_sentence=on_sentence, mode=mode, predictor=predictor, stats=stats
+        )
+        turn_latencies.append(time.perf_counter() - start)
+        first_sentence_latencies.append(first_sentence)
+
+    await chains.aclose()
+    return turn_latencies, first_sentence_latencies
+
+
+def report(mode: str, name: str, values: list[float]):
+    print(f"{mode:12s} {name:16s} mean {statistics.mean(values) * 1000:8.1f} ms"
+          f"  p50 {percentile(values, 50) * 1000:8.1f} ms"
+          f"  p95 {percentile(values, 95) * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.5, help="stub time to first token (s)")
+    parser.add_argument("--token-interval", type=float, default=0.02, help="stub time between tokens (s)")
+    args = parser.parse_args()
+
+    os.environ["LLM_BACKEND"] = "stub"
+    os.environ["LLM_STUB_LATENCY"] = str(args.latency)
+    os.environ["LLM_STUB_TOKEN_INTERVAL"] = str(args.token_interval)
+
+    for mode in ("two_call", "speculative", "single_call"):
+        turn_latencies, first_sentence_latencies = asyncio.run(run_mode(mode, args.turns))
+        report(mode, "turn", turn_latencies)
+        report(mode, "first sentence", first_sentence_latencies)
+
+
+if __name__ == "__main__":
+    main()
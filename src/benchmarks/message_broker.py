@@ -0,0 +1,139 @@
+"""
+MessageBroker fan-out to many callback subscribers: one polling thread per listener (old CallbackListener,
+sleeps 1/60 s between queue checks) vs the shared dispatcher pool.
+Reports delivered events/s for a burst, emit -> callback latency of events emitted 5 ms apart,
+and idle wakeups/s and CPU while nothing is emitted.
+
+Usage:
+    python -m src.benchmarks.message_broker --subscribers 50 --events 2000
+"""
+import argparse
+import threading
+import time
+from queue import Empty, Full, Queue
+
+import numpy as np
+
+from ..message_event import MessageBroker, MessageDispatcher, MessageListener
+
+
+class PollingCallbackListener(MessageListener):
+    """
+    The old CallbackListener: its own thread, woken every 1/60 s to poll its queue.
+    """
+    def __init__(self, callback, queue_size: int):
+        MessageListener.__init__(self)
+        self.message_queue = Queue(maxsize=queue_size)
+        self._callback = callback
+        self.wakeups = 0
+        self.start()
+
+    def run(self):
+        while not self._stop_flag:
+            while True:
+                try:
+                    _, detail = self.message_queue.get_nowait()
+                    self._callback(detail)
+                except Empty:
+                    break
+            self.wakeups += 1
+            time.sleep(1.0 / 60)
+
+    def enqueue(self, message):
+        try:
+            self.message_queue.put_nowait(message)
+        except Full:
+            pass
+
+
+class Receiver:
+    def __init__(self, expected: int):
+        self.expected = expected
+        self.latencies = []
+        self._lock = threading.Lock()
+        self.done = threading.Event()
+
+    def receive(self, sent_at: float):
+        latency = time.perf_counter() - sent_at
+        with self._lock:
+            self.latencies.append(latency)
+            if len(self.latencies) == self.expected:
+                self.done.set()
+
+
+def subscribe(broker: MessageBroker, event: str, subscribers: int, receiver: Receiver, queue_size: int, polling: bool) -> list:
+    listeners = []
+    for _ in range(subscribers):
+        if polling:
+            listener = PollingCallbackListener(receiver.receive, queue_size=queue_size)
+            broker.subscribe(event, listener)
+            listeners.append(listener)
+        else:
+            broker.subscribe(event, receiver.receive, queue_size=queue_size)
+    time.sleep(0.2)
+
+    return listeners
+
+
+def unsubscribe(broker: MessageBroker, event: str, listeners: list):
+    for listener in listeners:
+        listener.stop()
+    with broker._lock:
+        broker._events.pop(event, None)
+
+
+def run(name: str, subscribers: int, events: int, paced: int, idle: float, polling: bool):
+    broker = MessageBroker()
+    broker.VERBOSE_CURRENT_SUBSCRIBERS = False  # 발행마다 출력하지 않도록
+
+    # 지연: 5ms 간격으로 발행
+    event = f"benchmark {name} paced"
+    receiver = Receiver(subscribers * paced)
+    listeners = subscribe(broker, event, subscribers, receiver, paced, polling)
+    for _ in range(paced):
+        broker.emit((event, time.perf_counter()))
+        time.sleep(0.005)
+    receiver.done.wait()
+    unsubscribe(broker, event, listeners)
+    latencies = np.array(receiver.latencies) * 1e6
+
+    # 처리량: 한꺼번에 발행
+    event = f"benchmark {name}"
+    receiver = Receiver(subscribers * events)
+    listeners = subscribe(broker, event, subscribers, receiver, events, polling)
+    start = time.perf_counter()
+    for _ in range(events):
+        broker.emit((event, time.perf_counter()))
+    receiver.done.wait()
+    elapsed = time.perf_counter() - start
+
+    # 아무것도 발행하지 않는 동안 깨어나는 횟수와 CPU
+    wakeups_before = sum(listener.wakeups for listener in listeners) if polling else MessageDispatcher().runs
+    cpu_before, wall_before = time.process_time(), time.perf_counter()
+    time.sleep(idle)
+    cpu = (time.process_time() - cpu_before) / (time.perf_counter() - wall_before)
+    wakeups_after = sum(listener.wakeups for listener in listeners) if polling else MessageDispatcher().runs
+    wakeups = (wakeups_after - wakeups_before) / idle
+
+    unsubscribe(broker, event, listeners)
+
+    print(f"{name:>10} {subscribers * events / elapsed:>12.0f} {np.median(latencies):>10.0f} "
+          f"{np.percentile(latencies, 99):>10.0f} {wakeups:>10.0f} {cpu:>8.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, default=50)
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--paced", type=int, default=200, help="events emitted 5 ms apart for the latency")
+    parser.add_argument("--idle", type=float, default=2.0, help="seconds of idle measurement")
+    args = parser.parse_args()
+
+    print(f"{args.subscribers} subscribers x {args.events} events")
+    print(f"{'listener':>10} {'deliveries/s':>12} {'p50 us':>10} {'p99 us':>10} {'wakeups/s':>10} {'idle CPU':>8}")
+    run("polling", args.subscribers, args.events, args.paced, args.idle, polling=True)
+    run("dispatcher", args.subscribers, args.events, args.paced, args.idle, polling=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Per-turn overhead of building the structured-output model of a phase, uncached vs cached.
+
+Usage:
+    python -m src.benchmarks.response_format --turns 200
+"""
+import argparse
+import time
+
+from ..dialog_manager.llm_chatgpt import buildPhaseManager, getTestSettingData
+
+
+def measure(turns: int, fn) -> float:
+    start = time.perf_counter()
+    for _ in range(turns):
+        fn()
+    return (time.perf_counter() - start) / turns
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=200)
+    args = parser.parse_args()
+
+    phase_manager = buildPhaseManager(getTestSettingData())
+    phase = phase_manager.getCurrPhase()
+
+    def uncached():
+        # 캐시 이전: 매 턴 create_model 로 모델을 만들고 schema 를 다시 생성
+        format = phase._createResponseFormat("ResponseFormat")
+        format.model_json_schema()
+
+    def cached():
+        phase.getResponseFormat()
+        phase.getResponseSchema()
+
+    before = measure(args.turns, uncached)
+    after = measure(args.turns, cached)
+    print(f"phase {phase.getName()} ({len(phase.router_list)} routes, {args.turns} turns)")
+    print(f"uncached  {before * 1e6:10.1f} us/turn")
+    print(f"cached    {after * 1e6:10.1f} us/turn")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Multi-session load test against the stub LLM: many sessions talk at the same time, every session
+sends its next input as soon as the previous reply arrives. Reports turns/s and turn latency
+as the number of sessions grows.
+
+Usage:
+    python -m src.benchmarks.session_load --sessions 1 10 50 100 200 400 --turns 5 --max-concurrency 32
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from ..dialog_manager.chain_registry import ChainRegistry
+from ..dialog_manager.llm_chatgpt import buildPhaseManager, getTestSettingData
+from ..dialog_manager.session_manager import ChatSessionManager
+from ..lib import DB
+from ..lib.time_stamp import get_current_timestamp
+from .llm_modes import percentile
+
+
+async def run_load(n_sessions: int, turns: int, max_concurrency: int, mode: str) -> tuple[float, list[float]]:
+    """
+    Run {turns} turns in each of {n_sessions} sessions and return the wall time and the turn latencies.
+    """
+    phase_template = buildPhaseManager(getTestSettingData())
+    chains = ChainRegistry()
+    chains.compile(list(phase_template.phase_dict.values()))
+    sessions = ChatSessionManager(phase_template, chains, max_concurrency=max_concurrency, mode=mode)
+    scheduler = asyncio.create_task(sessions.run())
+    latencies = []
+
+    async def talk(session_id: str):
+        for turn in range(turns):
+            now = get_current_timestamp()
+            msg = {"content": f"{turn} 요즘 일이 많아서 좀 지쳤어요.", "start_time": now, "end_time": now, "speaker": "USER_KEYBOARD"}
+            start = time.perf_counter()
+            await sessions.submit(session_id, msg)
+            latencies.append(time.perf_counter() - start)
+
+    session_ids = [sessions.create_session().session_id for _ in range(n_sessions)]
+    start = time.perf_counter()
+    await asyncio.gather(*(talk(session_id) for session_id in session_ids))
+    elapsed = time.perf_counter() - start
+
+    scheduler.cancel()
+    await chains.aclose()
+    return elapsed, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 10, 50, 100, 200, 400])
+    parser.add_argument("--turns", type=int, default=5, help="turns per session")
+    parser.add_argument("--max-concurrency", type=int, default=32, help="LLM turns in flight at once")
+    parser.add_argument("--mode", default="two_call", choices=["two_call", "single_call", "speculative"])
+    parser.add_argument("--latency", type=float, default=0.2, help="stub time to first token (s)")
+    parser.add_argument("--token-interval", type=float, default=0.0, help="stub time between tokens (s)")
+    args = parser.parse_args()
+
+    os.environ["LLM_BACKEND"] = "stub"
+    os.environ["LLM_STUB_LATENCY"] = str(args.latency)
+    os.environ["LLM_STUB_TOKEN_INTERVAL"] = str(args.token_interval)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        DB.initialize(os.path.join(tmp, "sessions.db"))
+        for n_sessions in args.sessions:
+            elapsed, latencies = asyncio.run(run_load(n_sessions, args.turns, args.max_concurrency, args.mode))
+            print(f"{n_sessions:5d} sessions  {len(latencies) / elapsed:8.1f} turns/s"
+                  f"  mean {statistics.mean(latencies) * 1000:8.1f} ms"
+                  f"  p95 {percentile(latencies, 95) * 1000:8.1f} ms")
+        DB.getDatabase().flush()
+
+
+if __name__ == "__main__":
+    main()
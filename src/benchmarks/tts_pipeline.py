@@ -0,0 +1,89 @@
+"""
+TTS latency of a streamed response against the local mock Clova server:
+per-sentence synthesis, time to the first audio byte when streaming, and the same sentences again from the cache.
+
+Usage:
+    python -m src.benchmarks.tts_pipeline --sentences 20 --latency 0.3 --char-latency 0.005
+"""
+import argparse
+import asyncio
+import statistics
+import tempfile
+import threading
+import time
+
+import uvicorn
+
+from ..audio import mock_clova_server
+from ..audio.tts_cache import TTSCache
+from ..audio.tts_client import ClovaTTSClient
+from .llm_modes import percentile
+
+SENTENCES = [
+    "그런 일이 있었군요.",
+    "그때 어떤 기분이 드셨는지 조금 더 이야기해 주실 수 있을까요?",
+    "천천히 말씀해 주셔도 괜찮아요.",
+    "그 감정은 충분히 자연스러운 거예요.",
+]
+
+
+def startMockServer(port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(mock_clova_server.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+    return server
+
+
+async def run(n_sentences: int, port: int) -> dict[str, list[float]]:
+    client = ClovaTTSClient("mock", "mock", endpoint=f"http://127.0.0.1:{port}/tts-premium/v1/tts")
+    settings = client.voice_settings("중립", 24000)
+    sentences = [f"{i}. {SENTENCES[i % len(SENTENCES)]}" for i in range(n_sentences)]
+    results = {"synthesize": [], "first byte": [], "cache miss": [], "cache hit": []}
+
+    for sentence in sentences:
+        start = time.perf_counter()
+        await client.synthesize(sentence, settings)
+        results["synthesize"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        async for _ in client.stream(sentence, settings):
+            results["first byte"].append(time.perf_counter() - start)
+            break
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = TTSCache(directory=tmp)
+        for name in ("cache miss", "cache hit"):
+            for sentence in sentences:
+                start = time.perf_counter()
+                await cache.get_or_synthesize(sentence, settings, client.synthesize)
+                results[name].append(time.perf_counter() - start)
+            await cache.flush()
+        print(cache.summary())
+
+    await client.aclose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sentences", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.3, help="mock server seconds before every response")
+    parser.add_argument("--char-latency", type=float, default=0.005, help="mock server extra seconds per character")
+    parser.add_argument("--port", type=int, default=8599)
+    args = parser.parse_args()
+
+    mock_clova_server.app.state.latency = args.latency
+    mock_clova_server.app.state.char_latency = args.char_latency
+    server = startMockServer(args.port)
+
+    for name, values in asyncio.run(run(args.sentences, args.port)).items():
+        print(f"{name:12s} mean {statistics.mean(values) * 1000:8.1f} ms"
+              f"  p50 {percentile(values, 50) * 1000:8.1f} ms"
+              f"  p95 {percentile(values, 95) * 1000:8.1f} ms")
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
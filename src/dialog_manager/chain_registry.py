@@ -0,0 +1,192 @@
+"""
+Long-lived LLM clients and compiled prompt chains shared by every conversation turn.
+"""
+import asyncio
+import os
+
+import httpx
+from langchain_core.prompts import PromptTemplate
+from langchain_core.runnables import Runnable
+from langchain_openai import ChatOpenAI
+
+from ..lib.phase import Phase
+from .stub_llm import StubChatModel
+
+SELECTOR_PROMPT = PromptTemplate.from_template(
+    """
+    [Task]
+    You are an action selector of the {bot_name}, which is {bot_desc}.
+    Your role is to do two things with reference to the "Context".
+    1. Decide whether the main goal of the current phase is achieved. And if it is achieved, select which phase to go next.
+    2. Decide which action to use for the current conversation turn. You can only select one action from the available actions below.
+
+    [Context]
+    - current phase name: {phase_name}
+    - current phase goal: {phase_goal}
+    - available actions: {phase_actions}
+    - current phase instruction: {phase_instruction}
+    - conversation history: {conversation_history}
+    """
+)
+
+GENERATOR_PROMPT = PromptTemplate.from_template(
+    """
+    [Task]
+    You are a response generator of the {bot_name}, which is {bot_desc}.
+    To achieve the "phase goal" within the total conversation, one "action" is selected for the current conversation turn.
+    Your role is to make a chatbot response for this turn according to the "Context".
+    You MUST ask or respond about one subject at a time.
+    The response MUST be in KOREAN.
+
+    [Context]
+    - current phase name: {phase_name}
+    - current phase goal: {phase_goal}
+    - selected action: {action}
+    - reason for the action selection: {action_reason}
+    - conversation history: {conversation_history}
+    """
+)
+
+COMBINED_PROMPT = PromptTemplate.from_template(
+    """
+    [Task]
+    You are an action selector and a response generator of the {bot_name}, which is {bot_desc}.
+    Your role is to do three things with reference to the "Context".
+    1. Decide whether the main goal of the current phase is achieved. And if it is achieved, select which phase to go next.
+    2. Decide which action to use for the current conversation turn. You can only select one action from the available actions below.
+    3. Make a chatbot response for this turn according to the selected action, to achieve the phase goal within the total conversation.
+       You MUST ask or respond about one subject at a time.
+       The response MUST be in KOREAN.
+
+    [Context]
+    - current phase name: {phase_name}
+    - current phase goal: {phase_goal}
+    - available actions: {phase_actions}
+    - current phase instruction: {phase_instruction}
+    - conversation history: {conversation_history}
+    """
+)
+
+SUMMARY_PROMPT = PromptTemplate.from_template(
+    """
+    [Task]
+    You keep a running summary of a counseling conversation between a user and a chatbot.
+    Merge the new lines of the conversation into the current summary.
+    Keep what the user said about themselves, their feelings, and what the chatbot has already asked or suggested.
+    Leave out greetings and small talk.
+    The summary MUST be in KOREAN, one paragraph of at most {max_chars} characters.
+
+    [Current summary]
+    {summary}
+
+    [New lines]
+    {lines}
+    """
+)
+
+
+def createChatModel(http_async_client: httpx.AsyncClient | None = None) -> ChatOpenAI | StubChatModel:
+    """
+    LLM_BACKEND=stub replaces gpt-4o with a local stub (for benchmarks and load tests).
+    """
+    if os.getenv("LLM_BACKEND", "openai") == "stub":
+        return StubChatModel(
+            latency=float(os.getenv("LLM_STUB_LATENCY", "0.5")),
+            token_interval=float(os.getenv("LLM_STUB_TOKEN_INTERVAL", "0.02")),
+        )
+
+    return ChatOpenAI(model="gpt-4o", temperature=1, http_async_client=http_async_client)
+
+
+class ChainRegistry:
+    """
+    Owns one pooled HTTP client and one chat model for the whole process,
+    and caches the compiled prompt chains (structured output included) per phase.
+
+    Usage:
+    ```
+    chains = ChainRegistry()
+    response = await chains.selector(phase).ainvoke({...})
+    ```
+    """
+
+    def __init__(self):
+        # 프로바이더와의 keep-alive 연결을 재사용하기 위한 커넥션 풀
+        self._http_async_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "20")),
+                max_keepalive_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "20")),
+                keepalive_expiry=float(os.getenv("LLM_KEEPALIVE_EXPIRY", "120")),
+            ),
+            timeout=httpx.Timeout(60.0, connect=5.0),
+        )
+        self._llm = createChatModel(self._http_async_client)
+        self._generator = GENERATOR_PROMPT | self._llm
+        self._summarizer = SUMMARY_PROMPT | self._llm
+        # phase name -> (response format, chain)
+        self._selectors: dict[str, tuple[type, Runnable]] = {}
+        self._combined: dict[str, tuple[type, Runnable]] = {}
+        self._keep_warm_task = None
+
+    def selector(self, phase: Phase) -> Runnable:
+
+        return self._getChain(self._selectors, SELECTOR_PROMPT, phase.getName(), phase.getResponseFormat())
+
+    def generator(self) -> Runnable:
+
+        return self._generator
+
+    def summarizer(self) -> Runnable:
+
+        return self._summarizer
+
+    def combined(self, phase: Phase) -> Runnable:
+
+        return self._getChain(self._combined, COMBINED_PROMPT, phase.getName(), phase.getCombinedResponseFormat())
+
+    def _getChain(self, chains: dict, prompt: PromptTemplate, phase_name: str, response_format: type) -> Runnable:
+        # Phase 가 format 을 다시 만들었다면 (router_list 변경) 체인도 다시 만든다
+        cached = chains.get(phase_name)
+        if cached is None or cached[0] is not response_format:
+            cached = (response_format, prompt | self._llm.with_structured_output(response_format))
+            chains[phase_name] = cached
+
+        return cached[1]
+
+    def compile(self, phases: list[Phase]):
+        """
+        Build the chains of every phase up front, so the first turn of a phase does not pay for it.
+        """
+        for phase in phases:
+            if phase.topic_list:
+                self.selector(phase)
+                self.combined(phase)
+
+    async def warm_up(self):
+        """
+        Open a connection to the provider (DNS, TCP and TLS) before the first turn needs it.
+        """
+        if isinstance(self._llm, StubChatModel):
+            return
+        try:
+            await self._llm.root_async_client.models.list()
+        except Exception as e:
+            print(f"[ChainRegistry] warm up failed: {e}")
+
+    def start_keep_warm(self, interval: float):
+        """
+        Touch the provider every {interval} seconds so the pooled connection is not closed while idle.
+        """
+        async def keep_warm():
+            while True:
+                await self.warm_up()
+                await asyncio.sleep(interval)
+
+        if interval > 0 and self._keep_warm_task is None:
+            self._keep_warm_task = asyncio.create_task(keep_warm())
+
+    async def aclose(self):
+        if self._keep_warm_task is not None:
+            self._keep_warm_task.cancel()
+            self._keep_warm_task = None
+        await self._http_async_client.aclose()
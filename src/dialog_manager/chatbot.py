@@ -0,0 +1,286 @@
+"""
+One conversation turn of the chatbot: action selection and response generation.
+"""
+import asyncio
+import re
+import time
+from typing import Any, Awaitable, Callable
+
+from ..lib.phasemanager import PhaseManager
+from .chain_registry import ChainRegistry
+from .speculation import ActionPredictor, SpeculationStats
+
+# 예측한 action 으로 미리 응답을 만들 때는 selector 의 선택 이유를 아직 모른다
+SPECULATIVE_ACTION_REASON = "The action is predicted from the previous turns of the current phase."
+
+# 문장 끝(마침표/물음표/느낌표/말줄임표/물결) 뒤에 공백이 오면 한 문장으로 자른다
+SENTENCE_END = re.compile(r"[.!?…~]+[\"'”’)\]]*(?=\s)")
+
+
+async def selectTopic(chains: ChainRegistry, phase_manager: PhaseManager, conversation_history: str) -> Any:
+    bot_name, bot_desc = phase_manager.getBotInfo()
+    actions = phase_manager.getTopics()
+    phase_info = phase_manager.getCurrPhase().getInfo()
+
+    chain = chains.selector(phase_manager.getCurrPhase())
+    response = await chain.ainvoke(
+        {
+            "bot_name": bot_name,
+            "bot_desc": bot_desc,
+            "phase_name": phase_info["name"],
+            "phase_goal": phase_info["goal"],
+            "phase_actions": actions,
+            "phase_instruction": phase_info["instruction"],
+            "conversation_history": conversation_history,
+        }
+    )
+
+    return response
+
+async def generateResponse(
+    chains: ChainRegistry,
+    phase_manager: PhaseManager,
+    conversation_history: str,
+    action: str,
+    action_reason: str,
+    on_sentence: Callable[[str], Awaitable[None]] | None = None,
+) -> str:
+    bot_name, bot_desc = phase_manager.getBotInfo()
+    phase_info = phase_manager.getCurrPhase().getInfo()
+
+    chain = chains.generator()
+    inputs = {
+        "bot_name": bot_name,
+        "bot_desc": bot_desc,
+        "phase_name": phase_info["name"],
+        "phase_goal": phase_info["goal"],
+        "action": action,
+        "action_reason": action_reason,
+        "conversation_history": conversation_history + "\nCUMPAR: ",
+    }
+
+    if on_sentence is None:
+        response = await chain.ainvoke(inputs)
+        return response.content
+
+    # streaming mode: 토큰을 받는 대로 문장 단위로 잘라 on_sentence 로 넘긴다
+    response = ""
+    pending = ""
+    async for chunk in chain.astream(inputs):
+        response += chunk.content
+        pending += chunk.content
+        sentences, pending = splitSentences(pending)
+        for sentence in sentences:
+            await on_sentence(sentence)
+    if pending.strip():
+        await on_sentence(pending.strip())
+
+    return response
+
+
+def splitSentences(text: str) -> tuple[list[str], str]:
+    """
+    Cut the complete sentences off the front of {text}.
+    Return the sentences and the remaining (unfinished) text.
+    """
+    sentences = []
+    start = 0
+    for match in SENTENCE_END.finditer(text):
+        sentence = text[start:match.end()].strip()
+        if sentence:
+            sentences.append(sentence)
+        start = match.end()
+
+    return sentences, text[start:]
+
+
+async def selectAndGenerate(chains: ChainRegistry, phase_manager: PhaseManager, conversation_history: str) -> Any:
+    """
+    Single-call mode: select the action and the next phase and make the response in one structured-output call.
+    """
+    bot_name, bot_desc = phase_manager.getBotInfo()
+    actions = phase_manager.getTopics()
+    phase_info = phase_manager.getCurrPhase().getInfo()
+
+    chain = chains.combined(phase_manager.getCurrPhase())
+    response = await chain.ainvoke(
+        {
+            "bot_name": bot_name,
+            "bot_desc": bot_desc,
+            "phase_name": phase_info["name"],
+            "phase_goal": phase_info["goal"],
+            "phase_actions": actions,
+            "phase_instruction": phase_info["instruction"],
+            "conversation_history": conversation_history,
+        }
+    )
+
+    return response
+
+
+class SentenceGate:
+    """
+    Holds back the sentences of a speculative response until the selector confirms its action.
+    """
+
+    def __init__(self, on_sentence: Callable[[str], Awaitable[None]]):
+        self._on_sentence = on_sentence
+        self._buffer: list[str] = []
+        self._open = False
+
+    async def push(self, sentence: str):
+        if self._open:
+            await self._on_sentence(sentence)
+        else:
+            self._buffer.append(sentence)
+
+    async def open(self):
+        # 버퍼를 다 비운 뒤에 열어야 문장 순서가 유지된다
+        while self._buffer:
+            await self._on_sentence(self._buffer.pop(0))
+        self._open = True
+
+
+async def announcePhase(
+    phase_manager: PhaseManager, next_phase: str | None, on_phase: Callable[[str], Awaitable[None]] | None
+):
+    # 라우팅이 정해지는 대로 (응답 생성이 끝나기 전에) 넘어갈 phase 를 알린다
+    if on_phase is not None and next_phase in phase_manager.phase_dict:
+        await on_phase(next_phase)
+
+
+async def executeSpeculatively(
+    chains: ChainRegistry,
+    phase_manager: PhaseManager,
+    conversation_history: str,
+    predictor: ActionPredictor,
+    stats: SpeculationStats,
+    on_sentence: Callable[[str], Awaitable[None]] | None = None,
+    candidates: int = 1,
+    on_phase: Callable[[str], Awaitable[None]] | None = None,
+) -> tuple[str, Any]:
+    """
+    Run selectTopic and, at the same time, generateResponse for the top-{candidates} predicted actions.
+    The speculative response is kept when the selector agrees; otherwise it is cancelled and regenerated.
+    Return the response and the selector response.
+    """
+    phase_name = phase_manager.getCurrPhase().getName()
+    topics = phase_manager.getTopics()
+    predicted_actions = predictor.predict(phase_name, list(topics.keys()), candidates)
+
+    start = time.perf_counter()
+    selector_task = asyncio.create_task(selectTopic(chains, phase_manager, conversation_history))
+    gates = {}
+    speculative_tasks = {}
+    finished_at = {}  # action -> 추측 생성이 끝난 시각
+    for action in predicted_actions:
+        gates[action] = SentenceGate(on_sentence) if on_sentence else None
+        speculative_tasks[action] = asyncio.create_task(
+            generateResponse(
+                chains,
+                phase_manager,
+                conversation_history,
+                topics[action],
+                SPECULATIVE_ACTION_REASON,
+                on_sentence=gates[action].push if gates[action] else None,
+            )
+        )
+        speculative_tasks[action].add_done_callback(
+            lambda _, action=action: finished_at.setdefault(action, time.perf_counter())
+        )
+
+    try:
+        selector_response = await selector_task
+    except BaseException:
+        for task in speculative_tasks.values():
+            task.cancel()
+        raise
+    selector_time = time.perf_counter() - start
+    predictor.update(phase_name, selector_response.action)
+    await announcePhase(phase_manager, selector_response.next_phase, on_phase)
+
+    losers = [task for action, task in speculative_tasks.items() if action != selector_response.action]
+    for task in losers:
+        task.cancel()
+    await asyncio.gather(*losers, return_exceptions=True)
+
+    if selector_response.action in speculative_tasks:
+        gate = gates[selector_response.action]
+        if gate:
+            await gate.open()
+        chatbot_response = await speculative_tasks[selector_response.action]
+        wall_time = time.perf_counter() - start
+        generation_time = finished_at[selector_response.action] - start
+        # 직렬 실행(selector_time + generation_time) 대비 겹쳐서 줄어든 시간
+        stats.record(phase_name, True, max(0.0, selector_time + generation_time - wall_time), len(losers))
+    else:
+        chatbot_response = await generateResponse(
+            chains,
+            phase_manager,
+            conversation_history,
+            topics[selector_response.action],
+            selector_response.action_reason,
+            on_sentence=on_sentence,
+        )
+        stats.record(phase_name, False, 0.0, len(losers))
+
+    return chatbot_response, selector_response
+
+
+async def executeChatbot(
+    chains: ChainRegistry,
+    phase_manager: PhaseManager,
+    conversation_history: str,
+    on_sentence: Callable[[str], Awaitable[None]] | None = None,
+    mode: str = "two_call",
+    predictor: ActionPredictor | None = None,
+    stats: SpeculationStats | None = None,
+    candidates: int = 1,
+    on_phase: Callable[[str], Awaitable[None]] | None = None,
+) -> tuple[str, bool]:
+    """
+    mode "two_call": selectTopic and then generateResponse (two LLM round trips).
+    mode "single_call": selectAndGenerate (one LLM round trip).
+    mode "speculative": generateResponse for the predicted action(s) while selectTopic runs (needs predictor and stats).
+    on_phase is called with the next phase as soon as the routing is decided, before the response is complete.
+    """
+    if mode == "single_call":
+        combined_response = await selectAndGenerate(chains, phase_manager, conversation_history)
+        await announcePhase(phase_manager, combined_response.next_phase, on_phase)
+        if on_sentence is not None:
+            # 구조화 출력은 끝까지 받아야 하므로 완성된 응답을 문장 단위로 넘긴다
+            sentences, rest = splitSentences(combined_response.response)
+            for sentence in sentences + ([rest.strip()] if rest.strip() else []):
+                await on_sentence(sentence)
+        changed = phase_manager.goNextPhase(combined_response.next_phase)
+
+        return combined_response.response, changed
+
+    if mode == "speculative":
+        chatbot_response, selector_response = await executeSpeculatively(
+            chains, phase_manager, conversation_history, predictor, stats, on_sentence, candidates, on_phase
+        )
+        changed = phase_manager.goNextPhase(selector_response.next_phase)
+
+        return chatbot_response, changed
+
+    selector_response = await selectTopic(chains, phase_manager, conversation_history)
+    await announcePhase(phase_manager, selector_response.next_phase, on_phase)
+    
+    # next_phase_info = ""
+    # if selector_response.next_phase:
+    #     next_phase_info += f"\n- next phase name: {selector_response.next_phase}"
+    #     next_phase_info += f"\n- next phase reason: {selector_response.next_phase_reason}"
+        
+    chatbot_response = await generateResponse(
+        chains,
+        phase_manager,
+        conversation_history,
+        phase_manager.getTopics()[selector_response.action],
+        selector_response.action_reason,
+        # next_phase_info,
+        on_sentence=on_sentence,
+    )
+    changed = phase_manager.goNextPhase(selector_response.next_phase)
+
+    return chatbot_response, changed
@@ -0,0 +1,75 @@
+"""
+The 60 labels of the klue-bert emotion classifier and the 6 emotion groups used for TTS,
+compiled into lookup tables (no torch needed, so the audio side can use them too).
+"""
+import numpy as np
+
+# 모델 설정의 id2label
+EMOTION_LABELS = (
+    "분노", "툴툴대는", "좌절한", "짜증내는", "방어적인", "악의적인", "안달하는", "구역질 나는", "노여워하는", "성가신",
+    "슬픔", "실망한", "비통한", "후회되는", "우울한", "마비된", "염세적인", "눈물이 나는", "낙담한", "환멸을 느끼는",
+    "불안", "두려운", "스트레스 받는", "취약한", "혼란스러운", "당혹스러운", "회의적인", "걱정스러운", "조심스러운", "초조한",
+    "상처", "질투하는", "배신당한", "고립된", "충격 받은", "가난한 불우한", "희생된", "억울한", "괴로워하는", "버려진",
+    "당황", "고립된(당황한)", "남의 시선을 의식하는", "외로운", "열등감", "죄책감의", "부끄러운", "혐오스러운", "한심한", "혼란스러운(당황한)",
+    "기쁨", "감사하는", "신뢰하는", "편안한", "만족스러운", "흥분", "느긋", "안도", "신이 난", "자신하는",
+)
+
+# 원하는 감정 번호만 포함하는 감정 그룹 매핑 (한 번호는 한 그룹에만, 어디에도 없으면 중립)
+EMOTION_MAP = {
+    "기쁨": [50, 51, 52, 54, 58],
+    "짜증난": [1, 3, 6, 7, 9],
+    "슬픔": [2, 10, 11, 12, 13, 14, 17, 18, 36, 37, 38, 40, 41, 43, 44, 45, ],
+    "부정": [15, 16, 19, 20, 21, 22, 23, 24, 25, 26, 27, 30, 31, 32, 33, 48, 49, 55],
+    "화남": [0, 5, 8, 47],  # 16 (염세적인) 은 부정
+    "중립": [4, 28, 29, 34, 35, 39, 42, 46, 53, 56, 57, 59]
+}
+DEFAULT_GROUP = "중립"
+
+
+class EmotionGroups:
+    """
+    - group_ids: dense label id -> group index array
+    - aggregation: labels x groups 0/1 matrix, so probs @ aggregation are the group probabilities
+      of a batch of softmax rows
+    """
+
+    def __init__(self, emotion_map: dict[str, list[int]] = EMOTION_MAP, labels: tuple[str, ...] = EMOTION_LABELS):
+        self.names = tuple(emotion_map)
+        self.labels = labels
+        index = {name: i for i, name in enumerate(self.names)}
+
+        self.group_ids = np.full(len(labels), index[DEFAULT_GROUP], dtype=np.int64)
+        assigned = np.zeros(len(labels), dtype=bool)
+        for name, ids in emotion_map.items():
+            for label_id in ids:
+                if assigned[label_id]:
+                    raise ValueError(f"Emotion label {label_id} is in more than one group ({name})")
+                self.group_ids[label_id] = index[name]
+                assigned[label_id] = True
+
+        self.aggregation = np.zeros((len(labels), len(self.names)), dtype=np.float32)
+        self.aggregation[np.arange(len(labels)), self.group_ids] = 1.0
+        self._label_ids = {label: i for i, label in enumerate(labels)}
+
+    def group_of(self, label: int | str | None) -> str:
+        """
+        Group of a label id, a label name or a group name; DEFAULT_GROUP for anything else.
+        """
+        if isinstance(label, str):
+            if label in self.names:
+                return label
+            label = self._label_ids.get(label, -1)
+        if isinstance(label, (int, np.integer)) and 0 <= label < len(self.group_ids):
+            return self.names[self.group_ids[label]]
+
+        return DEFAULT_GROUP
+
+    def scores(self, probs: np.ndarray) -> np.ndarray:
+        """
+        Group probabilities of a (batch x labels) or (labels,) array of label probabilities.
+        """
+
+        return probs @ self.aggregation
+
+
+GROUPS = EmotionGroups()
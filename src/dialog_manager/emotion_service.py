@@ -0,0 +1,122 @@
+"""
+Emotion analysis off the event loop, shared by every session in the process.
+"""
+import asyncio
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from ..lib.loggable import Loggable
+from ..lib.singleton import Singleton
+from .hugging_face_transformers_emotion import EmotionAnalyzer, EmotionResult, normalizeText
+
+
+class EmotionService(Singleton, Loggable):
+    """
+    A worker thread loads the EmotionAnalyzer and classifies the queued sentences in micro-batches:
+    it takes the first waiting request, waits up to {batch_wait} seconds for more, and runs one forward pass
+    for up to {max_batch} of them. Results are kept in an LRU cache of {cache_size} normalized sentences,
+    so repeated sentences never reach the worker.
+    """
+
+    def __init__(self, *args, **kwargs):
+        # 초기화는 처음 한 번 _init() 에서만
+        pass
+
+    def _init(self, analyzer_factory=EmotionAnalyzer):
+        Loggable.__init__(self)
+        self.set_tag("emotion")
+
+        self.max_batch = int(os.getenv("EMOTION_MAX_BATCH", "16"))
+        self.batch_wait = float(os.getenv("EMOTION_BATCH_WAIT_MS", "5")) / 1000
+        self.cache_size = int(os.getenv("EMOTION_CACHE_SIZE", "1024"))
+
+        self.analyzer = None
+        self._factory = analyzer_factory
+        self._requests: queue.Queue[tuple[str, Future]] = queue.Queue()
+        self._cache: OrderedDict[str, EmotionResult] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.batches = 0
+        self.analyzed = 0
+        self.cache_hits = 0
+        threading.Thread(target=self._work, daemon=True).start()
+
+    def submit(self, text: str) -> Future:
+        """
+        Future of the EmotionResult of {text}.
+        """
+        key = normalizeText(text)
+        future = Future()
+        with self._lock:
+            result = self._cache.get(key)
+            if result is not None:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+        if result is not None:
+            future.set_result(result)
+        else:
+            self._requests.put((key, future))
+
+        return future
+
+    async def analyze(self, text: str) -> EmotionResult:
+
+        return await asyncio.wrap_future(self.submit(text))
+
+    def stats(self) -> dict:
+        return {
+            "analyzed": self.analyzed,
+            "batches": self.batches,
+            "mean_batch": self.analyzed / self.batches if self.batches else 0.0,
+            "cache_hits": self.cache_hits,
+            "queued": self._requests.qsize(),
+        }
+
+    def _load(self):
+        start = time.perf_counter()
+        try:
+            self.analyzer = self._factory()
+            self.log(f"Emotion model loaded ({self.analyzer.backend}) in {time.perf_counter() - start:.2f} s.")
+        except Exception as e:
+            self.log(f"Failed to load emotion model: {e}")
+
+    def _work(self):
+        self._load()
+        while True:
+            batch = [self._requests.get()]
+            deadline = time.monotonic() + self.batch_wait
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._requests.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+
+            # 취소된 요청 (barge-in 등) 은 빼고, 남은 것은 더 이상 취소되지 않게 한다
+            batch = [(key, future) for key, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            # 같은 문장은 한 번만 계산
+            texts = list(dict.fromkeys(key for key, _ in batch))
+            try:
+                if self.analyzer is None:
+                    raise RuntimeError("emotion model is not loaded")
+                results = dict(zip(texts, self.analyzer.analyze_batch(texts)))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.analyzed += len(texts)
+            with self._lock:
+                for key, result in results.items():
+                    self._cache[key] = result
+                    self._cache.move_to_end(key)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+            for key, future in batch:
+                future.set_result(results[key])
@@ -0,0 +1,131 @@
+"""
+Finds where the user's utterances start and end in a stream of 20ms frames.
+"""
+import os
+from collections import deque
+
+import numpy as np
+import webrtcvad
+
+FRAME_MS = 20
+
+# process() 이벤트
+START = "start"
+CONTINUE = "continue"
+END = "end"
+DISCARD = "discard"
+
+
+def frameEnergy(frame: bytes) -> float:
+    """
+    RMS of a 16-bit PCM frame.
+    """
+    samples = np.frombuffer(frame, dtype=np.int16).astype(np.float32)
+
+    return float(np.sqrt(np.mean(samples ** 2))) if len(samples) else 0.0
+
+
+def _frames(name: str, default_ms: int) -> int:
+
+    return max(1, int(os.getenv(name, str(default_ms))) // FRAME_MS)
+
+
+class Endpointer:
+    """
+    - Frames quieter than {energy_threshold} (int16 RMS) are silence without asking webrtcvad.
+    - An utterance starts when the speech ratio of the last {window} frames reaches {start_ratio};
+      the {pre_roll} frames before that window are part of it.
+    - It ends after a run of silence as long as the silence timeout, once the speech ratio has fallen to {end_ratio}.
+      Only {hangover} frames of that silence are kept; shorter pauses are kept whole.
+    - The silence timeout follows the user's pauses: the 90th percentile of the pauses inside utterances and
+      of the silences that ended them, between {min_silence} and {max_silence} frames. A pause cut off by
+      the timeout only says the real pause was at least that long, so {pause_factor} is applied only when
+      the percentile is a pause that was not cut off.
+    - Utterances with fewer than {min_speech} speech frames are discarded.
+
+    process() returns (event, frames to append to the utterance), the event being None (no utterance),
+    START, CONTINUE, END or DISCARD.
+    """
+
+    def __init__(self, sample_rate: int = 16000):
+        self.sample_rate = sample_rate
+        self.vad = webrtcvad.Vad(int(os.getenv("ENDPOINT_VAD_MODE", "0")))  # 민감도 설정 (0=낮음, 3=높음)
+        self.energy_threshold = float(os.getenv("ENDPOINT_ENERGY_THRESHOLD", "200"))
+
+        self.window = _frames("ENDPOINT_WINDOW_MS", 300)
+        self.start_ratio = float(os.getenv("ENDPOINT_START_RATIO", "0.6"))
+        self.end_ratio = float(os.getenv("ENDPOINT_END_RATIO", "0.2"))
+        self.pre_roll = _frames("ENDPOINT_PRE_ROLL_MS", 300)
+        self.hangover = _frames("ENDPOINT_HANGOVER_MS", 200)
+        self.min_speech = _frames("ENDPOINT_MIN_SPEECH_MS", 300)
+        self.min_silence = _frames("ENDPOINT_MIN_SILENCE_MS", 500)
+        self.max_silence = _frames("ENDPOINT_MAX_SILENCE_MS", 1500)
+        self.silence_timeout = _frames("ENDPOINT_SILENCE_MS", 800)
+        self.pause_factor = float(os.getenv("ENDPOINT_PAUSE_FACTOR", "1.5"))
+
+        self._ring: deque[bool] = deque(maxlen=self.window)
+        self._pre: deque[bytes] = deque(maxlen=self.pre_roll + self.window)
+        self._pauses: deque[tuple[int, bool]] = deque(maxlen=50)  # (쉼의 길이 (프레임), 타임아웃에서 잘렸는지)
+        self.reset()
+
+    def reset(self):
+        self.triggered = False
+        self.speech_frames = 0
+        self._silence: list[bytes] = []
+        self._ring.clear()
+        self._pre.clear()
+
+    def is_speech(self, frame: bytes) -> bool:
+        if frameEnergy(frame) < self.energy_threshold:
+            return False
+
+        return self.vad.is_speech(frame, sample_rate=self.sample_rate)
+
+    def process(self, frame: bytes, is_speech: bool | None = None) -> tuple[str | None, list[bytes]]:
+        """
+        :param is_speech: the caller's own decision for this frame (e.g. stricter during playback)
+        """
+        speech = self.is_speech(frame) if is_speech is None else is_speech
+        self._ring.append(speech)
+        ratio = sum(self._ring) / self.window
+
+        if not self.triggered:
+            self._pre.append(frame)
+            if ratio < self.start_ratio:
+                return None, []
+            self.triggered = True
+            self.speech_frames = sum(self._ring)
+            frames = list(self._pre)
+            self._pre.clear()
+            return START, frames
+
+        if speech:
+            self.speech_frames += 1
+            frames = self._silence + [frame]
+            if len(self._silence) >= self.hangover:
+                self._addPause(len(self._silence))
+            self._silence = []
+            return CONTINUE, frames
+
+        self._silence.append(frame)
+        if len(self._silence) < self.silence_timeout or ratio > self.end_ratio:
+            return CONTINUE, []
+
+        frames = self._silence[:self.hangover]
+        event = END if self.speech_frames >= self.min_speech else DISCARD
+        if event == END:
+            # 발화를 끝낸 침묵도 쉼의 분포에 넣는다 (빼면 분포가 타임아웃 아래로만 잘려 타임아웃이 계속 늘어남)
+            self._addPause(len(self._silence), ended=True)
+        self.triggered = False
+        self._silence = []
+
+        return event, frames
+
+    def _addPause(self, frames: int, ended: bool = False):
+        censored = ended or frames >= self.silence_timeout
+        self._pauses.append((min(frames, self.silence_timeout), censored))
+        if len(self._pauses) >= 5:
+            ordered = sorted(self._pauses)
+            pause, censored = ordered[round(0.9 * (len(ordered) - 1))]
+            timeout = pause if censored else pause * self.pause_factor
+            self.silence_timeout = int(min(max(timeout, self.min_silence), self.max_silence))
@@ -1,19 +1,21 @@
 """
 A module that recognizes the user's speech using OpenAI Whisper.
 """
-import numpy as np
-from faster_whisper import WhisperModel
+import os
+from queue import Empty, Queue
 from threading import Event, Thread
 import webrtcvad
-import wave
-from io import BytesIO
 
 from ..lib.time_stamp import get_current_timestamp
-from ..lib.microphone import Microphone
+from ..lib.turn_scheduler import new_turn_id
+from ..lib.microphone import CallbackMicrophone
 from ..lib.loggable import Loggable
 from ..message_event import MessageListener, MessageBroker, MessageType
 from ..async_event import AsyncListener, AsyncBroker, AsyncMessageType
 from ..graphics.chat_window import ChatWindow
+from .streaming_whisper import StreamingTranscriber
+from .whisper_model import WhisperModelManager
+from .endpointer import DISCARD, END, START, Endpointer, frameEnergy
 
 
 class FasterWhisperRecognizer(Loggable):
@@ -23,10 +25,10 @@ class FasterWhisperRecognizer(Loggable):
 
     TEST_MODE = False  # 테스트 모드 활성화 (독립 실행 시 True)
 
-    def __init__(self, model_size="base", device="cpu", compute_type="int8"):
+    def __init__(self, model_size=None, device=None, compute_type=None):
         """
         Initialize the WhisperRecognizer with a shared model.
-        :param model_size: Whisper model size ('tiny', 'base', 'small', etc.)
+        :param model_size: Whisper model size ('tiny', 'base', 'small', etc.), WHISPER_MODEL_SIZE by default
         """
         Loggable.__init__(self)
         self.set_tag("speech_recognizer")
@@ -43,152 +45,184 @@ class FasterWhisperRecognizer(Loggable):
         AsyncBroker().subscribe("chat_done_listening", self._on_chat_done_listening)
         AsyncBroker().subscribe("wake_up", self._on_wake_up)
 
-        # Load Faster Whisper model
-        self.model = WhisperModel(model_size, device=device, compute_type=compute_type)
-        self.log(f"Faster Whisper model '{model_size}' loaded on {device} with {compute_type}.")
+        # Faster Whisper 모델은 백그라운드에서 로드되고, 디코딩은 준비될 때까지 기다린다
+        self.model = WhisperModelManager(model_size, device, compute_type)
+        # 말하는 동안 부분 인식 결과를 내고, 말이 끝나면 남은 꼬리만 디코딩
+        self.transcriber = StreamingTranscriber(self.model, CallbackMicrophone.SAMPLE_RATE, on_partial=self._on_partial_transcript)
+        self._utterance_start_time = 0
 
         # self.emotion_analyzer = EmotionAnalyzer()
 
-        # Initialize WebRTC VAD
-        self.vad = webrtcvad.Vad()
-        self.vad.set_mode(0)  # 민감도 설정 (0=낮음, 3=높음)
-        
-        # 오디오 데이터 버퍼
-        self.audio_buffer = []
-        self.speech_detected_frames = 0  # 연속 음성 프레임 수
+        # 에너지 + WebRTC VAD 로 발화의 시작과 끝을 찾는다
+        self.endpointer = Endpointer(CallbackMicrophone.SAMPLE_RATE)
+
+        # 캡처(PortAudio 콜백) -> VAD(_recognize_routine) -> 인식(_transcribe_routine) 스레드
+        self.mic = CallbackMicrophone()
+        self._utterances = Queue()  # (듣기 세션, 꼬리 오디오, 확정된 segment, 발화 시작 시각, 대기 시작 시각)
+        # 인식을 멈출 때마다 1 증가: 멈추기 전에 녹음된 발화는 인식 결과를 내지 않는다
+        self._listening_id = 0
+        Thread(target=self._transcribe_routine, daemon=True).start()
 
         self.chat_done_flag = False
         self.chat_conected = False
 
-    def _pcm_to_wav(self, pcm_data, sample_rate=16000, num_channels=1, sample_width=2):
-        """
-        Convert raw PCM data to WAV format and return a BytesIO object.
-        """
-        wav_buffer = BytesIO()
-    
-        with wave.open(wav_buffer, 'wb') as wav_file:
-            wav_file.setnchannels(num_channels)
-            wav_file.setsampwidth(sample_width)  # 2 bytes for 16-bit PCM
-            wav_file.setframerate(sample_rate)
-            wav_file.writeframes(pcm_data)
-        wav_buffer.seek(0)  # Ensure the pointer is at the beginning
-        return wav_buffer
-    
-    def _process_audio_data(self, audio_buffer) -> str:
-        """
-        Process raw PCM audio data and return the recognized text.
-        :param audio_data: PCM audio data (16kHz, 16-bit, mono)
-        :return: Recognized text.
-        """
-        try:
-            # Recognize speech using Faster Whisper
-            segments, info = self.model.transcribe(audio_buffer,
-            task="transcribe",
-            beam_size=5,
-            temperature=0.0,
-            language="ko")
-            recognized_text = "".join([segment.text for segment in segments])
-            
-            return recognized_text.strip()
-        except Exception as e:
-            self.log(f"Error during recognition: {e}")
-            return ""
+        # barge-in: 봇이 말하는 동안에도 마이크를 듣다가 사용자가 끼어들면 응답/재생을 멈춘다
+        self.barge_in = os.getenv("BARGE_IN", "False").lower() == "true"
+        # 스피커 소리(에코)와 잡음을 거르기 위해 재생 중에는 더 엄격한 VAD 와 에너지 기준을 쓴다
+        self.barge_in_vad = webrtcvad.Vad(int(os.getenv("BARGE_IN_VAD_MODE", "3")))
+        self.barge_in_energy = float(os.getenv("BARGE_IN_ENERGY_THRESHOLD", "1500"))  # int16 RMS
+        self.barge_in_frames = max(1, int(os.getenv("BARGE_IN_MIN_SPEECH_MS", "200")) // 20)  # 20ms 프레임 수
+        self._bot_speaking = Event()
 
     def _recognize_routine(self):
         """
-        Routine to process microphone input and emit messages.
+        VAD consumer: reads the frames the capture thread recorded, finds utterances and hands them to
+        the recognition thread, so recording and VAD go on while Whisper decodes.
         """
-        with Microphone() as mic:
+        try:
+            self._listen()
+        finally:
+            # 이 스레드가 끝난 뒤에야 새 인식 스레드가 마이크를 연다
+            self.chat_conected = False
+
+    def _listen(self):
+        with self.mic as mic:
             self.log("Microphone activated for Whisper recognition.")
             while mic.is_active() and not self._mic_end.is_set():
                 if not ChatWindow.use_whisper:
-                    self.chat_conected = False
                     return  # 키보드 모드에서는 인식 중지
                 try:
-                    # Read audio data from microphone (20ms chunks)
-                    chunk = mic.read(320)  # 20ms PCM data
+                    # 캡처 스레드가 모아 둔 20ms 프레임
+                    chunk = mic.read()
+                    if chunk is None:
+                        continue
 
-                    # Check if speech is detected
-                    is_speech = self.vad.is_speech(chunk, sample_rate=16000)
+                    # 재생 중에는 에코와 잡음을 거르는 더 엄격한 기준으로 음성 여부를 판단
+                    is_speech = self._is_barge_in_speech(chunk) if self._bot_speaking.is_set() else None
+                    event, frames = self.endpointer.process(chunk, is_speech)
 
-                    if is_speech:
-                        # 데이터를 정규화하고 필터링
-                        if self.speech_detected_frames == 0:
-                            user_input_start_time = get_current_timestamp()
+                    if event == START:
+                        user_input_start_time = get_current_timestamp()
+                        self._utterance_start_time = user_input_start_time
+                        self.transcriber.start()
 
-                        audio_data = np.frombuffer(chunk, dtype=np.int16).astype(np.float32) / 32767.0
+                    # 프레임은 transcriber 의 float32 버퍼에 바로 쓰인다
+                    for frame in frames:
+                        self.transcriber.push(frame)
 
-                        self.audio_buffer.append((audio_data * 32767).astype(np.int16).tobytes())
-                        self.speech_detected_frames += 1
-                    else:
-                        if self.speech_detected_frames >= 10:
-                            self.log("Processing detected speech...")
-
-                            # PCM 데이터를 합치고 WAV로 변환
-                            pcm_data = b"".join(self.audio_buffer)
-
-                            # 입력 데이터 길이 검증
-                            if len(pcm_data) < 16000:  # 최소 1초 데이터
-                                self.log("Insufficient audio data for transcription.")
-                                self.audio_buffer = []  # 초기화
-                                self.speech_detected_frames = 0
-                                continue
-                            if not pcm_data or len(pcm_data) == 0:
-                                raise ValueError("pcm_data is empty or None")
-
-                            wav_buffer = self._pcm_to_wav(pcm_data, mic.SAMPLE_RATE)
-
-                            # Whisper 모델로 텍스트 변환
-                            try:
-                                self.log("Whisper transcribe_audio")
-                                transcript = self._process_audio_data(wav_buffer)
-
-                                # Emit the same message format as Clova Recognizer
-                                if transcript:
-                                    if self.TEST_MODE:
-                                        print(f"Recognized: {transcript}")  # 터미널 출력
-                                    else:
-                                        self.chat_conected = False
-                                        if self.chat_done_flag :
-                                            if "대화하자" in transcript and "친구님" in transcript:
-                                                self.log("일어났어요.")
-                                                AsyncBroker().emit(("wake_up", None))
-                                        else :
-                                            user_input_end_time = get_current_timestamp()
-                                            
-                                            AsyncBroker().emit(("chat_cycle_time", {"content": "WHISPER MODE", "start_time": self.whisper_start_time, "end_time": user_input_end_time}))
-                                            AsyncBroker().emit(("chat_user_input", {"content": transcript, "start_time": user_input_start_time, "end_time": user_input_end_time}))
-                            except Exception as e:
-                                print(f"Whisper processing error: {e}")
-
-                        # 버퍼 및 상태 초기화
-                        self.audio_buffer = []
-                        self.speech_detected_frames = 0
+                    if self._bot_speaking.is_set() and self.endpointer.triggered and self.endpointer.speech_frames >= self.barge_in_frames:
+                        # 봇이 말하기 전부터 이어진 발화도 포함 (앞 발화를 인식하는 동안 녹음됨)
+                        self._barge_in()
+
+                    if event == END and not self._bot_speaking.is_set():
+                        self.log("Processing detected speech...")
+                        # 꼬리 디코딩은 인식 스레드에서
+                        self._utterances.put((self._listening_id, *self.transcriber.end(), user_input_start_time, self.whisper_start_time))
+                    elif event in (END, DISCARD):
+                        # 너무 짧은 소리, 또는 재생 중의 봇 목소리나 잡음
+                        self.transcriber.cancel()
 
                 except Exception as e:
                     self.log(f"Error in recognition routine: {e}")
                     break
 
+    def _transcribe_routine(self):
+        """
+        Recognition consumer: decodes the finished utterances in order and emits the user input.
+        """
+        while True:
+            listening_id, audio, committed, user_input_start_time, whisper_start_time = self._utterances.get()
+            if listening_id != self._listening_id:
+                continue  # 인식을 멈추기 전에 녹음된 발화
+            # Whisper 모델로 텍스트 변환 (말하는 동안 확정되지 않은 꼬리 부분만)
+            try:
+                self.log("Whisper transcribe_audio")
+                transcript = self.transcriber.decode_tail(audio, committed)
+                if listening_id != self._listening_id:
+                    self.log("Recognition stopped while decoding; dropped the transcript.")
+                    continue
+
+                # Emit the same message format as Clova Recognizer
+                if transcript:
+                    if self.TEST_MODE:
+                        print(f"Recognized: {transcript}")  # 터미널 출력
+                    else:
+                        if self.chat_done_flag :
+                            if "대화하자" in transcript and "친구님" in transcript:
+                                self.log("일어났어요.")
+                                AsyncBroker().emit(("wake_up", None))
+                        else :
+                            user_input_end_time = get_current_timestamp()
+                            turn_id = new_turn_id()
+                            
+                            AsyncBroker().emit(("chat_cycle_time", {"content": "WHISPER MODE", "start_time": whisper_start_time, "end_time": user_input_end_time, "turn_id": turn_id}))
+                            AsyncBroker().emit(("chat_user_input", {"content": transcript, "start_time": user_input_start_time, "end_time": user_input_end_time, "turn_id": turn_id}))
+            except Exception as e:
+                print(f"Whisper processing error: {e}")
+
+    def capture_stats(self) -> dict:
+        """
+        Frames recorded / dropped because the VAD thread fell behind, PortAudio input overflows,
+        and utterances waiting for Whisper.
+        """
+
+        return {**self.mic.stats(), "pending_utterances": self._utterances.qsize()}
+
     def _on_chat_listening_start(self, _: AsyncMessageType[None]):
         """
         Start the speech recognition routine when listening starts.
         """
+        self._bot_speaking.clear()
         if self.chat_conected:
             self.log("Already start Whisper recognition.")
             return  
         if not ChatWindow.use_whisper:
             self.log("Whisper disabled (keyboard mode)")
             return
+        if self._recognize_thread is not None:
+            # 끝난 (또는 끝나는 중인) 이전 인식 스레드
+            self._recognize_thread.join()
         self.chat_conected = True
         self._mic_end.clear()
         self._recognize_thread = Thread(target=self._recognize_routine)
         self._recognize_thread.start()
         self.whisper_start_time = get_current_timestamp()
 
+    def _on_partial_transcript(self, text: str):
+        """
+        Called from the transcriber's worker thread with the hypothesis of the utterance so far.
+        """
+        if self.TEST_MODE:
+            print(f"Partial: {text}")
+        elif not self.chat_done_flag:
+            AsyncBroker().emit(("chat_partial_transcript", {"content": text, "start_time": self._utterance_start_time}))
+
+    def _is_barge_in_speech(self, chunk: bytes) -> bool:
+        """
+        Whether a 20ms frame recorded during playback is loud enough and speech-like enough to be the user.
+        """
+        if frameEnergy(chunk) < self.barge_in_energy:
+            return False
+
+        return self.barge_in_vad.is_speech(chunk, sample_rate=16000)
+
+    def _barge_in(self):
+        """
+        The user started talking over the bot: stop the reply and keep recording this utterance as the next input.
+        """
+        self.log("Barge-in detected.")
+        self._bot_speaking.clear()
+        self.whisper_start_time = get_current_timestamp()
+        AsyncBroker().emit(("chat_barge_in", None))
+
     def _on_chat_user_input(self, _: AsyncMessageType[None]):
         """
         Stop recognition when user input is detected.
+        In barge-in mode keep listening while the bot answers.
         """
+        if self.barge_in and ChatWindow.use_whisper:
+            self._bot_speaking.set()
+            return
         self._stop_recognition()
 
     def _on_chat_done(self, _: AsyncMessageType[None]):
@@ -196,6 +230,7 @@ class FasterWhisperRecognizer(Loggable):
         Stop recognition when chat is done.
         """
         self.log("Whisper Chat Done")
+        self._bot_speaking.clear()
         self._stop_recognition()
 
     def _stop_recognition(self):
@@ -207,7 +242,16 @@ class FasterWhisperRecognizer(Loggable):
         if self._recognize_thread is not None:
             self._recognize_thread.join()
             self._recognize_thread = None
-        self.log("Stopped recognition.")
+        # 아직 인식하지 않은 발화는 버린다 (인식 중인 것도 결과를 내지 않음)
+        self._listening_id += 1
+        while True:
+            try:
+                self._utterances.get_nowait()
+            except Empty:
+                break
+        self.transcriber.cancel()
+        self.endpointer.reset()
+        self.log(f"Stopped recognition. {self.capture_stats()}")
     
     def _on_chat_done_listening(self, msg: AsyncMessageType):
         self.log("Whisper_친구님 인식 시작")
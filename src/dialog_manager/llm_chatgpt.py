@@ -1,34 +1,48 @@
 from pydantic import BaseModel, ValidationError
 import yaml
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from contextlib import asynccontextmanager
 import asyncio
+import json
+import os
 
 from ..lib.time_stamp import get_current_timestamp
 from ..lib.loggable import Loggable
 from ..lib.phasemanager import PhaseManager
 from ..lib.phase import Phase
-from ..lib.DB import initialize, addMessage, getHistory, reset, saveConversation
+from ..lib.DB import initialize, shutdown, addMessage, getHistoryAsync
+from ..lib.turn_scheduler import Turn, TurnScheduler
 from ..graphics.chat_window import ChatWindow
-from langchain_core.prompts import PromptTemplate
-from langchain_openai import ChatOpenAI
-from typing import Any
 
 import threading
 from ..async_event import AsyncBroker, AsyncMessageType
-from .hugging_face_transformers_emotion import EmotionAnalyzer
+from .emotion_service import EmotionService
+from .chain_registry import ChainRegistry
+from .session_manager import ChatSessionManager
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Initialize DB
     initialize()
 
-    # reset DB
-    reset()
+    # 워커 프로세스마다 LLM 클라이언트/체인과 세션 매니저를 하나씩 둔다
+    phase_template = buildPhaseManager(getTestSettingData())
+    chains = ChainRegistry()
+    chains.compile(list(phase_template.phase_dict.values()))
+    await chains.warm_up()
+    chains.start_keep_warm(float(os.getenv("LLM_KEEPALIVE_INTERVAL", "30")))
+    app.state.sessions = ChatSessionManager(phase_template, chains)
+    scheduler = asyncio.create_task(app.state.sessions.run())
 
     yield
 
+    scheduler.cancel()
+    await chains.aclose()
+    # 큐에 남은 기록을 commit 하고 닫는다
+    await asyncio.to_thread(shutdown)
+
 
 # Set FastAPI app
 app = FastAPI(lifespan=lifespan)
@@ -71,6 +85,124 @@ class chatbotSettingData(BaseModel):
 class userInputData(BaseModel):
     input: str
 
+
+def getSessionManager(request: Request) -> ChatSessionManager:
+
+    return request.app.state.sessions
+
+
+def checkSession(sessions: ChatSessionManager, session_id: str):
+    try:
+        sessions.get_session(session_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+def userMessage(data: userInputData) -> dict:
+    now = get_current_timestamp()
+
+    return {"content": data.input, "start_time": now, "end_time": now, "speaker": "USER_KEYBOARD"}
+
+
+def sseEvent(event: str, payload: dict) -> str:
+
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
+@app.post("/sessions")
+async def createChatSession(request: Request):
+    """
+    Start a session and return its id with the bot's opening message.
+    """
+    sessions = getSessionManager(request)
+    session = sessions.create_session()
+    response, _ = await sessions.submit(session.session_id, None)
+
+    return {
+        "session_id": session.session_id,
+        "response": response,
+        "phase": session.phase_manager.getCurrPhase().getName(),
+    }
+
+
+@app.delete("/sessions/{session_id}")
+async def closeChatSession(session_id: str, request: Request):
+    sessions = getSessionManager(request)
+    checkSession(sessions, session_id)
+    # 실행 중인 턴은 취소되고, 세션 상태는 그 턴이 끝난 뒤 세션 매니저가 놓는다
+    sessions.close_session(session_id)
+
+    return {"session_id": session_id}
+
+
+@app.post("/sessions/{session_id}/messages")
+async def postUserInput(session_id: str, data: userInputData, request: Request):
+    """
+    Run one turn and return the whole reply.
+    """
+    sessions = getSessionManager(request)
+    checkSession(sessions, session_id)
+    phase_manager = sessions.get_session(session_id).phase_manager
+    response, changed = await sessions.submit(session_id, userMessage(data))
+
+    return {
+        "response": response,
+        "phase": phase_manager.getCurrPhase().getName(),
+        "phase_changed": changed,
+    }
+
+
+@app.post("/sessions/{session_id}/messages/stream")
+async def streamUserInput(session_id: str, data: userInputData, request: Request):
+    """
+    Run one turn and stream it as server-sent events:
+    "sentence" for every sentence of the reply as soon as it is generated, "phase" with the next phase as soon as
+    the selector decides the transition, then "done" with the whole reply and the current phase (or "error").
+    """
+    sessions = getSessionManager(request)
+    checkSession(sessions, session_id)
+    phase_manager = sessions.get_session(session_id).phase_manager
+
+    async def events():
+        queue = asyncio.Queue()
+
+        async def on_sentence(sentence: str):
+            await queue.put(("sentence", {"text": sentence}))
+
+        async def on_phase(phase: str):
+            await queue.put(("phase", {"phase": phase}))
+
+        turn = sessions.submit(session_id, userMessage(data), on_sentence, on_phase)
+        turn.add_done_callback(lambda _: queue.put_nowait(None))
+        try:
+            while (item := await queue.get()) is not None:
+                yield sseEvent(*item)
+
+            try:
+                response, _ = turn.result()
+            except (Exception, asyncio.CancelledError) as e:
+                # 턴 실패 또는 스트리밍 중에 세션이 닫힘
+                yield sseEvent("error", {"detail": str(e) or type(e).__name__})
+                return
+            yield sseEvent("done", {"response": response, "phase": phase_manager.getCurrPhase().getName()})
+        finally:
+            # 클라이언트가 끊으면 턴도 취소해 LLM 슬롯을 돌려준다
+            if not turn.done():
+                turn.cancel()
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.get("/sessions/{session_id}/history")
+async def getChatHistory(session_id: str, request: Request, since_turn: int = 0):
+    checkSession(getSessionManager(request), session_id)
+    rows = await getHistoryAsync(session_id, since_turn)
+
+    return [
+        {"speaker": SPEAKER, "content": CONTENT, "start_time": START_TIME, "end_time": END_TIME, "turn": TURN}
+        for SPEAKER, CONTENT, START_TIME, END_TIME, TURN in rows
+    ]
+
 # get setting data from yaml file
 def getTestSettingData() -> chatbotSettingData:
     try:
@@ -87,8 +219,7 @@ def getTestSettingData() -> chatbotSettingData:
 
     return data
 
-# save chatbot setting for test
-def saveTestSetting(data: chatbotSettingData) -> PhaseManager:
+def buildPhaseManager(data: chatbotSettingData) -> PhaseManager:
     phase_manager = PhaseManager(data.bot_name, data.bot_desc)
 
     for phase in data.phases:
@@ -101,17 +232,13 @@ def saveTestSetting(data: chatbotSettingData) -> PhaseManager:
             phase.instruction,
             dict_router_list,
         )
+        new_phase.precompile()
         phase_manager.addNewPhase(new_phase)
 
     phase_manager.addNewPhase(Phase("FINISH", "", [], "", []))
     phase_manager.setStartPhase(data.start_phase)
     phase_manager.setCurrPhase(data.start_phase)
     # print(f"current phase: {data.start_phase}")
-    # reset DB for new chatbot
-    reset()
-    PHASE_end_time = get_current_timestamp()
-    addMessage("PHASE", data.start_phase, PHASE_end_time, PHASE_end_time)
-
 
     action_dict = {}
     for action in data.actions:
@@ -121,140 +248,54 @@ def saveTestSetting(data: chatbotSettingData) -> PhaseManager:
 
     return phase_manager
 
-async def selectTopic(phase_manager: PhaseManager, conversation_history: str) -> Any:
-    bot_name, bot_desc = phase_manager.getBotInfo()
-    actions = phase_manager.getTopics()
-    phase_info = phase_manager.getCurrPhase().getInfo()
-    response_format = phase_manager.getCurrPhase().getResponseFormat()
-
-    llm = ChatOpenAI(model="gpt-4o", temperature=1)
-    llm = llm.with_structured_output(response_format)
-
-    prompt_template = PromptTemplate.from_template(
-        """
-    [Task]
-    You are an action selector of the {bot_name}, which is {bot_desc}. 
-    Your role is to do two things with reference to the "Context".
-    1. Decide whether the main goal of the current phase is achieved. And if it is achieved, select which phase to go next.
-    2. Decide which action to use for the current conversation turn. You can only select one action from the available actions below.
-    
-    [Context]
-    - current phase name: {phase_name}
-    - current phase goal: {phase_goal}
-    - available actions: {phase_actions}
-    - current phase instruction: {phase_instruction}
-    - conversation history: {conversation_history}
-    """
-    )
-
-    chain = prompt_template | llm
-    response = await chain.ainvoke(
-        {
-            "bot_name": bot_name,
-            "bot_desc": bot_desc,
-            "phase_name": phase_info["name"],
-            "phase_goal": phase_info["goal"],
-            "phase_actions": actions,
-            "phase_instruction": phase_info["instruction"],
-            "conversation_history": conversation_history,
-        }
-    )
-
-    return response
-
-async def generateResponse(
-    phase_manager: PhaseManager,
-    conversation_history: str,
-    action: str,
-    action_reason: str,
-) -> str:
-    bot_name, bot_desc = phase_manager.getBotInfo()
-    phase_info = phase_manager.getCurrPhase().getInfo()
-    
-    llm = ChatOpenAI(model="gpt-4o", temperature=1)
-
-    prompt_template = PromptTemplate.from_template(
-        """
-    [Task]
-    You are a response generator of the {bot_name}, which is {bot_desc}.
-    To achieve the "phase goal" within the total conversation, one "action" is selected for the current conversation turn.
-    Your role is to make a chatbot response for this turn according to the "Context".
-    You MUST ask or respond about one subject at a time.
-    The response MUST be in KOREAN.
-    
-    [Context]
-    - current phase name: {phase_name}
-    - current phase goal: {phase_goal}
-    - selected action: {action}
-    - reason for the action selection: {action_reason}
-    - conversation history: {conversation_history}
-    """
-    )
-
-    chain = prompt_template | llm
-    response = await chain.ainvoke(
-        {
-            "bot_name": bot_name,
-            "bot_desc": bot_desc,
-            "phase_name": phase_info["name"],
-            "phase_goal": phase_info["goal"],
-            "action": action,
-            "action_reason": action_reason,
-            "conversation_history": conversation_history + "\nCUMPAR: ",
-        }
-    )
-
-    return response
-
-
-async def executeChatbot(
-    phase_manager: PhaseManager, conversation_history: str
-) -> tuple[str, bool]:
-    selector_response = await selectTopic(phase_manager, conversation_history)
-    
-    # next_phase_info = ""
-    # if selector_response.next_phase:
-    #     next_phase_info += f"\n- next phase name: {selector_response.next_phase}"
-    #     next_phase_info += f"\n- next phase reason: {selector_response.next_phase_reason}"
-        
-    chatbot_response = await generateResponse(
-        phase_manager,
-        conversation_history,
-        phase_manager.getTopics()[selector_response.action],
-        selector_response.action_reason,
-        # next_phase_info,
-    )
-    changed = phase_manager.goNextPhase(selector_response.next_phase)
-
-    return chatbot_response.content, changed
-
 class LLMChatManager(threading.Thread, Loggable):
     def __init__(self):
         threading.Thread.__init__(self)
         Loggable.__init__(self)
         self.set_tag("llm_chat")
-        self.emotion_analyzer = EmotionAnalyzer()
-
-        self.phase_manager = None
+        # 감정 분석은 워커 스레드에서 (모델도 그 스레드에서 로드)
+        self.emotion_analyzer = EmotionService()
+
+        # 응답을 문장 단위로 스트리밍하여 TTS 로 넘길지 여부
+        self.streaming = os.getenv("LLM_STREAMING", "True").lower() == "true"
+        # "two_call" (selector + generator), "single_call" (one structured-output call)
+        # or "speculative" (generator runs for the predicted action while the selector runs)
+        self.execution_mode = os.getenv("LLM_EXECUTION_MODE", "two_call")
+        # LLM 클라이언트와 프롬프트 체인은 대화 내내 재사용한다 (이벤트 루프 안에서 생성)
+        self.chains = None
+        # 이 데스크톱 앱의 대화도 세션 매니저의 한 세션으로 실행된다
+        self.sessions = None
+
+        self.session_id = None
         self._loop = None
-        self._input_queue = asyncio.Queue()
-        self._cycle_time_queue = asyncio.Queue()
+        self.turns = None
+        self._turn_task = None
+        self._response_id = 0  # chat_response(_chunk) 를 응답 단위로 구분 (barge-in 때 재생 취소용)
         self._stop_event = threading.Event()
 
         AsyncBroker().subscribe("chat_cycle_time", self._on_cycle_time)
         AsyncBroker().subscribe("chat_user_input", self._on_user_input)
         AsyncBroker().subscribe("wake_up", self._on_wake_up)
+        AsyncBroker().subscribe("chat_barge_in", self._on_barge_in)
     
-    async def _on_wake_up(self, _: tuple[str, None]):
-        await self._handle_first_input()
+    def _on_wake_up(self, _: tuple[str, None]):
+        self._call_soon(lambda: self.turns.add_turn(Turn(None, None, None)))
 
     def _on_cycle_time(self, msg: dict):
-        if self._loop and not self._loop.is_closed():
-            asyncio.run_coroutine_threadsafe(self._cycle_time_queue.put(msg), self._loop)
+        self._call_soon(lambda: self.turns.add_cycle_time(msg))
 
     def _on_user_input(self, msg: dict):
         self.submit_input(msg)        
 
+    def _on_barge_in(self, _: tuple[str, None]):
+        self._call_soon(self._cancel_turn)
+
+    def _call_soon(self, callback, *args):
+        # 브로커 스레드에서 받은 메시지를 채팅 루프 스레드로 넘긴다
+        # (self.turns 는 채팅 루프가 시작된 뒤에 생기므로 callback 안에서 참조한다)
+        if self._loop and not self._loop.is_closed() and self.turns is not None:
+            self._loop.call_soon_threadsafe(callback, *args)
+
     def run(self):
         self._loop = asyncio.new_event_loop()
         asyncio.set_event_loop(self._loop)
@@ -266,68 +307,119 @@ class LLMChatManager(threading.Thread, Loggable):
             self._loop.call_soon_threadsafe(self._loop.stop)
 
     async def _start_chat_loop(self):
+        self.turns = TurnScheduler()
         initialize()
         # phase_manager 초기화
         data = getTestSettingData()
-        self.phase_manager = saveTestSetting(data)
-        await self._handle_first_input()
+        phase_template = buildPhaseManager(data)
+        self.chains = ChainRegistry()
+        self.chains.compile(list(phase_template.phase_dict.values()))
+        await self.chains.warm_up()
+        self.chains.start_keep_warm(float(os.getenv("LLM_KEEPALIVE_INTERVAL", "30")))
+        self.sessions = ChatSessionManager(phase_template, self.chains, mode=self.execution_mode)
+        asyncio.create_task(self.sessions.run())
+        session = self.sessions.create_session()
+        self.session_id = session.session_id
+        # 음성 세션을 끝내는 wait_chat_finish 는 이 (키오스크) 세션만 보낸다. HTTP 세션은 보내지 않음
+        session.phase_manager.on_finish = lambda: AsyncBroker().emit(("wait_chat_finish", None))
+        self.turns.add_turn(Turn(None, None, None))
 
         print("[LLMChat] Started. Waiting for user input...")
         while not self._stop_event.is_set():
-            try:
-                cycle_time = await asyncio.wait_for(self._cycle_time_queue.get(), timeout=0.1)
-                user_input = await asyncio.wait_for(self._input_queue.get(), timeout=0.1)
-                await self._handle_cycle_time(cycle_time)
-                await self._handle_user_input(user_input)
-            except asyncio.TimeoutError:
-                continue
+            turn = await self.turns.next_turn()
+            # 새 입력은 이전 응답 뒤에 줄을 선다 (응답을 끊는 것은 barge-in 뿐: _on_barge_in)
+            if self._turn_task is not None:
+                await asyncio.wait([self._turn_task])
+            self._turn_task = asyncio.create_task(self._run_turn(turn))
+
+    def _cancel_turn(self):
+        if self._turn_task is not None and not self._turn_task.done():
+            self.log("Cancelling the turn in progress")
+            self._turn_task.cancel()
+
+    async def _run_turn(self, turn: Turn):
+        try:
+            if turn.cycle_time is not None:
+                await self._handle_cycle_time(turn.cycle_time)
+            if turn.user_input is None:
+                await self._handle_first_input(turn)
+            else:
+                await self._handle_user_input(turn)
+        except asyncio.CancelledError:
+            self.log(f"Turn {turn.turn_id} cancelled")
+            if turn.response_id is not None:
+                # 이미 내보낸 문장들의 합성/재생도 버리게 한다
+                AsyncBroker().emit(("chat_response_cancelled", {"response_id": turn.response_id}))
+        except Exception as e:
+            print(f"[LLMChat] turn {turn.turn_id} failed: {e}")
 
     async def _handle_cycle_time(self, msg: dict):
-        cycle_time_text, start_time, end_time = msg
         cycle_time_text = msg["content"]
         cycle_start_time = msg["start_time"]
         cycle_end_time = msg["end_time"]
-        addMessage("MODE_TURN", cycle_time_text, cycle_start_time, cycle_end_time)
+        addMessage(self.session_id, "MODE_TURN", cycle_time_text, cycle_start_time, cycle_end_time)
 
 
-    async def _handle_first_input(self):
-        response_start_time = get_current_timestamp()
-        response, changed = await executeChatbot(self.phase_manager, getHistory())
-        response_end_time = get_current_timestamp()
-        addMessage("CUMPAR", response, response_start_time, response_end_time)
-        if changed:
-            PHASE_end_time = get_current_timestamp()
-            addMessage("PHASE", self.phase_manager.getCurrPhase().getName(), PHASE_end_time, PHASE_end_time)
+    async def _handle_first_input(self, turn: Turn):
+        await self._respond(turn, None)
 
-        print(f"[LLMChat] CUMPAR: {response}")
-        AsyncBroker().emit(("chat_response", {"msg": response, "type": "text", "emotion": "중립"}))
-
-    async def _handle_user_input(self, msg: dict):
+    async def _handle_user_input(self, turn: Turn):
+        msg = turn.user_input
         user_input = msg["content"]
-        user_start_time = msg["start_time"]
-        user_end_time = msg["end_time"]
-        
-        if ChatWindow.use_whisper:
-            addMessage("USER_WHISPER", user_input, user_start_time, user_end_time)
-        else:
-            addMessage("USER_KEYBOARD", user_input, user_start_time, user_end_time)
-        
-        if user_input and self.emotion_analyzer:
-            emotion_result = self.emotion_analyzer.analyze_emotion(user_input)
+        speaker = "USER_WHISPER" if ChatWindow.use_whisper else "USER_KEYBOARD"
+
+        # 감정 분석은 LLM 호출과 동시에 돌리고, 응답을 내보낼 때(TTS 가 감정을 필요로 할 때) 합류한다
+        emotion = asyncio.ensure_future(self._analyze_emotion(user_input))
+        try:
+            await self._respond(turn, {**msg, "speaker": speaker}, emotion)
+        finally:
+            emotion.cancel()
+
+    async def _analyze_emotion(self, user_input: str) -> str:
+        if not user_input or not self.emotion_analyzer:
+            return "중립"
+        try:
+            emotion = await self.emotion_analyzer.analyze(user_input)
             self.log(f"Emotion analysis user_input: {user_input}")
-            self.log(f"Emotion analysis result: {emotion_result}")
+            self.log(f"Emotion analysis result: {emotion}")
+            return emotion.group
+        except Exception as e:
+            self.log(f"Emotion analysis failed: {e}")
+            return "중립"
+
+    async def _respond(self, turn: Turn, msg: dict | None, emotion: asyncio.Future | None = None):
+        """
+        Run the chatbot for this turn and emit the response.
+        In streaming mode every sentence is emitted as a chat_response_chunk as soon as it is generated,
+        followed by a final (empty) chunk that closes the utterance.
+        emotion: the user's emotion group, still being analyzed while the chatbot runs;
+        it is awaited only when the first sentence is emitted.
+        The response_id is kept on the turn, so cancelling the turn cancels exactly this response.
+        """
+        self._response_id += 1
+        response_id = turn.response_id = self._response_id
+
+        async def emotion_label() -> str:
+            return await emotion if emotion is not None else "중립"
+
+        on_sentence = None
+        if self.streaming:
+            chunk_index = 0
+
+            async def on_sentence(sentence: str):
+                nonlocal chunk_index
+                AsyncBroker().emit(("chat_response_chunk", {"msg": sentence, "type": "text", "emotion": await emotion_label(), "index": chunk_index, "final": False, "response_id": response_id}))
+                chunk_index += 1
 
-        response_start_time = get_current_timestamp()
-        response, changed = await executeChatbot(self.phase_manager, getHistory())
-        response_end_time = get_current_timestamp()
-        addMessage("CUMPAR", response, response_start_time, response_end_time)
-        if changed:
-            PHASE_end_time = get_current_timestamp()
-            addMessage("PHASE", self.phase_manager.getCurrPhase().getName(), PHASE_end_time, PHASE_end_time)
+        response, changed = await self.sessions.submit(self.session_id, msg, on_sentence)
+        if self.execution_mode == "speculative":
+            self.log(f"Speculation stats:\n{self.sessions.speculation_stats.summary()}")
 
         print(f"[LLMChat] CUMPAR: {response}")
-        AsyncBroker().emit(("chat_response", {"msg": response, "type": "text", "emotion": emotion_result}))
+        emotion_result = await emotion_label()
+        if self.streaming:
+            AsyncBroker().emit(("chat_response_chunk", {"msg": "", "type": "text", "emotion": emotion_result, "index": chunk_index, "final": True, "response_id": response_id}))
+        AsyncBroker().emit(("chat_response", {"msg": response, "type": "text", "emotion": emotion_result, "streamed": self.streaming, "response_id": response_id}))
 
     def submit_input(self, msg: dict):
-        if self._loop and not self._loop.is_closed():
-            asyncio.run_coroutine_threadsafe(self._input_queue.put(msg), self._loop)
+        self._call_soon(lambda: self.turns.add_input(msg))
@@ -0,0 +1,246 @@
+"""
+Many conversation sessions on one event loop.
+Each session keeps its own PhaseManager state, history and input queue; the turns of all sessions
+share a bounded number of LLM slots and are scheduled round-robin between sessions.
+"""
+import asyncio
+import os
+from collections import deque
+from typing import Awaitable, Callable
+
+from ..lib.DB import addMessage, createSession, getConversationHistory, getPromptHistory, releaseSession
+from ..lib.phasemanager import PhaseManager
+from ..lib.time_stamp import get_current_timestamp
+from .chain_registry import ChainRegistry
+from .chatbot import executeChatbot
+from .speculation import ActionPredictor, SpeculationStats
+
+
+class ChatTurn:
+    """
+    One queued turn: the user's message (None for the bot's opening turn) and the future of its result.
+    """
+
+    def __init__(
+        self,
+        msg: dict | None,
+        on_sentence: Callable[[str], Awaitable[None]] | None,
+        on_phase: Callable[[str], Awaitable[None]] | None = None,
+    ):
+        self.msg = msg
+        self.on_sentence = on_sentence
+        self.on_phase = on_phase
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.task: asyncio.Task | None = None
+        # 호출한 쪽이 future 를 취소하면 실행 중인 LLM 호출도 취소한다
+        self.future.add_done_callback(self._on_future_done)
+
+    def _on_future_done(self, future: asyncio.Future):
+        if future.cancelled() and self.task is not None:
+            self.task.cancel()
+
+
+class ChatSession:
+    def __init__(self, session_id: str, phase_manager: PhaseManager):
+        self.session_id = session_id
+        self.phase_manager = phase_manager
+        self.predictor = ActionPredictor()
+        self.input_queue: deque[ChatTurn] = deque()
+        self.scheduled = False  # 스케줄러의 대기열에 올라가 있거나 턴을 실행 중인지
+        self.running: ChatTurn | None = None  # 실행 중인 턴
+        self.summary_task: asyncio.Task | None = None  # 오래된 대화를 요약에 합치는 중인 LLM 호출
+
+
+class ChatSessionManager:
+    """
+    Usage:
+    ```
+    sessions = ChatSessionManager(phase_template, chains)
+    asyncio.create_task(sessions.run())
+    session = sessions.create_session()
+    result = await sessions.submit(session.session_id, {"content": "안녕", "speaker": "USER_KEYBOARD", ...})
+    ```
+    """
+
+    def __init__(
+        self,
+        phase_template: PhaseManager,
+        chains: ChainRegistry,
+        max_concurrency: int | None = None,
+        mode: str | None = None,
+        candidates: int | None = None,
+    ):
+        self.phase_template = phase_template
+        self.chains = chains
+        self.mode = mode or os.getenv("LLM_EXECUTION_MODE", "two_call")
+        self.candidates = candidates or int(os.getenv("LLM_SPECULATIVE_CANDIDATES", "1"))
+        # 프롬프트 윈도우에서 밀려난 줄이 이만큼 쌓이면 요약에 합친다 (0 이면 요약하지 않음)
+        self.summary_lines = int(os.getenv("HISTORY_SUMMARY_LINES", "4"))
+        self.speculation_stats = SpeculationStats(
+            [name for name, phase in phase_template.phase_dict.items() if phase.topic_list]
+        )
+
+        self._sessions: dict[str, ChatSession] = {}
+        # LLM 프로바이더로 동시에 나가는 턴 수 제한
+        self._llm_slots = asyncio.Semaphore(max_concurrency or int(os.getenv("LLM_MAX_CONCURRENCY", "8")))
+        # 입력이 대기 중인 세션들 (한 세션은 한 번에 한 턴만 실행, 순서대로 돌아가며 처리)
+        self._ready: deque[ChatSession] = deque()
+        self._wakeup = asyncio.Event()
+
+    def create_session(self) -> ChatSession:
+        bot_name, _ = self.phase_template.getBotInfo()
+        session_id = createSession(bot_name)
+        session = ChatSession(session_id, self.phase_template.clone())
+        self._sessions[session_id] = session
+
+        # 새 세션의 시작 phase 기록
+        PHASE_end_time = get_current_timestamp()
+        addMessage(session_id, "PHASE", session.phase_manager.getCurrPhase().getName(), PHASE_end_time, PHASE_end_time)
+
+        return session
+
+    def get_session(self, session_id: str) -> ChatSession:
+        if session_id not in self._sessions:
+            raise KeyError(f"There is no session '{session_id}'")
+
+        return self._sessions[session_id]
+
+    def close_session(self, session_id: str):
+        session = self._sessions.pop(session_id, None)
+        if session is not None:
+            for turn in session.input_queue:
+                turn.future.cancel()
+            if session.running is not None:
+                # 실행 중인 LLM 호출도 취소한다 (future 가 취소되면 task 도 취소됨)
+                session.running.future.cancel()
+            if session.summary_task is not None:
+                session.summary_task.cancel()
+            if not session.scheduled:
+                releaseSession(session_id)
+            # 아니면 실행 중인 턴이 끝난 뒤 _unschedule() 에서 (턴이 기록을 더 남기므로)
+
+    def submit(
+        self,
+        session_id: str,
+        msg: dict | None,
+        on_sentence: Callable[[str], Awaitable[None]] | None = None,
+        on_phase: Callable[[str], Awaitable[None]] | None = None,
+    ) -> asyncio.Future:
+        """
+        Queue a turn of the session and return a future of (response, phase changed).
+        msg: {"content", "start_time", "end_time", "speaker"} of the user input, or None for the opening turn.
+        on_sentence gets every sentence of the reply as it is generated, on_phase the next phase once it is decided.
+        """
+        session = self.get_session(session_id)
+        turn = ChatTurn(msg, on_sentence, on_phase)
+        session.input_queue.append(turn)
+        if not session.scheduled:
+            session.scheduled = True
+            self._ready.append(session)
+            self._wakeup.set()
+
+        return turn.future
+
+    async def run(self):
+        """
+        Scheduler loop: whenever an LLM slot is free, start the next turn of the next waiting session.
+        """
+        while True:
+            await self._llm_slots.acquire()
+            while not self._ready:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+
+            session = self._ready.popleft()
+            if not session.input_queue:
+                # 대기 중에 닫힌 세션
+                self._unschedule(session)
+                self._llm_slots.release()
+                continue
+            turn = session.input_queue.popleft()
+            session.running = turn
+            turn.task = asyncio.create_task(self._run_turn(session, turn))
+
+    async def _run_turn(self, session: ChatSession, turn: ChatTurn):
+        try:
+            if turn.future.done():
+                # 대기열에 있는 동안 취소된 턴
+                return
+            result = await self._execute(session, turn)
+            if not turn.future.done():
+                turn.future.set_result(result)
+        except asyncio.CancelledError:
+            turn.future.cancel()
+        except Exception as e:
+            if not turn.future.done():
+                turn.future.set_exception(e)
+        finally:
+            session.running = None
+            self._llm_slots.release()
+            if session.input_queue and session.session_id in self._sessions:
+                # 다음 턴은 대기열 맨 뒤로 (다른 세션 먼저)
+                self._ready.append(session)
+                self._wakeup.set()
+            else:
+                self._unschedule(session)
+
+    def _unschedule(self, session: ChatSession):
+        session.scheduled = False
+        if session.session_id not in self._sessions:
+            releaseSession(session.session_id)
+
+    async def _execute(self, session: ChatSession, turn: ChatTurn) -> tuple[str, bool]:
+        if turn.msg is not None:
+            addMessage(
+                session.session_id,
+                turn.msg.get("speaker", "USER_KEYBOARD"),
+                turn.msg["content"],
+                turn.msg["start_time"],
+                turn.msg["end_time"],
+            )
+
+        response_start_time = get_current_timestamp()
+        response, changed = await executeChatbot(
+            self.chains,
+            session.phase_manager,
+            getPromptHistory(session.session_id),
+            on_sentence=turn.on_sentence,
+            mode=self.mode,
+            predictor=session.predictor,
+            stats=self.speculation_stats,
+            candidates=self.candidates,
+            on_phase=turn.on_phase,
+        )
+        response_end_time = get_current_timestamp()
+        addMessage(session.session_id, "CUMPAR", response, response_start_time, response_end_time)
+        if changed:
+            PHASE_end_time = get_current_timestamp()
+            addMessage(session.session_id, "PHASE", session.phase_manager.getCurrPhase().getName(), PHASE_end_time, PHASE_end_time)
+        self._summarize_later(session)
+
+        return response, changed
+
+    def _summarize_later(self, session: ChatSession):
+        """
+        Merge the lines that fell out of the prompt window into the session's summary,
+        in the background so the turn does not wait for it (the next turns use it once it is done).
+        """
+        history = getConversationHistory(session.session_id)
+        _, lines, _ = history.pending()
+        if self.summary_lines <= 0 or len(lines) < self.summary_lines or session.summary_task is not None:
+            return
+        session.summary_task = asyncio.create_task(self._summarize(session, history))
+
+    async def _summarize(self, session: ChatSession, history):
+        summary, lines, merged = history.pending()
+        try:
+            result = await self.chains.summarizer().ainvoke({
+                "summary": summary or "(none)",
+                "lines": "\n".join(lines),
+                "max_chars": history.summary_budget * 4 // 3,
+            })
+            history.apply_summary(result.content, merged)
+        except Exception as e:
+            print(f"[ChatSessionManager] summary of session {session.session_id} failed: {e}")
+        finally:
+            session.summary_task = None
@@ -0,0 +1,68 @@
+"""
+Helpers for the speculative execution mode, in which the response is generated
+for the predicted action(s) while the action selector is still running.
+"""
+from collections import Counter
+
+
+class ActionPredictor:
+    """
+    Cheap next-action predictor.
+    Ranks the available actions of a phase by: the action selected in the previous turn of the same phase,
+    then how often each action was selected in that phase, then the order of the phase's action list.
+    """
+
+    def __init__(self):
+        self._last_action: dict[str, str] = {}
+        self._counts: dict[str, Counter] = {}
+
+    def predict(self, phase_name: str, actions: list[str], n: int = 1) -> list[str]:
+        counts = self._counts.get(phase_name, Counter())
+        last_action = self._last_action.get(phase_name)
+
+        ranked = sorted(
+            actions,
+            key=lambda action: (action != last_action, -counts[action], actions.index(action)),
+        )
+        return ranked[:n]
+
+    def update(self, phase_name: str, action: str):
+        self._last_action[phase_name] = action
+        self._counts.setdefault(phase_name, Counter())[action] += 1
+
+
+class SpeculationStats:
+    """
+    Hit-rate and latency-saved metrics of the speculative mode, per phase.
+    """
+
+    def __init__(self, phase_names: list[str]):
+        self._stats = {name: self._empty() for name in phase_names}
+
+    def _empty(self) -> dict:
+        return {"turns": 0, "hits": 0, "latency_saved": 0.0, "wasted_generations": 0}
+
+    def record(self, phase_name: str, hit: bool, latency_saved: float, wasted_generations: int):
+        stats = self._stats.setdefault(phase_name, self._empty())
+        stats["turns"] += 1
+        stats["hits"] += int(hit)
+        stats["latency_saved"] += latency_saved
+        stats["wasted_generations"] += wasted_generations
+
+    def hit_rate(self, phase_name: str) -> float:
+        stats = self._stats.get(phase_name, self._empty())
+        return stats["hits"] / stats["turns"] if stats["turns"] else 0.0
+
+    def get_stats(self) -> dict[str, dict]:
+        return {name: dict(stats) for name, stats in self._stats.items()}
+
+    def summary(self) -> str:
+        lines = []
+        for name, stats in self._stats.items():
+            if not stats["turns"]:
+                continue
+            lines.append(
+                f"{name}: hit rate {self.hit_rate(name):.0%} ({stats['hits']}/{stats['turns']}), "
+                f"latency saved {stats['latency_saved']:.2f}s, wasted generations {stats['wasted_generations']}"
+            )
+        return "\n".join(lines)
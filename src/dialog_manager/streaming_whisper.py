@@ -0,0 +1,191 @@
+"""
+Transcription of an utterance while it is being spoken.
+"""
+import os
+import threading
+from typing import Callable
+
+import numpy as np
+
+from ..lib.loggable import Loggable
+from ..lib.pcm_buffer import PCMBuffer
+
+
+class StreamingTranscriber(Loggable):
+    """
+    A worker thread re-decodes the growing, not yet committed part of the utterance every {partial_interval}
+    seconds of new audio (greedy search) and reports it as a partial hypothesis.
+    Leading segments that two consecutive hypotheses agree on, and that end at least {commit_margin} seconds
+    before the end of the audio, are committed and cut from the window. finish() then only has to decode
+    the short uncommitted tail (beam search), so the latency after the user stops talking does not grow
+    with the length of the utterance.
+    The audio is kept in a preallocated PCMBuffer of {buffer_seconds} and handed to the model as a view.
+
+    Usage:
+    ```
+    transcriber.start()
+    transcriber.push(pcm)  # for every recorded frame
+    text = transcriber.finish()  # or transcriber.cancel(), or decode_tail(*end()) on another thread
+    ```
+    """
+
+    def __init__(
+        self,
+        model,
+        sample_rate: int = 16000,
+        language: str = "ko",
+        partial_interval: float | None = None,
+        commit_margin: float | None = None,
+        on_partial: Callable[[str], None] | None = None,
+        buffer_seconds: float | None = None,
+    ):
+        Loggable.__init__(self)
+        self.set_tag("streaming_whisper")
+
+        self.model = model
+        self.sample_rate = sample_rate
+        self.language = language
+        self.partial_interval = partial_interval or float(os.getenv("WHISPER_PARTIAL_INTERVAL", "0.6"))
+        self.commit_margin = commit_margin or float(os.getenv("WHISPER_COMMIT_MARGIN", "1.0"))
+        self.on_partial = on_partial
+        buffer_seconds = buffer_seconds or float(os.getenv("WHISPER_BUFFER_SECONDS", "30"))
+        self._buffer = PCMBuffer(int(buffer_seconds * sample_rate))
+
+        self._cond = threading.Condition()
+        self._active = False
+        self._busy = False  # 워커가 디코딩 중인지
+        self._utterance = 0  # 이전 발화의 디코딩 결과를 버리기 위한 번호
+        self._reset()
+
+        self._worker = threading.Thread(target=self._work, daemon=True)
+        self._worker.start()
+
+    @property
+    def duration(self) -> float:
+        """
+        Seconds of audio pushed since start().
+        """
+
+        return self._n_samples / self.sample_rate
+
+    def _reset(self):
+        self._buffer.clear()
+        self._n_samples = 0
+        self._decoded_samples = 0  # 마지막 부분 디코딩이 본 샘플 수
+        self._committed: list[str] = []
+        self._previous: list[str] = []  # 지난 가설의 (확정되지 않은) segment 텍스트
+
+    def start(self):
+        with self._cond:
+            self._utterance += 1
+            self._reset()
+            self._active = True
+
+    def push(self, pcm: bytes):
+        with self._cond:
+            if not self._active:
+                return
+            n = len(pcm) // 2
+            # 버퍼를 앞으로 당기면 디코딩 중인 view 가 바뀌므로 워커를 기다린다 (확정이 없이 아주 길게 말할 때만)
+            while self._busy and not self._buffer.fits(n):
+                self._cond.wait()
+            self._buffer.write(pcm)
+            self._n_samples += n
+            if self._n_samples - self._decoded_samples >= self.partial_interval * self.sample_rate:
+                self._cond.notify_all()
+
+    def cancel(self):
+        with self._cond:
+            self._active = False
+            self._utterance += 1
+            self._reset()
+
+    def end(self) -> tuple[np.ndarray, list[str]]:
+        """
+        Close the utterance and return its uncommitted tail and committed segments, for decode_tail().
+        The tail is copied out of the buffer, so the next utterance can be recorded while it is decoded;
+        a partial decode still running is discarded.
+        """
+        with self._cond:
+            self._active = False
+            audio = self._buffer.view().copy()
+            committed = list(self._committed)
+            self._utterance += 1
+            if self._buffer.dropped:
+                self.log(f"Utterance longer than the buffer: dropped {self._buffer.dropped / self.sample_rate:.1f} s")
+                self._buffer.dropped = 0
+
+        return audio, committed
+
+    def decode_tail(self, audio: np.ndarray, committed: list[str]) -> str:
+        """
+        Decode the uncommitted tail and return the text of the whole utterance.
+        """
+        tail = []
+        if len(audio) >= 0.1 * self.sample_rate:
+            tail = [segment.text for segment in self._decode(audio, 5, "".join(committed))]
+
+        return "".join(committed + tail).strip()
+
+    def finish(self) -> str:
+
+        return self.decode_tail(*self.end())
+
+    def _decode(self, audio: np.ndarray, beam_size: int, prompt: str) -> list:
+        segments, _ = self.model.transcribe(
+            audio,
+            task="transcribe",
+            beam_size=beam_size,
+            temperature=0.0,
+            language=self.language,
+            initial_prompt=prompt or None,
+            condition_on_previous_text=False,
+        )
+
+        return list(segments)
+
+    def _work(self):
+        interval = self.partial_interval * self.sample_rate
+        while True:
+            with self._cond:
+                while not (self._active and self._n_samples - self._decoded_samples >= interval):
+                    self._cond.wait()
+                self._busy = True
+                utterance = self._utterance
+                audio = self._buffer.view()
+                self._decoded_samples = self._n_samples
+                prompt = "".join(self._committed)
+
+            try:
+                segments = self._decode(audio, 1, prompt)
+            except Exception as e:
+                self.log(f"Partial decode failed: {e}")
+                segments = []
+
+            partial = None
+            with self._cond:
+                self._busy = False
+                if utterance == self._utterance and segments:
+                    self._commit(segments, len(audio))
+                    partial = "".join(self._committed + self._previous).strip()
+                self._cond.notify_all()
+
+            if partial and self.on_partial:
+                self.on_partial(partial)
+
+    def _commit(self, segments: list, n_window: int):
+        texts = [segment.text for segment in segments]
+        end_limit = n_window / self.sample_rate - self.commit_margin
+
+        stable = 0
+        while (
+            stable < min(len(texts), len(self._previous))
+            and texts[stable] == self._previous[stable]
+            and segments[stable].end <= end_limit
+        ):
+            stable += 1
+
+        if stable:
+            self._committed += texts[:stable]
+            self._buffer.advance(int(segments[stable - 1].end * self.sample_rate))
+        self._previous = texts[stable:]
@@ -0,0 +1,90 @@
+"""
+A stub chat model that mimics the latency of a chat completion API without any network access.
+Used by the benchmark harnesses and selectable at runtime with LLM_BACKEND=stub.
+"""
+import asyncio
+import time
+import typing
+from typing import Any, AsyncIterator, Literal
+
+from pydantic import BaseModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.runnables import Runnable
+
+
+class StubChatModel(Runnable):
+    """
+    Answers every prompt with a fixed Korean reply.
+
+    latency: time to the first token (seconds)
+    token_interval: time between two streamed tokens (seconds)
+    """
+
+    DEFAULT_REPLY = "그런 일이 있었군요. 그때 어떤 기분이 드셨는지 조금 더 이야기해 주실 수 있을까요? 천천히 말씀해 주셔도 괜찮아요."
+
+    def __init__(self, latency: float = 0.5, token_interval: float = 0.02, reply: str = DEFAULT_REPLY):
+        self.latency = latency
+        self.token_interval = token_interval
+        self.reply = reply
+
+    def _tokens(self, text: str) -> list[str]:
+        # 대략 어절 단위를 토큰으로 본다
+        return [word + " " for word in text.split(" ")]
+
+    def _generation_time(self, text: str) -> float:
+        return self.latency + self.token_interval * len(self._tokens(text))
+
+    def invoke(self, input: Any, config: Any = None, **kwargs) -> AIMessage:
+        time.sleep(self._generation_time(self.reply))
+        return AIMessage(content=self.reply)
+
+    async def ainvoke(self, input: Any, config: Any = None, **kwargs) -> AIMessage:
+        await asyncio.sleep(self._generation_time(self.reply))
+        return AIMessage(content=self.reply)
+
+    async def astream(self, input: Any, config: Any = None, **kwargs) -> AsyncIterator[AIMessageChunk]:
+        await asyncio.sleep(self.latency)
+        for token in self._tokens(self.reply):
+            await asyncio.sleep(self.token_interval)
+            yield AIMessageChunk(content=token)
+
+    def with_structured_output(self, schema: type[BaseModel], **kwargs) -> "StubStructuredOutput":
+        return StubStructuredOutput(self, schema)
+
+
+class StubStructuredOutput(Runnable):
+    """
+    Structured-output view of a StubChatModel.
+    Fills every field of the schema: the first option of a Literal, None where allowed,
+    the stub reply for a "response" field and a short placeholder for other strings.
+    """
+
+    def __init__(self, model: StubChatModel, schema: type[BaseModel]):
+        self.model = model
+        self.schema = schema
+
+    def _fill(self) -> BaseModel:
+        values = {}
+        for name, field in self.schema.model_fields.items():
+            values[name] = self._fill_field(name, field.annotation)
+        return self.schema(**values)
+
+    def _fill_field(self, name: str, annotation: Any) -> Any:
+        args = typing.get_args(annotation)
+        if typing.get_origin(annotation) is Literal:
+            return args[0]
+        if type(None) in args:
+            return None
+        if name == "response":
+            return self.model.reply
+        return f"stub {name}"
+
+    def invoke(self, input: Any, config: Any = None, **kwargs) -> BaseModel:
+        result = self._fill()
+        time.sleep(self.model._generation_time(result.model_dump_json()))
+        return result
+
+    async def ainvoke(self, input: Any, config: Any = None, **kwargs) -> BaseModel:
+        result = self._fill()
+        await asyncio.sleep(self.model._generation_time(result.model_dump_json()))
+        return result
@@ -0,0 +1,94 @@
+"""
+The Whisper model shared by every recognizer in the process.
+"""
+import os
+import threading
+import time
+
+import numpy as np
+from faster_whisper import WhisperModel
+
+from ..lib.loggable import Loggable
+from ..lib.singleton import Singleton
+
+
+class WhisperModelManager(Singleton, Loggable):
+    """
+    Loads the model on a background thread, so the GUI comes up while it loads, and runs a warmup decode
+    on silence so the first utterance does not pay for the lazy initialization of the model.
+    transcribe() waits until the model is ready and lets at most {num_workers} decodes run at the same time
+    (CTranslate2 decodes them in parallel, one worker each).
+
+    Configuration (env): WHISPER_MODEL_SIZE, WHISPER_DEVICE, WHISPER_COMPUTE_TYPE (int8 / float32 / ...),
+    WHISPER_CPU_THREADS (0 = CTranslate2 default), WHISPER_NUM_WORKERS, WHISPER_WARMUP.
+    """
+
+    def __init__(self, *args, **kwargs):
+        # 초기화는 처음 한 번 _init() 에서만
+        pass
+
+    def _init(self, model_size: str | None = None, device: str | None = None, compute_type: str | None = None):
+        Loggable.__init__(self)
+        self.set_tag("whisper_model")
+
+        self.model_size = model_size or os.getenv("WHISPER_MODEL_SIZE", "base")
+        self.device = device or os.getenv("WHISPER_DEVICE", "cpu")
+        self.compute_type = compute_type or os.getenv("WHISPER_COMPUTE_TYPE", "int8")
+        self.cpu_threads = int(os.getenv("WHISPER_CPU_THREADS", "0"))
+        self.num_workers = max(1, int(os.getenv("WHISPER_NUM_WORKERS", "1")))
+        self.warmup = os.getenv("WHISPER_WARMUP", "True").lower() == "true"
+
+        self.model = None
+        self.load_time = 0.0
+        self.warmup_time = 0.0
+        self._error = None
+        self._ready = threading.Event()
+        self._workers = threading.Semaphore(self.num_workers)
+        threading.Thread(target=self._load, daemon=True).start()
+
+    def is_ready(self) -> bool:
+        return self._ready.is_set()
+
+    def wait_ready(self, timeout: float | None = None) -> bool:
+        if not self._ready.wait(timeout):
+            return False
+        if self._error is not None:
+            raise RuntimeError(f"Whisper model '{self.model_size}' failed to load") from self._error
+
+        return True
+
+    def transcribe(self, audio: np.ndarray, **kwargs) -> tuple[list, object]:
+        """
+        WhisperModel.transcribe, with the segments decoded before the worker slot is released.
+        """
+        self.wait_ready()
+        with self._workers:
+            segments, info = self.model.transcribe(audio, **kwargs)
+            return list(segments), info
+
+    def _load(self):
+        start = time.perf_counter()
+        try:
+            self.model = WhisperModel(
+                self.model_size,
+                device=self.device,
+                compute_type=self.compute_type,
+                cpu_threads=self.cpu_threads,
+                num_workers=self.num_workers,
+            )
+            self.load_time = time.perf_counter() - start
+            self.log(f"Faster Whisper model '{self.model_size}' loaded on {self.device} with {self.compute_type} "
+                     f"in {self.load_time:.2f} s (cpu_threads={self.cpu_threads}, num_workers={self.num_workers}).")
+
+            if self.warmup:
+                start = time.perf_counter()
+                # 첫 디코딩의 초기화 비용을 미리 치른다
+                segments, _ = self.model.transcribe(np.zeros(16000, dtype=np.float32), beam_size=1, language="ko")
+                list(segments)
+                self.warmup_time = time.perf_counter() - start
+                self.log(f"Warmup decode took {self.warmup_time:.2f} s.")
+        except Exception as e:
+            self._error = e
+            self.log(f"Failed to load Whisper model: {e}")
+        finally:
+            self._ready.set()
@@ -1,8 +1,10 @@
 import dearpygui.dearpygui as dpg
 
 from ..lib.time_stamp import get_current_timestamp
+from ..lib.turn_scheduler import new_turn_id
 from ..message_event import MessageBroker, MessageType
 from ..async_event import AsyncBroker, AsyncMessageType
+from ..lib.backpressure import COALESCE
 
 
 class ChatWindow:
@@ -44,6 +46,7 @@ class ChatWindow:
             AsyncBroker().subscribe("chat_response", self._on_chat_response)
             AsyncBroker().subscribe("chat_listening_start", self._on_chat_listening_start)
             AsyncBroker().subscribe("chat_user_input", self._on_chat_user_input)
+            AsyncBroker().subscribe("chat_partial_transcript", self._on_chat_partial_transcript, policy=COALESCE)
             AsyncBroker().subscribe("chat_done", self._on_chat_done)
             AsyncBroker().subscribe("chat_done_listening", self._on_chat_done_listening)
             
@@ -75,9 +78,10 @@ class ChatWindow:
             user_input = "안녕하세요."
         dpg.set_value("user_input", "")
         end_time = get_current_timestamp()
+        turn_id = new_turn_id()
 
-        AsyncBroker().emit(("chat_cycle_time", {"content": "KEYBOARD MODE", "start_time": self.keyboard_start_time, "end_time": end_time}))
-        AsyncBroker().emit(("chat_user_input", {"content": user_input, "start_time": end_time, "end_time": end_time}))
+        AsyncBroker().emit(("chat_cycle_time", {"content": "KEYBOARD MODE", "start_time": self.keyboard_start_time, "end_time": end_time, "turn_id": turn_id}))
+        AsyncBroker().emit(("chat_user_input", {"content": user_input, "start_time": end_time, "end_time": end_time, "turn_id": turn_id}))
 
     def _on_wakeup_btn(self):
         AsyncBroker().emit(("wake_up", None))
@@ -106,9 +110,14 @@ class ChatWindow:
     def _on_chat_user_input(self, msg: dict):
         user_input = msg['content']
         self._add_user_msg(user_input)
+        dpg.set_value(self._el_recording_label, "Recording...")
         dpg.configure_item(self._el_recording_label, show=False)
         dpg.configure_item(self._el_recording_indicator, show=False)
 
+    def _on_chat_partial_transcript(self, msg: dict):
+        # 말하는 중인 문장을 녹음 표시 옆에 보여준다
+        dpg.set_value(self._el_recording_label, f"Recording... {msg['content']}")
+
     def _on_chat_listening_start(self, msg: AsyncMessageType):
         dpg.configure_item(self._el_recording_label, show=True)
         dpg.configure_item(self._el_recording_indicator, show=True)
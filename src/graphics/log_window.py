@@ -3,6 +3,7 @@ import dearpygui.dearpygui as dpg
 
 from ..message_event import MessageListener, MessageBroker, MessageType
 from ..async_event import AsyncListener, AsyncBroker, AsyncMessageType
+from ..lib.backpressure import DROP_OLDEST
 
 
 class LogWindow:
@@ -22,7 +23,7 @@ class LogWindow:
             dpg.add_text("Logs")
         
         # Subscribe events
-        AsyncBroker().subscribe(f"log {tag}", self._on_log)
+        AsyncBroker().subscribe(f"log {tag}", self._on_log, policy=DROP_OLDEST)
         return self
     
     # 
@@ -1,10 +1,37 @@
 import os
 import sys
 import time
+import asyncio
+from typing import Any, Callable
 
 from .visual_texture import VideoTexture
 from ..message_event import MessageBroker, MessageType
-from ..async_event import AsyncBroker, AsyncMessageType
+from ..async_event import AsyncBroker, AsyncListener, AsyncMessageType
+from ..lib.backpressure import COALESCE
+
+
+class TurnTakeListener(AsyncListener):
+    """
+    One queue for every turn-taking event, so events that arrive in a burst (e.g. chat_user_input and
+    chat_response) coalesce into the latest state, in the order they were emitted.
+    """
+    STATES = {
+        "chat_start_new": "ATTEMPT_SUPPRESSING",
+        "chat_listening_start": "LISTENER_RESPONSE",
+        "chat_user_input": "THINKING",
+        "chat_done": "NOT_TALKING",
+        "chat_response": "ATTEMPT_SUPPRESSING",
+    }
+
+    def __init__(self, on_state: Callable[[str], None]):
+        super().__init__(policy=COALESCE)
+        self._on_state = on_state
+        # 백그라운드 루프에서 run() 코루틴 자동 실행
+        asyncio.run_coroutine_threadsafe(self.run(), AsyncBroker()._loop)
+
+    async def handle(self, event: str, detail: Any):
+        self._on_state(self.STATES[event])
+
 
 class VisualCueTexture:
     """
@@ -28,7 +55,7 @@ class VisualCueTexture:
         self._video_player = VideoTexture()
         self._is_turn_taking = False  # 추가된 플래그: Turn Taking 상태 확인
         self._is_updating = False  # 제너레이터 실행 중 여부
-        self._turn_take_queue = []  # 실행 대기 중인 _on_turn_take 함수들
+        self._turn_take_queue = []  # 실행 대기 중인 _on_turn_take 함수 (가장 최근 상태 하나만)
         
         # Turn taking videos
         TURNTAKING_DIR = "src/graphics/assets/video"
@@ -77,12 +104,10 @@ class VisualCueTexture:
         self._video_player.open_video(self._current_video())
         self._video_player.play()
 
-        # Subscribe event
-        AsyncBroker().subscribe("chat_start_new", lambda _: self._on_turn_take("ATTEMPT_SUPPRESSING"))
-        AsyncBroker().subscribe("chat_listening_start", lambda _: self._on_turn_take("LISTENER_RESPONSE"))
-        AsyncBroker().subscribe("chat_user_input", lambda _: self._on_turn_take("THINKING"))
-        AsyncBroker().subscribe("chat_done", lambda _: self._on_turn_take("NOT_TALKING"))
-        AsyncBroker().subscribe("chat_response", lambda _: self._on_turn_take("ATTEMPT_SUPPRESSING"))
+        # Subscribe event (상태 이벤트라 한 리스너의 큐에서 밀려 있는 것은 최신 것 하나만 처리)
+        listener = TurnTakeListener(self._on_turn_take)
+        for event in TurnTakeListener.STATES:
+            AsyncBroker().subscribe(event, listener)
         
         return self
     
@@ -90,7 +115,8 @@ class VisualCueTexture:
     def _on_turn_take(self, state: str):
         # update가 실행 중일 때는 _on_turn_take이 대기하도록 큐에 추가
         if self._is_updating:
-            self._turn_take_queue.append(lambda: self._execute_turn_take(state))  # 대기 큐에 추가
+            # 이전에 대기 중이던 상태는 이 상태로 대체
+            self._turn_take_queue[:] = [lambda: self._execute_turn_take(state)]
         else:
             self._execute_turn_take(state)  # 바로 실행
 
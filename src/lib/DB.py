@@ -1,72 +1,334 @@
 import sqlite3
 import os
 import csv
+import asyncio
+import threading
+import uuid
+from concurrent.futures import Future
+from queue import Queue, Empty
 
+from .history import ConversationHistory
+from .time_stamp import get_current_timestamp
 
-def initialize():
-    conn = sqlite3.connect("./src/lib/conversation_history.db")
-    cursor = conn.cursor()
-    cursor.execute(
+DB_PATH = "./src/lib/conversation_history.db"
+
+CREATE_SESSIONS = """
+    CREATE TABLE IF NOT EXISTS sessions (
+        SESSION_ID TEXT PRIMARY KEY,
+        BOT_NAME TEXT NOT NULL,
+        CREATED_AT INTEGER NOT NULL   -- 세션 생성 시간 (타임스탬프)
+    )
+"""
+CREATE_HISTORY = """
+    CREATE TABLE IF NOT EXISTS history (
+        ID INTEGER PRIMARY KEY AUTOINCREMENT,
+        SESSION_ID TEXT NOT NULL,
+        TURN INTEGER NOT NULL,        -- 세션 안에서의 턴 번호 (사용자 입력마다 1 증가)
+        SPEAKER TEXT NOT NULL,
+        CONTENT TEXT NOT NULL,
+        START_TIME INTEGER NOT NULL,  -- 시작 시간 (타임스탬프)
+        END_TIME INTEGER NOT NULL     -- 끝 시간 (타임스탬프)
+    )
+"""
+CREATE_HISTORY_INDEX = "CREATE INDEX IF NOT EXISTS history_session_turn ON history (SESSION_ID, TURN)"
+# 세션 이전 스키마의 history 테이블에 컬럼 추가
+MIGRATE_HISTORY = {
+    "SESSION_ID": "ALTER TABLE history ADD COLUMN SESSION_ID TEXT NOT NULL DEFAULT 'legacy'",
+    "TURN": "ALTER TABLE history ADD COLUMN TURN INTEGER NOT NULL DEFAULT 0",
+}
+INSERT_SESSION = "INSERT INTO sessions (SESSION_ID, BOT_NAME, CREATED_AT) VALUES (?, ?, ?)"
+SELECT_SESSIONS = "SELECT SESSION_ID, BOT_NAME, CREATED_AT FROM sessions ORDER BY CREATED_AT"
+INSERT_MESSAGE = "INSERT INTO history (SESSION_ID, TURN, SPEAKER, CONTENT, START_TIME, END_TIME) VALUES (?, ?, ?, ?, ?, ?)"
+SELECT_HISTORY = (
+    "SELECT SPEAKER, CONTENT, START_TIME, END_TIME, TURN FROM history"
+    " WHERE SESSION_ID = ? AND TURN >= ? ORDER BY TURN, ID"
+)
+DELETE_HISTORY = "DELETE FROM history WHERE SESSION_ID = ?"
+SELECT_FREQUENT = (
+    "SELECT CONTENT, COUNT(*) AS N FROM history WHERE SPEAKER = ?"
+    " GROUP BY CONTENT ORDER BY N DESC LIMIT ?"
+)
+
+SPEAKERS = ["USER_KEYBOARD", "USER_WHISPER", "CUMPAR", "MODE_TURN", "PHASE"]
+USER_SPEAKERS = ["USER_KEYBOARD", "USER_WHISPER", "MODE_TURN"]
+
+
+class Database:
+    """
+    Long-lived SQLite connections for the conversation history.
+    - WAL mode, so readers never wait for the writer
+    - one writer thread owns the write connection and commits the queued statements in batches (group commit)
+    - each reading thread keeps its own connection; statements are reused from the connection's statement cache
+    - close() commits what is still queued before the process exits
+    """
+
+    def __init__(self, path: str = DB_PATH, batch_size: int = 256):
+        self.path = path
+        self.batch_size = batch_size
+        self._queue: Queue[tuple[str, tuple, Future] | None] = Queue()
+        self._local = threading.local()
+        self._readers: list[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, cached_statements=64)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def write(self, sql: str, params: tuple = ()) -> Future:
+        """
+        Queue a write statement. Never blocks; the returned future is done once the statement is committed.
         """
-        CREATE TABLE IF NOT EXISTS history (
-            ID INTEGER PRIMARY KEY AUTOINCREMENT,
-            SPEAKER TEXT NOT NULL,
-            CONTENT TEXT NOT NULL,
-            START_TIME INTEGER NOT NULL,  -- 시작 시간 (타임스탬프)
-            END_TIME INTEGER NOT NULL     -- 끝 시간 (타임스탬프)
-        )
+        if self._closed:
+            raise RuntimeError(f"database {self.path} is closed")
+        future = Future()
+        self._queue.put((sql, params, future))
+        return future
+
+    def flush(self) -> None:
+        """
+        Block until every write queued so far is committed.
+        """
+        self.write("SELECT 1").result()
+
+    def read(self, sql: str, params: tuple = ()) -> list[tuple]:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+            with self._readers_lock:
+                self._readers.append(conn)
+        return conn.execute(sql, params).fetchall()
+
+    def close(self) -> None:
+        """
+        Commit every queued write, stop the writer thread and close the connections.
+        """
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+        # 큐의 끝을 알리는 None
+        self._queue.put(None)
+        self._writer.join()
+        with self._readers_lock:
+            for conn in self._readers:
+                conn.close()
+            self._readers.clear()
+
+    def _write_loop(self):
+        conn = self._connect()
+        running = True
+        while running:
+            batch = [self._queue.get()]
+            # 쌓여 있는 쓰기를 한 번의 commit 으로 묶는다
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except Empty:
+                    break
+            if None in batch:
+                running = False
+                batch = [item for item in batch if item is not None]
+
+            results = []
+            for sql, params, future in batch:
+                try:
+                    results.append((future, conn.execute(sql, params).lastrowid, None))
+                except sqlite3.Error as e:
+                    results.append((future, None, e))
+            try:
+                conn.commit()
+            except sqlite3.Error as e:
+                results = [(future, None, e) for future, _, _ in results]
+
+            for future, result, error in results:
+                if error is None:
+                    future.set_result(result)
+                else:
+                    future.set_exception(error)
+        conn.close()
+
+
+class SessionState:
     """
-    )
-    conn.commit()
-    conn.close()
+    In-memory state of one conversation session: its prompt history and current turn number.
+    """
+
+    def __init__(self):
+        self.history = ConversationHistory()
+        self.turn = 0
+        self.user_side = False  # 마지막 행이 사용자 쪽(MODE_TURN/USER_*)인지
+
+    def advance(self, SPEAKER: str) -> int:
+        # 봇 응답 뒤에 사용자 쪽 행이 오면 새 턴이 시작된다
+        if SPEAKER in USER_SPEAKERS:
+            if not self.user_side:
+                self.turn += 1
+            self.user_side = True
+        else:
+            self.user_side = False
+
+        return self.turn
+
+
+_database = None
+_sessions: dict[str, SessionState] = {}
+_sessions_lock = threading.Lock()
+
+
+def getDatabase() -> Database:
+    global _database
+    if _database is None:
+        _database = Database()
+
+    return _database
+
+
+def initialize(path: str = DB_PATH):
+    global _database
+    if _database is None or _database.path != path:
+        if _database is not None:
+            _database.close()
+        _database = Database(path)
+    _database.write(CREATE_SESSIONS)
+    _database.write(CREATE_HISTORY).result()
+
+    columns = [row[1] for row in _database.read("PRAGMA table_info(history)")]
+    for column, migration in MIGRATE_HISTORY.items():
+        if column not in columns:
+            _database.write(migration)
+    _database.write(CREATE_HISTORY_INDEX).result()
+
+
+def shutdown():
+    """
+    Commit the queued writes and close the database (at shutdown).
+    """
+    global _database
+    if _database is not None:
+        _database.close()
+        _database = None
+
+
+def createSession(bot_name: str = "") -> str:
+    """
+    Start a new conversation session and return its id.
+    """
+    session_id = uuid.uuid4().hex
+    getDatabase().write(INSERT_SESSION, (session_id, bot_name, get_current_timestamp()))
+    with _sessions_lock:
+        _sessions[session_id] = SessionState()
+
+    return session_id
+
+
+def getSessions() -> list[tuple]:
+    """
+    Return every (SESSION_ID, BOT_NAME, CREATED_AT) session.
+    """
+    getDatabase().flush()
+
+    return getDatabase().read(SELECT_SESSIONS)
+
+
+def _getSession(session_id: str) -> SessionState:
+    with _sessions_lock:
+        state = _sessions.get(session_id)
+        if state is None:
+            # 이전에 만든 세션: DB 에 남은 기록으로 프롬프트 기록과 턴 번호를 복원
+            state = _sessions[session_id] = SessionState()
+            for SPEAKER, CONTENT, _, _, _ in getHistory(session_id):
+                state.advance(SPEAKER)
+                state.history.append(SPEAKER, CONTENT)
 
-def addMessage(SPEAKER: str, CONTENT: str, START_TIME: int, END_TIME: int):        
-    if SPEAKER not in ["USER_KEYBOARD", "USER_WHISPER", "CUMPAR", "MODE_TURN", "PHASE"]:
+    return state
+
+
+def releaseSession(session_id: str):
+    """
+    Forget the in-memory state of a closed session (its rows stay in the database).
+    """
+    with _sessions_lock:
+        _sessions.pop(session_id, None)
+
+
+def addMessage(session_id: str, SPEAKER: str, CONTENT: str, START_TIME: int, END_TIME: int) -> Future:
+    """
+    Queue the message for the writer thread and add it to the session's prompt history. Does not wait for the disk.
+    """
+    if SPEAKER not in SPEAKERS:
         raise ValueError("speaker should be one of 'USER_KEYBOARD', 'USER_WHISPER', 'CUMPAR', 'MODE_TURN', 'PHASE'.")
-    
-    conn = sqlite3.connect("./src/lib/conversation_history.db")
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT INTO history (SPEAKER, CONTENT, START_TIME, END_TIME) VALUES (?, ?, ?, ?)",
-        (SPEAKER, CONTENT, START_TIME, END_TIME)
-    )
-    conn.commit()
-    conn.close()
 
+    state = _getSession(session_id)
+    turn = state.advance(SPEAKER)
+    future = getDatabase().write(INSERT_MESSAGE, (session_id, turn, SPEAKER, CONTENT, START_TIME, END_TIME))
+    state.history.append(SPEAKER, CONTENT)
+    return future
 
-def getHistory() -> str:
-    conn = sqlite3.connect("./src/lib/conversation_history.db")
-    cursor = conn.cursor()
-    cursor.execute("SELECT SPEAKER, CONTENT, START_TIME, END_TIME FROM history")
-    rows = cursor.fetchall()
-    conn.close()
 
-    temp = []
-    for SPEAKER, CONTENT, START_TIME, END_TIME  in rows:
-        if SPEAKER == "PHASE":
-            temp.append(f"\n[{CONTENT}]")
-        else:
-            temp.append(f"{SPEAKER}: {CONTENT}: {START_TIME}: {END_TIME}")  # 시간 정보 추가
-
-    return "\n".join(temp)
-
-
-def reset():
-    conn = sqlite3.connect("./src/lib/conversation_history.db")
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM history")
-    cursor.execute("DELETE FROM sqlite_sequence WHERE name='history'")
-    conn.commit()
-    conn.close()
-    
-    
-def saveConversation(index: int, filepath: str):
-    conn = sqlite3.connect("./src/lib/conversation_history.db")
-    cursor = conn.cursor()
-    cursor.execute("SELECT SPEAKER, CONTENT, START_TIME, END_TIME FROM history")
-    rows = cursor.fetchall()
-    conn.close()
-    
+async def addMessageAsync(session_id: str, SPEAKER: str, CONTENT: str, START_TIME: int, END_TIME: int) -> int:
+    """
+    Same as addMessage, but wait (without blocking the event loop) until the row is committed.
+    """
+
+    return await asyncio.wrap_future(addMessage(session_id, SPEAKER, CONTENT, START_TIME, END_TIME))
+
+
+def getPromptHistory(session_id: str) -> str:
+    """
+    Return the conversation transcript of the session for the prompt, within the HISTORY_TOKEN_BUDGET.
+    """
+
+    return _getSession(session_id).history.render()
+
+
+def getConversationHistory(session_id: str) -> ConversationHistory:
+    """
+    Return the in-memory prompt history of the session (to merge its older lines into the summary).
+    """
+
+    return _getSession(session_id).history
+
+
+def getHistory(session_id: str, since_turn: int = 0) -> list[tuple]:
+    """
+    Return the committed (SPEAKER, CONTENT, START_TIME, END_TIME, TURN) rows of the session from {since_turn} on.
+    """
+    getDatabase().flush()
+
+    return getDatabase().read(SELECT_HISTORY, (session_id, since_turn))
+
+
+def getFrequentMessages(SPEAKER: str, limit: int) -> list[tuple]:
+    """
+    Return the {limit} most frequent (CONTENT, COUNT) messages of {SPEAKER} over all sessions.
+    """
+    getDatabase().flush()
+
+    return getDatabase().read(SELECT_FREQUENT, (SPEAKER, limit))
+
+
+async def getHistoryAsync(session_id: str, since_turn: int = 0) -> list[tuple]:
+
+    return await asyncio.to_thread(getHistory, session_id, since_turn)
+
+
+def reset(session_id: str):
+    """
+    Delete the rows of one session (other sessions are untouched).
+    """
+    getDatabase().write(DELETE_HISTORY, (session_id,))
+    with _sessions_lock:
+        _sessions[session_id] = SessionState()
+
+
+def saveConversation(index: int, filepath: str, session_id: str):
+    rows = getHistory(session_id)
+
     file_exists = os.path.exists(filepath)
 
     with open(filepath, mode='a', newline='', encoding='utf-8') as csv_file:
@@ -76,6 +338,11 @@ def saveConversation(index: int, filepath: str):
             writer.writerow(["INDEX", "ROLE", "MESSAGE", "START_TIME", "END_TIME"])  # 시간 추가
 
         for row in rows:
-            ROLE, MESSAGE, START_TIME, END_TIME = row
+            ROLE, MESSAGE, START_TIME, END_TIME, _ = row
             if ROLE != "PHASE":
-                writer.writerow([index, ROLE, MESSAGE, START_TIME, END_TIME])  # 시간 정보 함께 저장
\ No newline at end of file
+                writer.writerow([index, ROLE, MESSAGE, START_TIME, END_TIME])  # 시간 정보 함께 저장
+
+
+async def saveConversationAsync(index: int, filepath: str, session_id: str):
+
+    await asyncio.to_thread(saveConversation, index, filepath, session_id)
@@ -0,0 +1,58 @@
+"""
+What a broker subscription does when its queue is full, and the per-event queue counters of a broker.
+"""
+from threading import Lock
+
+# 새 메시지를 버린다 (기존 동작)
+DROP_NEWEST = "drop_newest"
+# 가장 오래된 메시지를 버리고 새 메시지를 넣는다 (로그처럼 최신 것이 중요한 스트림)
+DROP_OLDEST = "drop_oldest"
+# 자리가 날 때까지 최대 timeout 초 기다리고, 그래도 가득 차 있으면 새 메시지를 버린다
+BLOCK = "block"
+# 대기 중인 메시지를 모두 버리고 최신 메시지 하나만 남긴다 (visual cue 같은 상태 이벤트)
+COALESCE = "coalesce"
+
+POLICIES = (DROP_NEWEST, DROP_OLDEST, BLOCK, COALESCE)
+
+
+def checkPolicy(policy: str) -> str:
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown backpressure policy '{policy}' (expected one of {', '.join(POLICIES)})")
+
+    return policy
+
+
+class QueueStats:
+    """
+    Counters per event name, summed over the subscriptions of the event:
+    - enqueued: messages put into a subscriber queue
+    - dropped: messages discarded by a full queue (refused, evicted by drop_oldest, replaced by coalesce
+      or timed out by block)
+    - max_depth: deepest subscriber queue right after a message of the event was put into it
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._events: dict[str, list[int]] = {}
+
+    def enqueued(self, event: str, depth: int):
+        with self._lock:
+            counters = self._events.setdefault(event, [0, 0, 0])
+            counters[0] += 1
+            if depth > counters[2]:
+                counters[2] = depth
+
+    def dropped(self, event: str, count: int = 1):
+        with self._lock:
+            self._events.setdefault(event, [0, 0, 0])[1] += count
+
+    def snapshot(self) -> dict[str, dict[str, int]]:
+        with self._lock:
+            return {
+                event: {"enqueued": enqueued, "dropped": dropped, "max_depth": max_depth}
+                for event, (enqueued, dropped, max_depth) in self._events.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._events.clear()
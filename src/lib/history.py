@@ -0,0 +1,127 @@
+import os
+from collections import deque
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token count for the prompt budget (about 4 UTF-8 bytes per token; a Korean syllable is 3 bytes).
+    """
+    return len(text.encode("utf-8")) // 4 + 1
+
+
+class ConversationHistory:
+    """
+    In-memory conversation transcript for the LLM prompt.
+    Rows are appended as they are written to the DB, formatted once, and rendered within a token budget:
+    the most recent lines are kept verbatim (rolling window), and the lines that fall out of the window
+    wait in a pending list until a summarizer (an LLM call run after the turn, see ChatSessionManager)
+    merges them into one running summary block with apply_summary().
+    Until then the pending lines are rendered shortened to {summary_line_chars} characters after the summary.
+    """
+
+    def __init__(self, token_budget: int | None = None, summary_ratio: float = 0.25, summary_line_chars: int = 60):
+        self.token_budget = token_budget or int(os.getenv("HISTORY_TOKEN_BUDGET", "2000"))
+        self.summary_budget = int(self.token_budget * summary_ratio)
+        self.window_budget = self.token_budget - self.summary_budget
+        self.summary_line_chars = summary_line_chars
+        # 요약 대기 줄의 일련번호 (clear() 해도 이어서 센다: 실행 중인 요약이 새 줄을 지우지 않게)
+        self._seq = 0
+        self.clear()
+
+    def clear(self):
+        self._window: deque[tuple[str, int]] = deque()  # (line, tokens)
+        self._window_tokens = 0
+        self._summary = ""
+        self._summary_tokens = 0
+        # 윈도우에서 밀려났지만 아직 요약에 합쳐지지 않은 줄 (원문)
+        self._pending: deque[tuple[int, str, int]] = deque()  # (seq, line, tokens)
+        self._pending_tokens = 0
+        self._rendered = ""
+
+    def append(self, speaker: str, content: str):
+        if speaker == "MODE_TURN":
+            # 턴 시간 기록은 프롬프트에 필요 없다
+            return
+
+        line = self._format(speaker, content)
+        tokens = estimate_tokens(line)
+        self._window.append((line, tokens))
+        self._window_tokens += tokens
+
+        evicted = False
+        while self._window_tokens > self.window_budget and len(self._window) > 1:
+            old_line, old_tokens = self._window.popleft()
+            self._window_tokens -= old_tokens
+            self._addPending(old_line, old_tokens)
+            evicted = True
+
+        if evicted or self._rendered is None:
+            self._rendered = None
+        else:
+            # 앞부분(요약 + 윈도우)이 그대로면 새 줄만 덧붙인다
+            self._rendered = f"{self._rendered}\n{line}" if self._rendered else line
+
+    def render(self) -> str:
+        if self._rendered is None:
+            window = "\n".join(line for line, _ in self._window)
+            summary = self._renderSummary()
+            if summary:
+                self._rendered = f"[Summary of the earlier conversation]\n{summary}\n\n[Recent conversation]\n{window}"
+            else:
+                self._rendered = window
+
+        return self._rendered
+
+    def pending(self) -> tuple[str, list[str], int]:
+        """
+        The current summary, the lines waiting to be merged into it and the sequence number of the last line.
+        """
+
+        return self._summary, [line for _, line, _ in self._pending], self._seq
+
+    def apply_summary(self, summary: str, merged: int):
+        """
+        Replace the summary with {summary}, which covers the pending lines up to sequence number {merged}.
+        """
+        summary = summary.strip()
+        # 요약 예산을 넘으면 뒤를 자른다 (한국어 한 글자 ≒ 0.75 토큰)
+        max_chars = self.summary_budget * 4 // 3
+        if len(summary) > max_chars:
+            summary = summary[:max_chars] + "…"
+        self._summary = summary
+        self._summary_tokens = estimate_tokens(summary) if summary else 0
+        # 요약하는 동안 앞쪽이 잘려 나갔어도 요약에 들어간 줄까지만 지운다
+        while self._pending and self._pending[0][0] <= merged:
+            _, _, tokens = self._pending.popleft()
+            self._pending_tokens -= tokens
+        self._rendered = None
+
+    def _format(self, speaker: str, content: str) -> str:
+        if speaker == "PHASE":
+            return f"\n[{content}]"
+
+        return f"{speaker}: {content}"
+
+    def _addPending(self, line: str, tokens: int):
+        self._seq += 1
+        self._pending.append((self._seq, line, tokens))
+        self._pending_tokens += tokens
+        # 요약이 계속 실패해도 한없이 쌓이지 않게
+        while self._pending_tokens > self.window_budget and len(self._pending) > 1:
+            _, _, old_tokens = self._pending.popleft()
+            self._pending_tokens -= old_tokens
+
+    def _renderSummary(self) -> str:
+        lines = [self._summary] if self._summary else []
+        budget = self.summary_budget - self._summary_tokens
+        shortened = []
+        # 아직 요약되지 않은 줄은 최근 것부터 예산 안에서 짧게
+        for _, line, _ in reversed(self._pending):
+            if len(line) > self.summary_line_chars:
+                line = line[:self.summary_line_chars] + "…"
+            budget -= estimate_tokens(line)
+            if budget < 0:
+                break
+            shortened.append(line)
+
+        return "\n".join(lines + shortened[::-1])
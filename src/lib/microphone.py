@@ -1,3 +1,7 @@
+import os
+import threading
+from collections import deque
+
 import pyaudio
 
 pa = pyaudio.PyAudio() # This instance need to be terminated at the end of the whole program.
@@ -42,4 +46,101 @@ class Microphone():
         """
         Read audio data from the stream.
         """
-        return self.stream.read(num_frames, exception_on_overflow=False)
\ No newline at end of file
+        return self.stream.read(num_frames, exception_on_overflow=False)
+
+
+class FrameRing():
+    """
+    Bounded queue of audio frames between the PortAudio callback (the only producer) and one reader thread.
+    deque.append/popleft are atomic, so the callback never waits for a lock; when the ring is full
+    the oldest frame is dropped and counted.
+    """
+
+    def __init__(self, capacity: int):
+        self._frames = deque(maxlen=capacity)
+        self._ready = threading.Event()
+        self.pushed = 0
+        self.dropped = 0
+        self.max_depth = 0
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def clear(self) -> None:
+        self._frames.clear()
+
+    def push(self, frame: bytes) -> None:
+        depth = len(self._frames)
+        if depth == self._frames.maxlen:
+            self.dropped += 1
+        else:
+            depth += 1
+        self._frames.append(frame)
+        self.pushed += 1
+        self.max_depth = max(self.max_depth, depth)
+        self._ready.set()
+
+    def pop(self, timeout: float) -> bytes | None:
+        """
+        The oldest frame, or None if none arrived within {timeout} seconds.
+        """
+        while True:
+            try:
+                return self._frames.popleft()
+            except IndexError:
+                pass
+            if not self._ready.wait(timeout):
+                return None
+            self._ready.clear()
+
+
+class CallbackMicrophone(Microphone):
+    """
+    Records on PortAudio's own thread (callback mode) into a FrameRing of 20ms frames,
+    so no audio is lost while the reader is busy with VAD or Whisper.
+
+    Attributes:
+        ring : frames waiting to be read
+        overflows : callbacks in which PortAudio reported an input overflow
+    """
+    FRAME_SIZE = 320  # 20ms
+
+    def __init__(self, ring_seconds: float | None = None):
+        ring_seconds = ring_seconds or float(os.getenv("MIC_RING_SECONDS", "10"))
+        self.ring = FrameRing(int(ring_seconds * self.SAMPLE_RATE / self.FRAME_SIZE))
+        self.overflows = 0
+        self.stream = None
+
+    def open(self) -> None:
+        self.ring.clear()
+        self.stream = pa.open(channels=1,
+                            format=self.PA_FORMAT,
+                            rate=self.SAMPLE_RATE,
+                            frames_per_buffer=self.FRAME_SIZE,
+                            input=True,
+                            output_device_index=0,
+                            output = False,
+                            stream_callback=self._callback)
+
+    def _callback(self, in_data, frame_count, time_info, status_flags):
+        if status_flags & pyaudio.paInputOverflow:
+            self.overflows += 1
+        size = self.FRAME_SIZE * 2
+        for start in range(0, len(in_data) - size + 1, size):
+            self.ring.push(in_data[start:start + size])
+        return (None, pyaudio.paContinue)
+
+    def read(self, timeout: float = 0.1) -> bytes | None:
+        """
+        The next 20ms frame, or None if the microphone delivered nothing within {timeout} seconds.
+        """
+        return self.ring.pop(timeout)
+
+    def stats(self) -> dict:
+        return {
+            "frames": self.ring.pushed,
+            "dropped_frames": self.ring.dropped,
+            "input_overflows": self.overflows,
+            "queued_frames": len(self.ring),
+            "max_queued_frames": self.ring.max_depth,
+        }
@@ -0,0 +1,69 @@
+import numpy as np
+
+
+class PCMBuffer:
+    """
+    Preallocated float32 buffer of one utterance, in the layout Whisper reads (mono, -1.0 ~ 1.0).
+    int16 frames are converted in place when they are written, and view() is a slice of the buffer,
+    so the audio reaches model.transcribe without a copy, a WAV container or a decode.
+
+    Samples before {start} are already transcribed. When the buffer is full they are dropped by moving
+    the live part to the front; if the live part alone does not fit, its oldest samples are dropped
+    like a ring buffer (counted in {dropped}).
+    """
+
+    def __init__(self, capacity: int):
+        self._data = np.zeros(capacity, dtype=np.float32)
+        self.start = 0
+        self.end = 0
+        self.dropped = 0
+
+    def __len__(self) -> int:
+
+        return self.end - self.start
+
+    @property
+    def capacity(self) -> int:
+
+        return len(self._data)
+
+    def clear(self):
+        self.start = 0
+        self.end = 0
+
+    def fits(self, n: int) -> bool:
+        """
+        Whether {n} more samples can be written without moving the live part.
+        """
+
+        return self.end + n <= self.capacity
+
+    def write(self, pcm: bytes):
+        samples = np.frombuffer(pcm, dtype=np.int16)[-self.capacity:]
+        n = len(samples)
+        if not self.fits(n):
+            self._compact(n)
+
+        out = self._data[self.end:self.end + n]
+        out[:] = samples
+        out *= 1 / 32768
+        self.end += n
+
+    def advance(self, n: int):
+        self.start = min(self.start + n, self.end)
+
+    def view(self) -> np.ndarray:
+        """
+        The live samples. Valid until the next write that does not fit().
+        """
+
+        return self._data[self.start:self.end]
+
+    def _compact(self, n: int):
+        overflow = len(self) + n - self.capacity
+        if overflow > 0:
+            self.dropped += overflow
+            self.start += overflow
+        live = len(self)
+        self._data[:live] = self._data[self.start:self.end]
+        self.start, self.end = 0, live
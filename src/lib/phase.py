@@ -17,6 +17,10 @@ class Phase:
         self.instruction = instruction
         self.router_list = router_list
 
+        # 생성한 response format(pydantic model)과 JSON schema 캐시, router_list 가 바뀌면 다시 만든다
+        self._format_cache: dict[str, tuple[type[BaseModel], dict]] = {}
+        self._format_cache_key = None
+
     def getInfo(self) -> dict:
 
         return {
@@ -26,7 +30,62 @@ class Phase:
             "instruction": self.instruction,
         }
 
-    def getResponseFormat(self) -> BaseModel:
+    def getResponseFormat(self) -> type[BaseModel]:
+
+        return self._getCachedFormat("ResponseFormat")[0]
+
+    def getResponseSchema(self) -> dict:
+
+        return self._getCachedFormat("ResponseFormat")[1]
+
+    def getCombinedResponseFormat(self) -> type[BaseModel]:
+        """
+        Response format for the single-call mode: the selector fields plus the chatbot response itself.
+        """
+
+        return self._getCachedFormat("CombinedResponseFormat")[0]
+
+    def getCombinedResponseSchema(self) -> dict:
+
+        return self._getCachedFormat("CombinedResponseFormat")[1]
+
+    def precompile(self) -> None:
+        """
+        Build the response formats and their JSON schemas ahead of the first turn.
+        """
+        self._getCachedFormat("ResponseFormat")
+        self._getCachedFormat("CombinedResponseFormat")
+
+    def _getCachedFormat(self, name: str) -> tuple[type[BaseModel], dict]:
+        key = (
+            tuple((router["next_phase"], router["criteria"]) for router in self.router_list),
+            tuple(self.topic_list),
+        )
+        if key != self._format_cache_key:
+            self._format_cache = {}
+            self._format_cache_key = key
+
+        if name not in self._format_cache:
+            format = self._createResponseFormat(name)
+            self._format_cache[name] = (format, format.model_json_schema())
+
+        return self._format_cache[name]
+
+    def _createResponseFormat(self, name: str) -> type[BaseModel]:
+        fields = self._selectorFields()
+        if name == "ResponseFormat":
+            return create_model(name, **fields)
+
+        fields["response"] = (
+            str,
+            Field(
+                description="The chatbot response for this turn, made according to the selected action. The response MUST be in KOREAN."
+            ),
+        )
+
+        return create_model(name, **fields)
+
+    def _selectorFields(self) -> dict:
         options = [router["next_phase"] for router in self.router_list]
         explanations = "\n".join(
             [
@@ -34,36 +93,35 @@ class Phase:
                 for router in self.router_list
             ]
         )
+        # 선택 가능한 action 만 고르도록 제한 (응답 생성 단계에서 action 이름으로 설명을 찾는다)
+        action_type = Literal[tuple(self.topic_list)] if self.topic_list else str
 
-        format = create_model(
-            "ResponseFormat",
-            action=(
-                str,
+        return {
+            "action": (
+                action_type,
                 Field(
                     description="An action for generating current response. You should select one action from the available actions."
                 ),
             ),
-            action_reason=(
+            "action_reason": (
                 str,
                 Field(
                     description="A detailed reason for the action selection. If you need further clarification on the action, you can add it here."
                 ),
             ),
-            next_phase=(
+            "next_phase": (
                 Literal[tuple(options)] | None,
                 Field(
                     description=f"Select next phase to go if the main goal of the phase is achieved. If not, just remain it None. Explanation for each option is shown below.\n\n{explanations}"
                 ),
             ),
-            next_phase_reason=(
+            "next_phase_reason": (
                 str | None,
                 Field(
                     description="A detailed reason for the next phase selection. If you didn't select the next phase, just remain it None."
                 ),
             ),
-        )
-
-        return format
+        }
 
     def getName(self) -> str:
 
@@ -1,6 +1,5 @@
 from .phase import Phase
 from ..message_event import MessageBroker, MessageType
-from ..async_event import AsyncBroker, AsyncMessageType
 
 
 class PhaseManager:
@@ -11,6 +10,8 @@ class PhaseManager:
         self.topics = {}  # : dict[str, str]
         self.bot_name = name
         self.bot_desc = description
+        # FINISH 에 도달했을 때 호출 (세션마다 따로, clone() 은 복사하지 않음)
+        self.on_finish = None  # : Callable[[], None] | None
 
     def addNewPhase(self, phase: Phase) -> str:
         if phase.name in self.phase_dict:
@@ -54,7 +55,8 @@ class PhaseManager:
                     print("Starting a new conversation. Initializing Greeting phase.")
                     self.setStartPhase("Greeting")  # 'Greeting'으로 돌아가서 대화 초기화
                     self.setCurrPhase("Greeting")  # 새로운 대화 흐름 시작
-                    AsyncBroker().emit(("wait_chat_finish", None))
+                    if self.on_finish is not None:
+                        self.on_finish()
                 return True
             else:
                 print(f"There is no such phase named '{next_phase}'")
@@ -77,3 +79,16 @@ class PhaseManager:
     def getBotInfo(self) -> tuple[str, str]:
 
         return self.bot_name, self.bot_desc
+
+    def clone(self) -> "PhaseManager":
+        """
+        A new phase manager for another conversation, starting at the start phase.
+        The Phase objects (and their cached response formats) are shared, not copied.
+        """
+        phase_manager = PhaseManager(self.bot_name, self.bot_desc)
+        phase_manager.phase_dict = self.phase_dict
+        phase_manager.topics = self.topics
+        phase_manager.start_phase = self.start_phase
+        phase_manager.current_phase = self.start_phase
+
+        return phase_manager
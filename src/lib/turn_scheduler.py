@@ -0,0 +1,64 @@
+import asyncio
+import itertools
+
+_turn_ids = itertools.count(1)
+
+
+def new_turn_id() -> int:
+    """
+    Id shared by the chat_cycle_time and chat_user_input messages of one user turn.
+    """
+
+    return next(_turn_ids)
+
+
+class Turn:
+    def __init__(self, turn_id: int | None, cycle_time: dict | None, user_input: dict | None):
+        self.turn_id = turn_id
+        self.cycle_time = cycle_time  # chat_cycle_time 메시지 (없으면 None)
+        self.user_input = user_input  # chat_user_input 메시지 (봇이 먼저 말하는 턴이면 None)
+        self.response_id = None  # 응답을 내기 시작하면 정해지는 chat_response(_chunk) 의 response_id
+
+
+class TurnScheduler:
+    """
+    Joins the chat_cycle_time and chat_user_input messages of a turn by their turn_id
+    and hands out each turn as soon as both parts have arrived.
+    Waiting for a turn is a plain await on a queue, so an idle loop does no work.
+    Every method must be called from the thread of the event loop that awaits next_turn().
+    """
+
+    def __init__(self):
+        self._partial: dict[int | None, dict] = {}  # turn_id -> 먼저 도착한 메시지들
+        self._ready: asyncio.Queue[Turn] = asyncio.Queue()
+
+    def add_cycle_time(self, msg: dict):
+        self._add(msg.get("turn_id"), "cycle_time", msg)
+
+    def add_input(self, msg: dict):
+        turn_id = msg.get("turn_id")
+        if turn_id is None:
+            # turn_id 가 없는 입력은 먼저 와 있던 cycle_time 과 바로 묶는다
+            parts = self._partial.pop(None, {})
+            self.add_turn(Turn(None, parts.get("cycle_time"), msg))
+            return
+        self._add(turn_id, "user_input", msg)
+
+    def add_turn(self, turn: Turn):
+        self._ready.put_nowait(turn)
+
+    async def next_turn(self) -> Turn:
+
+        return await self._ready.get()
+
+    def _add(self, turn_id: int | None, part: str, msg: dict):
+        parts = self._partial.setdefault(turn_id, {})
+        parts[part] = msg
+        if turn_id is None or "cycle_time" not in parts or "user_input" not in parts:
+            return
+
+        del self._partial[turn_id]
+        # 짝을 못 찾고 남은 이전 턴의 메시지는 버린다
+        for stale_id in [key for key in self._partial if key is not None and key < turn_id]:
+            del self._partial[stale_id]
+        self.add_turn(Turn(turn_id, parts["cycle_time"], parts["user_input"]))
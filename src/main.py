@@ -8,8 +8,9 @@ from .lib.microphone import pa as mic_pa
 from .lib.loggable import Loggable
 from .audio.player import ResponsePlayer
 from .graphics.graphics import Graphics
-from .message_event import MessageListener
-from .async_event import AsyncListener
+from .message_event import MessageListener, MessageBroker
+from .lib import DB
+from .async_event import AsyncListener, AsyncBroker
 from .dialog_manager.llm_chatgpt import LLMChatManager
 from .dialog_manager.faster_whisper_recognizer import FasterWhisperRecognizer
 
@@ -26,7 +27,7 @@ class Core(threading.Thread, Loggable):
         self.TARGET_DEVICE = os.getenv("TARGET_DEVICE", "PC") # RPi or PC
         self.response_player = ResponsePlayer()
         self.llm_chat = LLMChatManager()
-        self.speech_recognizer = FasterWhisperRecognizer(model_size="base")  # Faster-Whisper로 변경
+        self.speech_recognizer = FasterWhisperRecognizer()  # 모델은 GUI 가 뜨는 동안 백그라운드에서 로드
         # self.threads = (self.llm_chat, self.speech_recognizer)
         self.threads = (self.llm_chat,)
 
@@ -60,6 +61,11 @@ class Core(threading.Thread, Loggable):
         for thread in self.threads:
             thread.join()
         mic_pa.terminate()
+        # 큐에 남은 대화 기록을 commit 한다
+        DB.shutdown()
+        # 큐 크기를 정할 때 참고할 이벤트별 카운터
+        self.log(f"MessageBroker queues: {MessageBroker().queue_stats()}")
+        self.log(f"AsyncBroker queues: {AsyncBroker().queue_stats()}")
         self.log("Cleaned up")
 
 if __name__ == "__main__":
@@ -1,15 +1,18 @@
-from threading import Thread, Lock
+from threading import Thread, Lock, Condition
 from queue import Queue, Full, Empty
-from collections import OrderedDict
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Set, TypeVar, Callable, Tuple, Any, List
 from .lib.singleton import Singleton
-import time
+from .lib.backpressure import BLOCK, COALESCE, DROP_NEWEST, DROP_OLDEST, QueueStats, checkPolicy
 import os
 from dotenv import load_dotenv
 
 T = TypeVar("T")
 MessageType = Tuple[str, T]               # (event_name, payload)
 ListenerThread = TypeVar("ListenerThread", bound="MessageListener")
+# stop() 이 대기 중인 MessageListener 를 깨울 때 넣는 이벤트
+_STOP = object()
 
 load_dotenv()
 class MessageListener(Thread):
@@ -17,42 +20,81 @@ class MessageListener(Thread):
     ■ 메시지 처리 전용 스레드 ■
     - enqueue() 로 메시지를 받아 자신의 큐에 보관
     - run() 루프에서 큐를 비우며 handle() 호출
+    - 큐가 가득 찼을 때의 동작은 policy (lib/backpressure.py) 로 정합니다
     - 구독/발행은 브로커에게만 맡깁니다!
     """
-    def __init__(self):
+    def __init__(self, policy: str = DROP_NEWEST, timeout: float = 1.0):
         Thread.__init__(self)
         self._stop_flag = False
         # 각 메시지를 저장할 큐 (최대 10개 큐잉)
         self.message_queue: Queue[MessageType] = Queue(maxsize=10)
-        # 이벤트 루프 빈도로 지정 (초 단위)
-        self._loop_time = 1.0 / 60
+        # idle() 호출 주기 (초 단위). None 이면 메시지가 올 때까지 잠들어 있는다
+        self._loop_time = None
+        self.policy = checkPolicy(policy)
+        # BLOCK 정책에서 자리가 나기를 기다리는 최대 시간 (초)
+        self.timeout = timeout
+        # 구독할 때 브로커가 자신의 카운터를 넣어 준다
+        self.stats: QueueStats | None = None
 
     def enqueue(self, message: MessageType):
         """
         ■ 브로커가 메시지를 전달할 때 호출
-        ■ 메시지를 큐에 넣고, overflow 시에는 drop
+        ■ 메시지를 큐에 넣고, overflow 시에는 policy 에 따라 drop
         """
+        if self.policy == COALESCE:
+            # 대기 중인 메시지는 최신 메시지로 대체
+            while True:
+                try:
+                    self._count_dropped(self.message_queue.get_nowait())
+                except Empty:
+                    break
         try:
-            self.message_queue.put_nowait(message)
+            if self.policy == BLOCK:
+                self.message_queue.put(message, timeout=self.timeout)
+            else:
+                self.message_queue.put_nowait(message)
         except Full:
-            # 큐가 가득 찼다면 별도 로깅 없이 무시(드롭)
-            pass
+            if self.policy != DROP_OLDEST:
+                self._count_dropped(message)
+                return
+            try:
+                self._count_dropped(self.message_queue.get_nowait())
+                self.message_queue.put_nowait(message)
+            except (Empty, Full):
+                self._count_dropped(message)
+                return
+        if self.stats is not None:
+            self.stats.enqueued(message[0], self.message_queue.qsize())
+
+    def _count_dropped(self, message: MessageType):
+        if self.stats is not None and message[0] is not _STOP:
+            self.stats.dropped(message[0])
     
     def run(self):
         """
         ■ Thread.start() 시 자동 실행되는 메인 루프
-        1) 지정된 주기마다 _handle_events() 호출 → 큐 비우기
+        1) 메시지가 올 때까지 (_loop_time 이 있으면 그 시간까지만) 큐에서 대기 → 큐 비우기
         2) idle() 호출 → 추가 여유 작업 (오버라이드 가능)
         """
         while not self._stop_flag:
+            try:
+                message = self.message_queue.get(timeout=self._loop_time)
+                if message[0] is not _STOP:
+                    self.handle(*message)
+            except Empty:
+                pass
             self._handle_events()
             self.idle()
-            time.sleep(self._loop_time)
 
 
     def stop(self):
         """■ 루프를 중단하도록 플래그 설정"""
         self._stop_flag = True
+        # 큐에서 대기 중인 run() 을 깨운다 (큐가 가득 차 있으면 어차피 곧 깨어남)
+        try:
+            self.message_queue.put_nowait((_STOP, None))
+        except Full:
+            pass
 
     def _handle_events(self):
         """
@@ -62,7 +104,8 @@ class MessageListener(Thread):
         while True:
             try:
                 event, detail = self.message_queue.get_nowait()
-                self.handle(event, detail)
+                if event is not _STOP:
+                    self.handle(event, detail)
             except Empty:
                 # 큐가 비어 있으면 루프 종료
                 break
@@ -84,24 +127,111 @@ class MessageListener(Thread):
             "서브클래스에서 handle(event, detail)을 구현해야 합니다."
         )
 
-            
-class CallbackListener(MessageListener):
+
+class MessageDispatcher(Singleton):
+    """
+    ■ 콜백 리스너들이 함께 쓰는 작은 스레드 풀 ■
+    - 리스너마다 스레드를 두지 않고, 처리할 메시지가 있는 리스너만 워커에 올린다
+    - 한 리스너는 한 번에 한 워커에서만 실행 → 리스너별 메시지 순서 보장
+    - 일이 없으면 워커는 블로킹 대기 (주기적으로 깨어나지 않음)
+    """
+    def _init(self) -> None:
+        workers = int(os.getenv("MESSAGE_DISPATCH_WORKERS", "4"))
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix="message-dispatch")
+        # 워커가 리스너를 실행한 횟수 (벤치마크용, 여러 워커가 올리므로 락 안에서)
+        self.runs = 0
+        self._runs_lock = Lock()
+
+    def schedule(self, listener: "CallbackListener") -> None:
+        self._pool.submit(listener._drain)
+
+    def count_run(self) -> None:
+        with self._runs_lock:
+            self.runs += 1
+
+
+class CallbackListener:
     """
     ■ 단일 콜백 처리 전용 리스너 ■
     - subscribe() 에 함수나 메서드를 넘기면
       내부에서 이 클래스로 자동 래핑합니다.
+    - 자신의 스레드 없이 MessageDispatcher 의 워커에서 실행됩니다.
+    - BLOCK 정책이면 발행하는 스레드가 최대 timeout 초 기다립니다
+      (콜백 안에서 같은 이벤트를 발행하면 자기 자신을 기다리게 되니 주의)
     """
-    def __init__(self, callback: Callable[[Any], None], queue_size: int = 10):
-        super().__init__()
-        # 원하는 큐 크기로 재설정
-        self.message_queue = Queue(maxsize=queue_size)
+    # 한 번 실행에 처리할 최대 메시지 수 (다른 리스너에게도 워커가 돌아가도록)
+    BATCH = 32
+
+    def __init__(self, callback: Callable[[Any], None], queue_size: int = 10,
+                 policy: str = DROP_NEWEST, timeout: float = 1.0):
+        self.queue_size = queue_size
+        self.policy = checkPolicy(policy)
+        self.timeout = timeout
+        self.stats: QueueStats | None = None
         self._callback = callback
-        self.start()
+        self._messages: deque[MessageType] = deque()
+        self._lock = Lock()
+        # _drain() 이 메시지를 꺼낼 때마다 BLOCK 으로 기다리는 발행자를 깨운다
+        self._not_full = Condition(self._lock)
+        self._scheduled = False
+        self._stop_flag = False
+
+    def enqueue(self, message: MessageType):
+        with self._lock:
+            if self._stop_flag:
+                return
+            if self.policy == COALESCE:
+                # 대기 중인 메시지는 최신 메시지로 대체
+                self._count_dropped(*self._messages)
+                self._messages.clear()
+            elif len(self._messages) >= self.queue_size:
+                if self.policy == DROP_OLDEST:
+                    self._count_dropped(self._messages.popleft())
+                elif (self.policy != BLOCK or not self._not_full.wait_for(self._has_room, self.timeout)
+                      or self._stop_flag):
+                    self._count_dropped(message)
+                    return
+            self._messages.append(message)
+            if self.stats is not None:
+                self.stats.enqueued(message[0], len(self._messages))
+            if self._scheduled:
+                return
+            self._scheduled = True
+        MessageDispatcher().schedule(self)
+
+    def stop(self):
+        with self._lock:
+            self._stop_flag = True
+            self._not_full.notify_all()
+
+    def _has_room(self) -> bool:
+        return self._stop_flag or len(self._messages) < self.queue_size
+
+    def _count_dropped(self, *messages: MessageType):
+        if self.stats is not None:
+            for event, _ in messages:
+                self.stats.dropped(event)
 
     def handle(self, event: str, detail: Any):
         # detail 만 콜백에 전달
         self._callback(detail)
 
+    def _drain(self):
+        MessageDispatcher().count_run()
+        for _ in range(self.BATCH):
+            with self._lock:
+                if not self._messages:
+                    self._scheduled = False
+                    return
+                event, detail = self._messages.popleft()
+                self._not_full.notify()
+            try:
+                self.handle(event, detail)
+            except Exception as e:
+                print(f"[MessageBroker] handle error for {event}: {e}")
+        # 남은 메시지는 다시 줄을 서서 처리
+        MessageDispatcher().schedule(self)
+
 class MessageBroker(Singleton):
     """
     ■ 중앙 이벤트 브로커 (싱글톤) ■
@@ -117,19 +247,28 @@ class MessageBroker(Singleton):
         self._lock = Lock()
         # 디버깅 시 구독자 현황 출력 여부
         self.VERBOSE_CURRENT_SUBSCRIBERS = os.getenv("Debugging_Mode", "False")  # 디버깅용
+        # 이벤트별 enqueued / dropped / max_depth
+        self._stats = QueueStats()
 
 
-    def subscribe(self, event: str, listener: ListenerThread):
+    def subscribe(self, event: str, listener: ListenerThread, queue_size: int = 10,
+                  policy: str | None = None, timeout: float = 1.0):
         """
         ■ 이벤트에 listener 등록 (thread-safe)
         1) 락 획득 후 _events 딕셔너리 수정
         2) event 키가 없으면 빈 Set 생성, listener 추가
         3) verbose 모드면 구독 상태 로깅
+        ■ policy: 큐가 가득 찼을 때의 동작 (drop_newest / drop_oldest / block / coalesce)
+          - 콜백은 기본 drop_newest, 리스너 인스턴스는 넘겼을 때만 바꿈
         """
         with self._lock:
             from inspect import isfunction, ismethod
             if isfunction(listener) or ismethod(listener):
-                listener = CallbackListener(listener)
+                listener = CallbackListener(listener, queue_size, policy or DROP_NEWEST, timeout)
+            elif policy is not None:
+                listener.policy = checkPolicy(policy)
+                listener.timeout = timeout
+            listener.stats = self._stats
             self._events.setdefault(event, set()).add(listener)
             
             if self.VERBOSE_CURRENT_SUBSCRIBERS:
@@ -168,3 +307,10 @@ class MessageBroker(Singleton):
         # 3) 락 해제 후 메시지 전달
         for listener in listeners:
             listener.enqueue((event, detail))
+
+    def queue_stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        ■ 이벤트별 큐 카운터 {event: {"enqueued", "dropped", "max_depth"}}
+        ■ queue_size 를 정할 때 참고 (max_depth 가 queue_size 에 닿거나 dropped 가 있으면 부족)
+        """
+        return self._stats.snapshot()